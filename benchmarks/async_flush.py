@@ -0,0 +1,70 @@
+"""Compare the frame rate of a render loop flushing its frames synchronously and asynchronously.
+
+Run with ``python benchmarks/async_flush.py``, it prints the number of frames per second of a render
+loop where building a frame and sending it take some time, the sending being simulated by a transport
+sleeping for a while. With ``hold_canvas(async_flush=True)``, the next frame is built while the
+previous one is sent.
+"""
+
+import time
+
+import numpy as np
+
+from ipycanvas import Canvas, get_canvas_manager, hold_canvas
+from ipycanvas.transport import Transport
+
+N_FRAMES = 50
+N_CIRCLES = 100_000
+SEND_TIME = 0.01
+SIMULATION_TIME = 0.01
+
+
+class SlowTransport(Transport):
+    """Drop the messages after ``send_time`` seconds, like a slow link to the front-end."""
+
+    def __init__(self, send_time):
+        self.send_time = send_time
+
+    def send(self, manager, metadata, buffers):
+        time.sleep(self.send_time)
+
+
+def run(async_flush, send_time):
+    manager = get_canvas_manager()
+    manager.transport = SlowTransport(send_time)
+    canvas = Canvas(width=800, height=600)
+
+    rng = np.random.default_rng(0)
+    x = rng.random(N_CIRCLES) * 800
+    y = rng.random(N_CIRCLES) * 600
+
+    start = time.monotonic()
+    for _ in range(N_FRAMES):
+        # Stands for the simulation step computing the next positions
+        time.sleep(SIMULATION_TIME)
+        x += rng.normal(size=N_CIRCLES)
+        y += rng.normal(size=N_CIRCLES)
+
+        with hold_canvas(async_flush=async_flush):
+            canvas.clear()
+            canvas.fill_circles(x, y, 2)
+    manager.wait_for_send()
+
+    return N_FRAMES / (time.monotonic() - start)
+
+
+def main():
+    print(
+        f"{N_CIRCLES} circles, {N_FRAMES} frames, {SIMULATION_TIME * 1000:.0f} ms simulation\n"
+    )
+    print(f"{'send (ms)':>10}{'sync (fps)':>12}{'async (fps)':>13}")
+
+    for send_time in (SEND_TIME / 2, SEND_TIME, SEND_TIME * 2):
+        print(
+            f"{send_time * 1000:>10.0f}{run(False, send_time):>12.1f}"
+            f"{run(True, send_time):>13.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Compare re-sending the arrays of a scatter plot every frame with updating ``CanvasBuffer`` objects.
+
+Run with ``python benchmarks/canvas_buffers.py``, it prints the number of bytes sent per frame
+for a scatter plot where a fraction of the points move at every frame.
+"""
+
+import numpy as np
+
+from ipycanvas import Canvas, CanvasBuffer, get_canvas_manager, hold_canvas
+from ipycanvas.transport import RecordingTransport
+
+N_POINTS = 500_000
+MOVING_FRACTIONS = [0.001, 0.01, 0.1]
+
+
+def run(use_buffers, fraction, n_frames):
+    recorder = RecordingTransport(keep_frames=False)
+    get_canvas_manager().transport = recorder
+
+    rng = np.random.default_rng(0)
+    x = rng.random(N_POINTS) * 800
+    y = rng.random(N_POINTS) * 600
+    x_arg, y_arg = (CanvasBuffer(x), CanvasBuffer(y)) if use_buffers else (x, y)
+
+    canvas = Canvas(width=800, height=600)
+    canvas.fill_circles(x_arg, y_arg, 1)
+
+    recorder.clear()
+    for _ in range(n_frames):
+        moved = rng.choice(N_POINTS, int(fraction * N_POINTS), replace=False)
+        x_arg[moved] = rng.random(len(moved)) * 800
+        y_arg[moved] = rng.random(len(moved)) * 600
+
+        with hold_canvas():
+            canvas.clear()
+            canvas.fill_circles(x_arg, y_arg, 1)
+
+    return recorder.stats["bytes_per_frame"]
+
+
+def main(n_frames=10):
+    print(f"{N_POINTS} points, {n_frames} frames\n")
+    print(f"{'moving':>8}{'arrays (kB)':>14}{'buffers (kB)':>15}{'ratio':>8}")
+
+    for fraction in MOVING_FRACTIONS:
+        sent_arrays = run(False, fraction, n_frames)
+        sent_buffers = run(True, fraction, n_frames)
+        print(
+            f"{fraction:>8.1%}{sent_arrays / 1000:>14.1f}{sent_buffers / 1000:>15.1f}"
+            f"{sent_arrays / sent_buffers:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Compare the JSON and binary command stream encodings.
+
+Run with ``python benchmarks/command_encoding.py``, it prints the number of bytes per command
+and the encoding time for a few typical workloads. ``json`` is the default path (using orjson
+when it is installed), ``stdlib`` is the default path without orjson. With ``command_encoding``
+set to ``"binary"``, the canvas manager only uses the binary encoding for messages made mostly of
+path segments (the ``line_to`` workload), the other messages are sent in JSON.
+"""
+
+import json
+import timeit
+
+import numpy as np
+
+from ipycanvas import Canvas
+from ipycanvas.canvas import _CanvasManager
+from ipycanvas.utils import ORJSON_AVAILABLE, commands_to_buffer, commands_to_binary
+
+
+def fill_rects(canvas, n):
+    for i in range(n):
+        canvas.fill_rect(i % 700, i % 500, 10, 10)
+
+
+def line_to(canvas, n):
+    canvas.begin_path()
+    canvas.move_to(0, 0)
+    for i in range(n):
+        canvas.line_to(np.random.random() * 700, np.random.random() * 500)
+    canvas.stroke()
+
+
+def set_styles(canvas, n):
+    for i in range(n):
+        canvas.fill_style = "red" if i % 2 else "blue"
+        canvas.line_width = i % 10
+
+
+ENCODERS = {
+    "json": lambda commands: commands_to_buffer(commands, "json")[1],
+    "stdlib": lambda commands: json.dumps(commands).encode(),
+    "binary": commands_to_binary,
+}
+
+WORKLOADS = {
+    "fill_rect": fill_rects,
+    "line_to": line_to,
+    "set": set_styles,
+}
+
+
+def record(workload, n):
+    """Return the list of commands produced by a workload, without sending them."""
+    manager = _CanvasManager(caching=True)
+    canvas = Canvas(_canvas_manager=manager)
+    workload(canvas, n)
+    manager._merge_canvas_queues()
+    return manager._commands_cache
+
+
+def main(n=50_000, repeat=5):
+    print(f"orjson available: {ORJSON_AVAILABLE}, {n} commands per workload\n")
+    print(f"{'workload':<12}{'encoding':<10}{'bytes/cmd':>12}{'encode (ms)':>14}")
+
+    for name, workload in WORKLOADS.items():
+        commands = record(workload, n)
+
+        for encoding, encode in ENCODERS.items():
+            size = len(memoryview(encode(commands)).cast("B"))
+            duration = min(
+                timeit.repeat(lambda: encode(commands), number=1, repeat=repeat)
+            )
+            print(
+                f"{name:<12}{encoding:<10}{size / len(commands):>12.2f}"
+                f"{duration * 1000:>14.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Measure the throughput of typical drawing loops, without a front-end.
+
+Run with ``python benchmarks/drawing.py``, it prints the number of commands sent per second and
+the number of bytes per frame (message) and the total time for each workload, using the ``RecordingTransport``.
+"""
+
+import numpy as np
+
+from ipycanvas import Canvas, get_canvas_manager, hold_canvas
+from ipycanvas.transport import RecordingTransport
+
+
+def fill_rect(canvas, n):
+    for i in range(n):
+        canvas.fill_rect(i % 700, i % 500, 10, 10)
+
+
+def fill_rect_held(canvas, n):
+    with hold_canvas():
+        fill_rect(canvas, n)
+
+
+def fill_circles(canvas, n):
+    with hold_canvas():
+        canvas.fill_circles(np.random.random(n) * 700, np.random.random(n) * 500, 5)
+
+
+def stroke_lines(canvas, n):
+    with hold_canvas():
+        canvas.stroke_lines(np.random.random((n, 2)) * 500)
+
+
+WORKLOADS = {
+    "fill_rect": (fill_rect, 10_000),
+    "fill_rect (held)": (fill_rect_held, 100_000),
+    "fill_circles": (fill_circles, 1_000_000),
+    "stroke_lines": (stroke_lines, 1_000_000),
+}
+
+
+def main():
+    recorder = RecordingTransport(keep_frames=False)
+    get_canvas_manager().transport = recorder
+    canvas = Canvas()
+
+    print(f"{'workload':<20}{'commands/s':>14}{'bytes/frame':>14}{'time (ms)':>12}")
+
+    for name, (workload, n) in WORKLOADS.items():
+        recorder.clear()
+        workload(canvas, n)
+        stats = recorder.stats
+
+        print(
+            f"{name:<20}{stats['commands_per_second']:>14.0f}"
+            f"{stats['bytes_per_frame']:>14.0f}{stats['elapsed'] * 1000:>12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Compare the codecs of ``Canvas.put_image_data``.
+
+Run with ``python benchmarks/image_codecs.py``, it prints the size of the message and the time spent
+in ``put_image_data`` for a few frame sizes and two kinds of images: ``noise`` (random pixels, the
+worst case for compression) and ``heatmap`` (a smooth gradient, typical of plots and simulations).
+The decoding cost on the front-end is not measured, ``raw`` has none.
+"""
+
+import timeit
+
+import numpy as np
+
+from ipycanvas import Canvas, get_canvas_manager
+from ipycanvas.transport import RecordingTransport
+
+FRAME_SIZES = [(64, 64), (256, 256), (1024, 768), (1920, 1080)]
+
+CODECS = {
+    "raw": {"codec": "raw"},
+    "png (1)": {"codec": "png", "compress_level": 1},
+    "png (6)": {"codec": "png", "compress_level": 6},
+    "jpeg (75)": {"codec": "jpeg", "quality": 75},
+    "webp (75)": {"codec": "webp", "quality": 75},
+    "webp (100)": {"codec": "webp", "quality": 100},
+}
+
+
+def noise(width, height):
+    return np.random.randint(0, 255, (height, width, 4), dtype=np.uint8)
+
+
+def heatmap(width, height):
+    x, y = np.meshgrid(np.linspace(0, 1, width), np.linspace(0, 1, height))
+    image = np.empty((height, width, 4), dtype=np.uint8)
+    image[..., 0] = 255 * x
+    image[..., 1] = 255 * y
+    image[..., 2] = 255 * np.sin(10 * x * y) ** 2
+    image[..., 3] = 255
+    return image
+
+
+IMAGES = {"noise": noise, "heatmap": heatmap}
+
+
+def main(repeat=5):
+    recorder = RecordingTransport(keep_frames=False)
+    get_canvas_manager().transport = recorder
+    canvas = Canvas()
+
+    print(f"{'image':<10}{'size':<12}{'codec':<12}{'bytes/frame':>14}{'time (ms)':>12}")
+
+    for name, make_image in IMAGES.items():
+        for width, height in FRAME_SIZES:
+            image = make_image(width, height)
+
+            for codec, options in CODECS.items():
+                recorder.clear()
+                duration = min(
+                    timeit.repeat(
+                        lambda: canvas.put_image_data(image, **options),
+                        number=1,
+                        repeat=repeat,
+                    )
+                )
+                print(
+                    f"{name:<10}{f'{width}x{height}':<12}{codec:<12}"
+                    f"{recorder.stats['bytes_per_frame']:>14.0f}{duration * 1000:>12.2f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -10,7 +10,10 @@ from .canvas import (
     RoughCanvas,
     MultiCanvas,
     MultiRoughCanvas,
+    SpriteAtlas,
+    CanvasBuffer,
     hold_canvas,
+    get_canvas_manager,
 )  # noqa
 from ._version import __version__  # noqa
 
@@ -10,7 +10,7 @@ Information about the frontend package of the widgets.
 
 from ._version import __version__
 
-major, minor, *_ = __version__.split('.')
+major, minor, *_ = __version__.split(".")
 
 module_name = "ipycanvas"
 module_version = f"^{major}.{minor}.0-0"
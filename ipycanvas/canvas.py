@@ -4,8 +4,17 @@
 # Copyright (c) Martin Renou.
 # Distributed under the terms of the Modified BSD License.
 
+import asyncio
+import threading
+import time
+import traceback
 import warnings
+import zlib
+from collections import OrderedDict, deque
 from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+from itertools import count
 
 import numpy as np
 
@@ -20,6 +29,8 @@ from traitlets import (
     Unicode,
     TraitError,
     Union,
+    default,
+    observe,
 )
 
 from ipywidgets import (
@@ -40,7 +51,23 @@ from ipywidgets.widgets.trait_types import (
 
 from ._frontend import module_name, module_version
 
-from .utils import binary_image, populate_args, image_bytes_to_array, commands_to_buffer
+from .events import EventQueue
+
+from .transport import Transport, CommTransport
+
+from .utils import (
+    _BUFFER_CONVERTER,
+    _ResourceCache,
+    CanvasBuffer,
+    binary_image,
+    changed_rects,
+    image_to_rgba,
+    populate_args,
+    image_bytes_to_array,
+    path_arrays,
+    string_table,
+    commands_to_buffer,
+)
 
 _CMD_LIST = [
     "fillRect",
@@ -104,9 +131,55 @@ _CMD_LIST = [
     "strokeStyledPolygons",
     "strokeStyledLineSegments",
     "switchCanvas",
+    "resetCanvas",
+    "drawImages",
+    "fillTexts",
+    "strokeTexts",
+    "pathFromArrays",
+    "setCanvasBuffer",
+    "updateCanvasBuffer",
+    "deleteCanvasBuffer",
 ]
 COMMANDS = {v: i for i, v in enumerate(_CMD_LIST)}
 
+# Commands building the current path, they do not draw anything
+_PATH_COMMANDS = frozenset(
+    COMMANDS[name]
+    for name in (
+        "beginPath",
+        "closePath",
+        "moveTo",
+        "lineTo",
+        "rect",
+        "arc",
+        "ellipse",
+        "arcTo",
+        "quadraticCurveTo",
+        "bezierCurveTo",
+    )
+)
+
+# Commands adding a segment to the current path, the binary encoding only pays off for them
+_PATH_SEGMENT_COMMANDS = _PATH_COMMANDS - {COMMANDS["beginPath"], COMMANDS["closePath"]}
+
+# Commands changing the drawing state, they do not draw anything
+_STATE_COMMANDS = frozenset(
+    COMMANDS[name]
+    for name in (
+        "set",
+        "setLineDash",
+        "clip",
+        "save",
+        "restore",
+        "translate",
+        "rotate",
+        "scale",
+        "transform",
+        "setTransform",
+        "resetTransform",
+    )
+)
+
 
 # Traitlets does not allow validating without creating a trait class, so we need this
 def _validate_color(value):
@@ -132,9 +205,84 @@ def _validate_number(value, min_val, max_val):
     raise TraitError("{} is not in the range [{}, {}]".format(value, min_val, max_val))
 
 
+def _position_event_args(content, buffers):
+    return content["x"], content["y"]
+
+
+def _touch_event_args(content, buffers):
+    # The touches are sent as a flat [x0, y0, x1, y1, ...] float64 buffer
+    return (np.frombuffer(buffers[0], dtype=np.float64).reshape((-1, 2)),)
+
+
+def _key_event_args(content, buffers):
+    return (
+        content["key"],
+        content["shift_key"],
+        content["ctrl_key"],
+        content["meta_key"],
+    )
+
+
+def _dispatch_event(callbacks, get_args, content, buffers):
+    callbacks(*get_args(content, buffers))
+
+
+def _rects_overlap(slot_a, slot_b):
+    """Check if the images of two ``put_image_data`` slots ``(x, y, shape)`` overlap."""
+    x_a, y_a, shape_a = slot_a
+    x_b, y_b, shape_b = slot_b
+
+    return (
+        x_a < x_b + shape_b[1]
+        and x_b < x_a + shape_a[1]
+        and y_a < y_b + shape_b[0]
+        and y_b < y_a + shape_a[0]
+    )
+
+
+def _is_opaque_color(value):
+    """Whether a valid HTML color is fully opaque."""
+    if not isinstance(value, str) or value.startswith("IPY_MODEL_"):
+        # Gradients and patterns
+        return False
+
+    value = value.strip().lower()
+    if value in _color_names:
+        return value != "transparent"
+    if value.startswith("#"):
+        if len(value) == 5:
+            return value[4] == "f"
+        if len(value) == 9:
+            return value[7:] == "ff"
+        return True
+
+    components = value[value.find("(") + 1 : value.rfind(")")]
+    components = components.replace(",", " ").replace("/", " ").split()
+    if len(components) < 4:
+        return True
+    alpha = components[3]
+    if alpha.endswith("%"):
+        return float(alpha[:-1]) >= 100
+    return float(alpha) >= 1
+
+
 def _serialize_list_of_polygons_or_linestrokes(
     points, points_per_item, item_name, min_elements
 ):
+    if isinstance(points, CanvasBuffer):
+        # The points stay in the front-end, only their layout is checked
+        if points.ndim == 3:
+            if points_per_item is not None:
+                raise RuntimeError(
+                    "when points are a 3D CanvasBuffer, points_per_item must be None"
+                )
+            return points.shape[0], points, points.shape[1]
+        if points_per_item is None:
+            raise RuntimeError(
+                "when points are a 1d / 2d CanvasBuffer, points_per_item must not be None"
+            )
+        return len(points_per_item), points, points_per_item
+
     if isinstance(points, list):
         if points_per_item is not None:
             raise RuntimeError("when points are a list, points_per_item must be None")
@@ -195,6 +343,262 @@ def _serialize_list_of_polygons_or_linestrokes(
     return num_polygons, flat_points, points_per_item
 
 
+class _Batch:
+    """Draw commands built by a thread or a ``hold_canvas`` block and not sent yet."""
+
+    __slots__ = (
+        "caching",
+        "commands",
+        "buffers",
+        "canvas_queues",
+        "first_canvas",
+        "last_canvas",
+        "start",
+        "nbytes",
+        "flush_handle",
+        "lock",
+    )
+
+    def __init__(self, caching=False):
+        self.caching = caching
+        self.commands = []
+        self.buffers = []
+        # Commands not yet in the commands list, by canvas: canvas -> (commands, buffers)
+        self.canvas_queues = {}
+        # Canvases targeted by the first and the last commands of the commands list, the switch to the
+        # first one is added when sending, depending on the canvas the front-end is drawing on
+        self.first_canvas = None
+        self.last_canvas = None
+        self.start = None
+        self.nbytes = 0
+        self.flush_handle = None
+        # Without an event loop, the batch is flushed by a timer thread
+        self.lock = threading.RLock()
+
+
+class _RetainedLog:
+    """Bounded log of the commands sent to a Canvas, used for replaying them to new clients.
+
+    The log is compacted whenever the entire canvas is cleared or covered by an opaque ``fill_rect``:
+    previous draw commands cannot be seen anymore and are dropped, only the commands changing the drawing
+    state are kept. If the log still grows above its bounds, draw commands are replaced by a snapshot of the
+    canvas (when ``image_data`` is available) or dropped with a warning.
+    """
+
+    # Rough size of a command without its buffers
+    _COMMAND_SIZE_ESTIMATE = 32
+
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self.commands = []
+        self.buffers = []
+        self.nbytes = 0
+        self.snapshot = None
+
+        # Whether draw commands were dropped since the last time the canvas was entirely covered
+        self._lossy = False
+
+        self._state = self._default_state()
+        self._state_stack = []
+
+    @staticmethod
+    def _default_state():
+        return {
+            "fill_style": "black",
+            "global_alpha": 1.0,
+            "global_composite_operation": "source-over",
+            "filter": "none",
+            "transformed": False,
+            "clipped": False,
+        }
+
+    def record(self, command, buffers):
+        opcode = command[0]
+
+        # A new client does not have the CanvasBuffers, the commands using them get a copy of their data
+        if opcode in _CanvasManager._BUFFER_COMMANDS:
+            return
+        command, buffers = self._materialize_canvas_buffers(command, buffers)
+        args = command[1]
+
+        self._update_state(opcode, args)
+
+        if opcode == COMMANDS["clear"] and self._covers_canvas():
+            self.compact()
+            self._lossy = False
+            return
+        if opcode == COMMANDS["fillRect"] and self._fill_rect_covers_canvas(*args):
+            self.compact()
+            self._lossy = False
+
+        # Buffers may be views on user arrays, copy them
+        buffers = [bytes(memoryview(buffer)) for buffer in buffers]
+
+        self.commands.append(command)
+        self.buffers.append(buffers)
+        self.nbytes += self._COMMAND_SIZE_ESTIMATE + sum(len(b) for b in buffers)
+
+        if (
+            len(self.commands) > self.canvas.max_retained_commands
+            or self.nbytes > self.canvas.max_retained_bytes
+        ):
+            self._evict()
+
+    @staticmethod
+    def _materialize_canvas_buffers(command, buffers):
+        if not any(
+            isinstance(arg, dict) and "canvas_buffer" in arg for arg in command[1]
+        ):
+            return command, buffers
+
+        args = []
+        buffers = list(buffers)
+        for arg in command[1]:
+            if isinstance(arg, dict) and "canvas_buffer" in arg:
+                canvas_buffer = CanvasBuffer._live[arg["canvas_buffer"]]
+                arg = {
+                    "shape": canvas_buffer.shape,
+                    "dtype": str(canvas_buffer.dtype),
+                    "idx": len(buffers),
+                }
+                buffers.append(canvas_buffer.array)
+            args.append(arg)
+
+        return [command[0], args, len(buffers)], buffers
+
+    def replay_commands(self):
+        """Return the retained commands and buffers, ready to be sent to a blank canvas."""
+        commands = []
+        buffers = []
+
+        if self.snapshot is not None:
+            commands.append([COMMANDS["putImageData"], [0, 0], 1])
+            buffers.append(self.snapshot)
+
+        for command, command_buffers in zip(self.commands, self.buffers):
+            commands.append(command)
+            buffers += command_buffers
+
+        return commands, buffers
+
+    def compact(self):
+        """Drop the draw commands, keeping the commands needed for restoring the drawing state."""
+        self.snapshot = None
+
+        kept = []
+        seen_attrs = set()
+        # Path commands followed by a beginPath are not needed, unless they are used by a clip
+        dead_path = False
+
+        for command, buffers in zip(reversed(self.commands), reversed(self.buffers)):
+            opcode = command[0]
+
+            if opcode in _PATH_COMMANDS:
+                if dead_path:
+                    continue
+                if opcode == COMMANDS["beginPath"]:
+                    dead_path = True
+            elif opcode == COMMANDS["clip"]:
+                dead_path = False
+            elif opcode in (COMMANDS["save"], COMMANDS["restore"]):
+                seen_attrs.clear()
+            elif opcode in (COMMANDS["set"], COMMANDS["setLineDash"]):
+                # Only the latest value of an attribute matters between two save/restore
+                attr = command[1][0] if opcode == COMMANDS["set"] else "line_dash"
+                if attr in seen_attrs:
+                    continue
+                seen_attrs.add(attr)
+            elif opcode not in _STATE_COMMANDS:
+                continue
+
+            kept.append((command, buffers))
+
+        kept.reverse()
+        self.commands = [command for command, _ in kept]
+        self.buffers = [buffers for _, buffers in kept]
+        self.nbytes = sum(
+            self._COMMAND_SIZE_ESTIMATE + sum(len(b) for b in buffers)
+            for buffers in self.buffers
+        )
+
+    def _evict(self):
+        snapshot = self.canvas.image_data
+
+        self.compact()
+
+        if snapshot is not None:
+            self.snapshot = snapshot
+        elif not self._lossy:
+            self._lossy = True
+            warnings.warn(
+                "The retained command log is full and no image data is available for taking a snapshot "
+                "(see ``sync_image_data``), previous drawings will not be replayed to new clients.",
+                RuntimeWarning,
+            )
+
+        if (
+            len(self.commands) > self.canvas.max_retained_commands
+            or self.nbytes > self.canvas.max_retained_bytes
+        ):
+            warnings.warn(
+                "The retained command log is full, the drawing state will not be replayed to new clients.",
+                RuntimeWarning,
+            )
+            self.commands = []
+            self.buffers = []
+            self.nbytes = 0
+
+    def _update_state(self, opcode, args):
+        state = self._state
+
+        if opcode == COMMANDS["set"]:
+            attr = args[0]
+            for name in (
+                "fill_style",
+                "global_alpha",
+                "global_composite_operation",
+                "filter",
+            ):
+                if attr == Canvas.ATTRS[name]:
+                    state[name] = args[1]
+        elif opcode in (
+            COMMANDS["translate"],
+            COMMANDS["rotate"],
+            COMMANDS["scale"],
+            COMMANDS["transform"],
+        ):
+            state["transformed"] = True
+        elif opcode == COMMANDS["setTransform"]:
+            state["transformed"] = list(args) != [1, 0, 0, 1, 0, 0]
+        elif opcode == COMMANDS["resetTransform"]:
+            state["transformed"] = False
+        elif opcode == COMMANDS["clip"]:
+            state["clipped"] = True
+        elif opcode == COMMANDS["save"]:
+            self._state_stack.append(dict(state))
+        elif opcode == COMMANDS["restore"] and self._state_stack:
+            self._state = self._state_stack.pop()
+
+    def _covers_canvas(self):
+        return not self._state["transformed"] and not self._state["clipped"]
+
+    def _fill_rect_covers_canvas(self, x, y, width, height):
+        state = self._state
+
+        return (
+            self.canvas._fill_rect_covers_canvas
+            and self._covers_canvas()
+            and state["global_alpha"] >= 1
+            and state["global_composite_operation"] == "source-over"
+            and state["filter"] == "none"
+            and _is_opaque_color(state["fill_style"])
+            and x <= 0
+            and y <= 0
+            and x + width >= self.canvas.width
+            and y + height >= self.canvas.height
+        )
+
+
 class _CanvasManager(Widget):
     """Private Canvas manager."""
 
@@ -203,85 +607,1060 @@ class _CanvasManager(Widget):
 
     _model_name = Unicode("CanvasManagerModel").tag(sync=True)
 
+    #: (str) Encoding of the command stream sent to the front-end, possible values are ``'json'`` and ``'binary'``.
+    #: The ``'binary'`` encoding packs opcodes and numeric operands in typed arrays, which makes messages made of
+    #: path segments (``move_to``, ``line_to``, ``arc``...) about half as big. It is only used for these messages,
+    #: the others are not smaller in binary and are faster to encode in JSON. Default to ``'json'``.
+    command_encoding = Enum(["json", "binary"], default_value="json")
+
+    #: (bool) Automatically batch the draw commands sent outside of ``hold_canvas``. Commands are buffered and
+    #: sent in one message ``max_batch_latency`` seconds after the first one, when ``max_batch_bytes`` is reached,
+    #: or when ``flush`` is called. Default to ``False``.
+    auto_batch = Bool(False)
+
+    #: (float) Maximum time in seconds a draw command can stay in the auto-batching buffer. Default to one frame at 60Hz.
+    max_batch_latency = Float(1 / 60)
+
+    #: (int) Approximate size in bytes of the auto-batching buffer above which it is flushed. Default to 1MB.
+    max_batch_bytes = CInt(1 << 20)
+
+    #: (bool) Down-cast float64 array arguments to float32 before sending them, halving their size.
+    #: Default to ``False``.
+    downcast_float64 = Bool(False)
+
+    #: (Transport) Where the draw commands are sent. Default to a ``CommTransport`` sending them to the
+    #: front-end, use a ``RecordingTransport`` for capturing them without a front-end.
+    transport = Instance(Transport)
+
+    #: (int) Size in bytes of the front-end cache of array arguments. Arrays sent again (e.g. the constant colors
+    #: of a ``fill_styled_circles`` call made every frame) are then only sent once, the following commands
+    #: referring to them by the hash of their content. The kernel keeps a copy of the cached arrays for sending
+    #: them again to the clients missing them. Default to ``0``, disabling the cache.
+    resource_cache_size = CInt(0).tag(sync=True)
+
+    #: (int) Size in bytes under which array arguments are not cached, hashing them would cost more than
+    #: sending them. Default to 1kB.
+    resource_cache_min_bytes = CInt(1 << 10)
+
+    #: (int) Number of frames flushed with ``hold_canvas(async_flush=True)`` that can be waiting or being sent
+    #: while the next one is built. Flushing one more frame waits until the oldest one is sent. Default to ``1``,
+    #: one frame is sent while the next one is built. When ``backpressure`` is set, this is the number of frames
+    #: of ``hold_canvas`` blocks that can be sent before the front-end reports that it drew them.
+    max_frames_in_flight = CInt(1)
+
+    #: (str) What to do with a new frame when the front-end did not draw the previous ``max_frames_in_flight``
+    #: frames yet, possible values are:
+    #:
+    #: - ``'none'``: send it anyway, the front-end does not report the frames it drew.
+    #: - ``'block'``: wait until the front-end drew a frame before sending it. Only threads other than the main
+    #:   thread can wait, on the main thread await ``wait_for_frames()`` before drawing the frame, otherwise
+    #:   the frame is handled like with ``'drop_oldest'``, with a warning.
+    #: - ``'drop_oldest'``: keep it until the front-end drew a frame, replacing the frame kept so far.
+    #: - ``'skip'``: do not send it.
+    #:
+    #: Default to ``'none'``.
+    backpressure = Enum(["none", "block", "drop_oldest", "skip"], default_value="none")
+
+    #: (float) Time in seconds after which a frame the front-end did not report as drawn is not waited for
+    #: anymore, e.g. when no view of the canvas is displayed. Default to ``1``.
+    frame_ack_timeout = Float(1.0)
+
+    # Rough size of a draw command in the command stream, used for the auto-batching size bound
+    _COMMAND_SIZE_ESTIMATE = 32
+
+    # CanvasBuffer updates, which are shared by all the canvases
+    _BUFFER_COMMANDS = frozenset(
+        COMMANDS[name]
+        for name in ("setCanvasBuffer", "updateCanvasBuffer", "deleteCanvasBuffer")
+    )
+
+    # Commands that cannot be reordered with the commands of other canvases when batching
+    _ORDERED_COMMANDS = _BUFFER_COMMANDS | {COMMANDS["sleep"]}
+
+    # Commands of a dropped frame that the next frames may depend on
+    _KEPT_FRAME_COMMANDS = (
+        _BUFFER_COMMANDS | _STATE_COMMANDS | _PATH_COMMANDS | {COMMANDS["switchCanvas"]}
+    )
+
+    # Interval in seconds at which render loops check if the front-end drew enough frames
+    _FRAME_POLL_INTERVAL = 1 / 1000
+
+    # Commands taking widgets, which may be other canvases that must be drawn first
+    _WIDGET_COMMANDS = frozenset(
+        COMMANDS[name] for name in ("set", "drawImage", "drawImages")
+    )
+
     def __init__(self, *args, **kwargs):
-        self._caching = kwargs.get("caching", False)
-        self._commands_cache = []
-        self._buffers_cache = []
+        # Commands are batched per thread, and per context inside hold_canvas (e.g. per asyncio task),
+        # so that concurrent drawings build their own messages
+        self._thread_batch = threading.local()
+        self._held_batch = ContextVar("held_batch", default=None)
+        if kwargs.get("caching", False):
+            self._caching = True
+
+        # Messages ready to be sent: (first canvas, last canvas, commands, buffers, batched, counted, frame,
+        # client).
+        # Any thread can append to it, the one holding the send lock sends them in order
+        self._outbox = deque()
+        self._send_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        # Guards the drawing state the canvases know the front-end has, see Canvas._send_state_command
+        self._drawing_state_lock = threading.RLock()
+        # Thread sending the messages flushed asynchronously, started on first use
+        self._sender = None
+        self._sender_start_lock = threading.Lock()
+        self._outbox_ready = threading.Event()
+        # Number of messages flushed asynchronously and not sent yet
+        self._frames_in_flight = 0
+        self._frames_in_flight_changed = threading.Condition()
+
+        # Frames sent and not drawn yet by the front-end, when backpressure is set: id -> time sent
+        self._unacked_frames = OrderedDict()
+        self._frame_ids = count()
+        # Frame kept by the drop_oldest policy: ((first canvas, last canvas, commands, buffers), background)
+        self._pending_frame = None
+        # Canvas the front-end is drawing on, only used by the thread holding the send lock
         self._current_canvas = None
 
+        # Mirror of the front-end resource cache
+        self._resource_cache = _ResourceCache()
+
+        self.reset_stats()
+
         super(_CanvasManager, self).__init__()
 
+        self.on_msg(self._handle_frontend_message)
+
+    @property
+    def stats(self):
+        """Statistics about the draw commands sent since the last call to ``reset_stats``.
+
+        ``messages_saved`` is the number of comm messages that batching spared compared to sending
+        one message per command. ``bytes_copied`` and ``bytes_passed`` count the bytes of array
+        arguments that had to be converted and the ones sent without copy, ``last_flush_bytes_copied``
+        is the number of bytes copied for the latest message. ``resource_cache_hits`` and
+        ``resource_cache_misses`` count the cacheable arrays that were found in the front-end resource
+        cache or uploaded to it, ``resource_cache_bytes_saved`` the bytes that were not sent thanks to it,
+        ``resource_cache_resends`` the arrays sent again to a front-end missing them (e.g. a new client),
+        ``resource_cache_resets`` the number of times a missing array was not in the kernel cache anymore and
+        ``resource_cache_bytes`` the current size of the cache. ``canvas_buffer_bytes`` counts the bytes
+        sent for creating and updating ``CanvasBuffer`` objects. ``elided_sets`` is the number of drawing
+        state assignments (e.g. ``canvas.fill_style = "red"``) that were not sent because the front-end
+        already had the value. ``frames_in_flight_waits`` and ``frames_in_flight_wait_time`` count the times
+        and the seconds a flush waited for the previous frames to be sent, or drawn when ``backpressure`` is
+        ``'block'``. ``frames_skipped`` and ``frames_dropped`` count the frames not sent because of the
+        ``'skip'`` and ``'drop_oldest'`` policies, ``frames_timed_out`` the frames the front-end did not report
+        as drawn within ``frame_ack_timeout``.
+        """
+        elapsed = time.monotonic() - self._stats_start
+        stats = dict(self._stats)
+        stats["messages_saved"] = stats["commands"] - stats["messages"]
+        stats["resource_cache_bytes"] = self._resource_cache.nbytes
+        stats["elapsed"] = elapsed
+        stats["messages_saved_per_second"] = (
+            stats["messages_saved"] / elapsed if elapsed > 0 else 0.0
+        )
+        return stats
+
+    def reset_stats(self):
+        """Reset the statistics returned by ``stats``."""
+        self._stats = {
+            "messages": 0,
+            "commands": 0,
+            "bytes_copied": 0,
+            "bytes_passed": 0,
+            "last_flush_bytes_copied": 0,
+            "resource_cache_hits": 0,
+            "resource_cache_misses": 0,
+            "resource_cache_bytes_saved": 0,
+            "resource_cache_resends": 0,
+            "resource_cache_resets": 0,
+            "canvas_buffer_bytes": 0,
+            "elided_sets": 0,
+            "frames_in_flight_waits": 0,
+            "frames_in_flight_wait_time": 0.0,
+            "frames_skipped": 0,
+            "frames_dropped": 0,
+            "frames_timed_out": 0,
+        }
+        self._stats_start = time.monotonic()
+
+    def _batch(self):
+        """Return the batch of the current context: the hold_canvas block, or else the thread."""
+        batch = self._held_batch.get()
+        if batch is not None and batch.caching:
+            return batch
+
+        batch = getattr(self._thread_batch, "batch", None)
+        if batch is None:
+            batch = self._thread_batch.batch = _Batch()
+        return batch
+
+    @property
+    def _caching(self):
+        return self._batch().caching
+
+    @_caching.setter
+    def _caching(self, value):
+        self._batch().caching = value
+
+    @property
+    def _commands_cache(self):
+        return self._batch().commands
+
     def send_draw_command(self, canvas, name, args=[], buffers=[]):
         while len(args) and args[len(args) - 1] is None:
             args.pop()
+        if CanvasBuffer._live or CanvasBuffer._released:
+            self._sync_canvas_buffers(canvas, args)
         self.send_command(canvas, [name, args, len(buffers)], buffers)
 
-    def send_command(self, canvas, command, buffers=[]):
-        if self._caching:
-            if self._current_canvas is not canvas:
-                self._commands_cache.append(
-                    [
-                        COMMANDS["switchCanvas"],
-                        [widget_serialization["to_json"](canvas, None)],
-                    ]
+    def _sync_canvas_buffers(self, canvas, args):
+        """Send the changes of the CanvasBuffers used by a command before the command itself."""
+        while CanvasBuffer._released:
+            self.send_command(
+                canvas,
+                [COMMANDS["deleteCanvasBuffer"], [CanvasBuffer._released.pop()], 0],
+            )
+
+        for arg in args:
+            if not isinstance(arg, dict) or "canvas_buffer" not in arg:
+                continue
+
+            sync = CanvasBuffer._live[arg["canvas_buffer"]]._sync_command()
+            if sync is not None:
+                name, sync_args, sync_buffers = sync
+                self._stats["canvas_buffer_bytes"] += sum(
+                    buffer.nbytes for buffer in sync_buffers
+                )
+                self.send_command(
+                    canvas, [COMMANDS[name], sync_args, len(sync_buffers)], sync_buffers
                 )
-                self._current_canvas = canvas
-            self._commands_cache.append(command)
-            self._buffers_cache += buffers
 
+    def send_command(self, canvas, command, buffers=[]):
+        if canvas._retained_log is not None:
+            canvas._retained_log.record(command, buffers)
+        if canvas._image_slots:
+            # Something is drawn over the previous put_image_data images
+            canvas._image_slots = {}
+
+        batch = self._batch()
+        if not batch.caching and not self.auto_batch:
+            self._count_converted_bytes()
+            self._hand_off(canvas, canvas, [command], buffers)
             return
 
-        # TODO Send the switch and the message in one batch?
-        if self._current_canvas is not canvas:
-            self._send_custom(
-                [
-                    COMMANDS["switchCanvas"],
-                    [widget_serialization["to_json"](canvas, None)],
-                ]
+        with batch.lock:
+            # Batched commands are grouped by canvas, so that each canvas needs a single switchCanvas.
+            # Commands of different canvases can be reordered, unless one depends on the order
+            if command[0] in self._ORDERED_COMMANDS or (
+                command[0] in self._WIDGET_COMMANDS
+                and self._reads_other_canvas(canvas, command[1])
+            ):
+                self._merge_canvas_queues(batch)
+
+            queue = batch.canvas_queues.get(canvas)
+            if queue is None:
+                queue = batch.canvas_queues[canvas] = ([], [])
+            queue[0].append(command)
+            queue[1].extend(buffers)
+
+            if not batch.caching:
+                self._auto_batch(batch, buffers)
+
+    def _reads_other_canvas(self, canvas, args):
+        """Whether a command reads the pixels of another canvas, e.g. ``draw_image(other_canvas)``."""
+        for arg in args:
+            if not isinstance(arg, str) or not arg.startswith("IPY_MODEL_"):
+                continue
+
+            widget = widget_serialization["from_json"](arg, None)
+            if isinstance(widget, (Pattern, SpriteAtlas)):
+                widget = widget.image
+            if isinstance(widget, _CanvasBase) and widget is not canvas:
+                return True
+
+        return False
+
+    def _merge_canvas_queues(self, batch=None):
+        """Move the batched commands to the commands list, one canvas after the other."""
+        if batch is None:
+            batch = self._batch()
+
+        for canvas, (commands, buffers) in batch.canvas_queues.items():
+            if batch.first_canvas is None:
+                batch.first_canvas = canvas
+            elif batch.last_canvas is not canvas:
+                batch.commands.append(self._switch_command(canvas))
+            batch.last_canvas = canvas
+            batch.commands += commands
+            batch.buffers += buffers
+
+        batch.canvas_queues = {}
+
+    def flush(self):
+        """Flush the cached commands of the current thread, or of the current ``hold_canvas`` block."""
+        self._flush_batch(self._batch())
+
+    @property
+    def frames_in_flight(self):
+        """Number of frames sent and not drawn yet by the front-end when ``backpressure`` is set, otherwise
+        number of frames flushed with ``hold_canvas(async_flush=True)`` and not sent yet.
+        """
+        with self._frames_in_flight_changed:
+            if self.backpressure != "none":
+                self._expire_frames()
+                return len(self._unacked_frames)
+            return self._frames_in_flight
+
+    async def wait_for_frames(self):
+        """Wait until a new frame can be sent without waiting, when ``backpressure`` is ``'block'``.
+
+        Render loops running in the kernel event loop should await it before drawing a frame: the front-end
+        reports the frames it drew through the event loop, which blocking would prevent.
+        """
+        while True:
+            with self._frames_in_flight_changed:
+                if self.backpressure != "block" or self._has_frame_slot():
+                    return
+            await asyncio.sleep(self._FRAME_POLL_INTERVAL)
+
+    def wait_for_send(self, timeout=None):
+        """Wait until the queued messages are sent, e.g. the frames of ``hold_canvas(async_flush=True)``.
+
+        Return ``False`` if the messages are still being sent after ``timeout`` seconds.
+        """
+        self._send_pending_frame()
+
+        if not self._send_lock.acquire(timeout=-1 if timeout is None else timeout):
+            return False
+        try:
+            self._send_outbox()
+        finally:
+            self._send_lock.release()
+        return True
+
+    def _begin_scope(self, batch):
+        """Return the position in the batch of a hold_canvas block starting, for discarding its commands."""
+        self._merge_canvas_queues(batch)
+        return len(batch.commands), len(batch.buffers), batch.last_canvas
+
+    def _discard_scope(self, batch, scope):
+        """Drop the commands batched since the start of a hold_canvas block.
+
+        The CanvasBuffer updates are kept, the front-end must have the same buffers as the kernel.
+        """
+        self._merge_canvas_queues(batch)
+        n_commands, n_buffers, last_canvas = scope
+
+        commands = batch.commands[n_commands:]
+        remaining_buffers = batch.buffers[n_buffers:]
+        del batch.commands[n_commands:]
+        del batch.buffers[n_buffers:]
+
+        kept_commands, kept_buffers, canvases = self._filter_commands(
+            commands, remaining_buffers, self._BUFFER_COMMANDS
+        )
+        canvases.update((last_canvas, batch.first_canvas))
+        if not n_commands:
+            batch.first_canvas = None
+        batch.last_canvas = last_canvas
+        batch.commands += kept_commands
+        batch.buffers += kept_buffers
+
+        # The discarded commands may have changed the drawing state or covered put_image_data images,
+        # which the front-end will not see
+        for canvas in canvases:
+            if isinstance(canvas, Canvas):
+                canvas._image_slots = {}
+                canvas._reset_drawing_state()
+
+    @staticmethod
+    def _filter_commands(commands, buffers, kept_opcodes):
+        """Return the commands in ``kept_opcodes`` with their buffers, and the canvases switched to."""
+        kept_commands = []
+        kept_buffers = []
+        canvases = set()
+
+        for command in commands:
+            n_command_buffers = command[2] if len(command) > 2 else 0
+            command_buffers = buffers[:n_command_buffers]
+            buffers = buffers[n_command_buffers:]
+
+            if command[0] == COMMANDS["switchCanvas"]:
+                canvases.add(widget_serialization["from_json"](command[1][0], None))
+            if command[0] in kept_opcodes:
+                kept_commands.append(command)
+                kept_buffers += command_buffers
+
+        return kept_commands, kept_buffers, canvases
+
+    def _flush_batch(self, batch, background=False, frame=False):
+        # The lock is kept while handing off, so that the messages of the batch are sent in order
+        with batch.lock:
+            if batch.flush_handle is not None:
+                batch.flush_handle.cancel()
+                batch.flush_handle = None
+            batch.start = None
+
+            self._merge_canvas_queues(batch)
+            if not len(batch.commands):
+                return
+
+            self._count_converted_bytes()
+
+            commands, buffers = batch.commands, batch.buffers
+            first_canvas, last_canvas = batch.first_canvas, batch.last_canvas
+            batch.commands = []
+            batch.buffers = []
+            batch.first_canvas = batch.last_canvas = None
+
+            if frame and self.backpressure != "none":
+                self._send_frame(
+                    (first_canvas, last_canvas, commands, buffers), background
+                )
+                return
+
+            self._hand_off(
+                first_canvas,
+                last_canvas,
+                commands,
+                buffers,
+                batched=True,
+                background=background,
             )
-            self._current_canvas = canvas
 
-        self._send_custom(command, buffers)
+    def _send_frame(self, message, background):
+        """Send the message of a hold_canvas block, following the backpressure policy."""
+        policy = self.backpressure
+        if policy == "block" and threading.current_thread() is threading.main_thread():
+            # The front-end reports the frames it drew through the event loop of the main thread, waiting
+            # for them there would always last until the timeout
+            policy = "drop_oldest"
+
+        with self._frames_in_flight_changed:
+            if policy == "drop_oldest" and self._pending_frame is not None:
+                # The new frame replaces the one kept so far
+                self._stats["frames_dropped"] += 1
+                message = self._concat_messages(
+                    self._drop_frame(self._pending_frame[0], keep_images=True),
+                    message,
+                )
+                self._pending_frame = None
+
+            frame_id = None
+            if self._has_frame_slot():
+                frame_id = self._start_frame()
+            elif policy == "block":
+                start = time.monotonic()
+                self._frames_in_flight_changed.wait_for(
+                    self._has_frame_slot, timeout=self.frame_ack_timeout
+                )
+                self._stats["frames_in_flight_waits"] += 1
+                self._stats["frames_in_flight_wait_time"] += time.monotonic() - start
+
+                # Frames not drawn within the timeout are not waited for anymore
+                self._has_frame_slot()
+                frame_id = self._start_frame()
+            elif policy == "skip":
+                self._stats["frames_skipped"] += 1
+                message = self._drop_frame(message, keep_images=False)
+            else:
+                # The arrays may be modified while the frame waits
+                first_canvas, last_canvas, commands, buffers = message
+                self._pending_frame = (
+                    (first_canvas, last_canvas, commands, self._copy_buffers(buffers)),
+                    background,
+                )
 
-    def flush(self):
-        """Flush all the cached commands and clear the cache."""
-        if not self._caching or not len(self._commands_cache):
+                if self.backpressure == "block":
+                    warnings.warn(
+                        "backpressure='block' cannot wait for the front-end on the main thread, the frame "
+                        "is kept like with backpressure='drop_oldest'. Await manager.wait_for_frames() "
+                        "before drawing the frame or draw from another thread.",
+                        RuntimeWarning,
+                    )
+                return
+
+        if len(message[2]):
+            self._hand_off(
+                *message, batched=True, background=background, frame=frame_id
+            )
+
+    def _has_frame_slot(self):
+        self._expire_frames()
+        return len(self._unacked_frames) < max(self.max_frames_in_flight, 1)
+
+    def _start_frame(self):
+        frame_id = next(self._frame_ids)
+        self._unacked_frames[frame_id] = time.monotonic()
+        return frame_id
+
+    def _expire_frames(self):
+        expired = time.monotonic() - self.frame_ack_timeout
+        while self._unacked_frames:
+            frame_id, sent = next(iter(self._unacked_frames.items()))
+            if sent > expired:
+                break
+            del self._unacked_frames[frame_id]
+            self._stats["frames_timed_out"] += 1
+
+    def _send_pending_frame(self):
+        """Send the frame kept by the drop_oldest policy, if the front-end drew enough frames."""
+        with self._frames_in_flight_changed:
+            if self._pending_frame is None or not self._has_frame_slot():
+                return
+            message, background = self._pending_frame
+            self._pending_frame = None
+            frame_id = self._start_frame()
+
+        self._hand_off(*message, batched=True, background=background, frame=frame_id)
+
+    def _drop_frame(self, message, keep_images):
+        """Reduce a frame that will not be sent to the commands the next frames may depend on."""
+        first_canvas, last_canvas, commands, buffers = message
+
+        kept_opcodes = self._KEPT_FRAME_COMMANDS
+        if keep_images:
+            # The next frame may only send the regions of the images that changed since this one
+            kept_opcodes = kept_opcodes | {COMMANDS["putImageData"]}
+        kept_commands, kept_buffers, canvases = self._filter_commands(
+            commands, buffers, kept_opcodes
+        )
+
+        if not keep_images:
+            # The next put_image_data calls must send the whole images
+            canvases.add(first_canvas)
+            for canvas in canvases:
+                if isinstance(canvas, Canvas):
+                    canvas._image_slots = {}
+
+        return first_canvas, last_canvas, kept_commands, kept_buffers
+
+    def _concat_messages(self, message, next_message):
+        first_canvas, last_canvas, commands, buffers = message
+        next_first_canvas, next_last_canvas, next_commands, next_buffers = next_message
+        if not len(commands):
+            return next_message
+
+        commands = list(commands)
+        if next_first_canvas is not None and next_first_canvas is not last_canvas:
+            commands.append(self._switch_command(next_first_canvas))
+        if next_last_canvas is not None:
+            last_canvas = next_last_canvas
+
+        return (
+            first_canvas,
+            last_canvas,
+            commands + next_commands,
+            buffers + next_buffers,
+        )
+
+    def replay(self, canvas, commands, buffers=[], client=None):
+        """Reset the canvas and send it a list of commands in one message.
+
+        If ``client`` is given, only the front-end client with this id draws the message, the others keep
+        their view of the canvas.
+        """
+        self.flush()
+
+        self._hand_off(
+            None,
+            canvas,
+            [self._switch_command(canvas), [COMMANDS["resetCanvas"], [], 0]] + commands,
+            buffers,
+            batched=True,
+            client=client,
+        )
+
+    def _count_converted_bytes(self):
+        """Add the arrays converted for the message flushed by the current thread to the statistics.
+
+        The counters are read by the thread that converted the arrays, not by the thread sending the message.
+        """
+        bytes_copied = _BUFFER_CONVERTER.bytes_copied
+        bytes_passed = _BUFFER_CONVERTER.bytes_passed
+        _BUFFER_CONVERTER.reset_counters()
+
+        with self._stats_lock:
+            self._stats["bytes_copied"] += bytes_copied
+            self._stats["bytes_passed"] += bytes_passed
+            self._stats["last_flush_bytes_copied"] = bytes_copied
+
+    def _hand_off(
+        self,
+        first_canvas,
+        last_canvas,
+        commands,
+        buffers,
+        batched=False,
+        background=False,
+        frame=None,
+        client=None,
+    ):
+        """Queue a message for sending, and send the queued messages unless another thread is."""
+        # Frames waited for by the backpressure policy are counted until the front-end drew them
+        counted = background and frame is None
+        if background:
+            # The arrays may be modified, or the conversion buffers reused, while the message waits
+            buffers = self._copy_buffers(buffers)
+        if counted:
+            self._wait_for_frames_in_flight()
+
+        self._outbox.append(
+            (
+                first_canvas,
+                last_canvas,
+                commands,
+                buffers,
+                batched,
+                counted,
+                frame,
+                client,
+            )
+        )
+
+        if background:
+            self._start_sender()
+            self._outbox_ready.set()
             return
 
-        self._send_custom(self._commands_cache, self._buffers_cache)
+        # A thread that fails to take the lock leaves its message to the thread holding it. The outbox is
+        # checked again after releasing the lock, in case a message was queued in between
+        while self._outbox and self._send_lock.acquire(blocking=False):
+            try:
+                self._send_outbox()
+            finally:
+                self._send_lock.release()
+
+    @staticmethod
+    def _copy_buffers(buffers):
+        return [
+            buffer if memoryview(buffer).readonly else bytes(memoryview(buffer))
+            for buffer in buffers
+        ]
+
+    def _wait_for_frames_in_flight(self):
+        """Wait until a frame can be flushed asynchronously, then count it in flight."""
+        with self._frames_in_flight_changed:
+            if self._frames_in_flight >= max(self.max_frames_in_flight, 1):
+                start = time.monotonic()
+                self._frames_in_flight_changed.wait_for(
+                    lambda: self._frames_in_flight < max(self.max_frames_in_flight, 1)
+                )
+                self._stats["frames_in_flight_waits"] += 1
+                self._stats["frames_in_flight_wait_time"] += time.monotonic() - start
+            self._frames_in_flight += 1
+
+    def _send_outbox(self):
+        while self._outbox:
+            self._send_message(*self._outbox.popleft())
+
+    def _start_sender(self):
+        with self._sender_start_lock:
+            if self._sender is None or not self._sender.is_alive():
+                self._sender = threading.Thread(
+                    target=self._send_loop, name="ipycanvas-sender", daemon=True
+                )
+                self._sender.start()
+
+    def _send_loop(self):
+        while True:
+            self._outbox_ready.wait()
+            self._outbox_ready.clear()
+
+            while self._outbox and self._send_lock.acquire(blocking=False):
+                try:
+                    self._send_outbox()
+                except Exception:
+                    # The message is lost, but the following ones can still be sent
+                    traceback.print_exc()
+                finally:
+                    self._send_lock.release()
+
+    def _send_message(
+        self,
+        first_canvas,
+        last_canvas,
+        commands,
+        buffers,
+        batched,
+        counted,
+        frame,
+        client,
+    ):
+        if first_canvas is not None and first_canvas is not self._current_canvas:
+            commands = [self._switch_command(first_canvas)] + commands
+
+        if client is not None:
+            # The other clients do not draw the message, the client drawing it switches back to their canvas
+            if (
+                self._current_canvas is not None
+                and self._current_canvas is not last_canvas
+            ):
+                commands = commands + [self._switch_command(self._current_canvas)]
+            last_canvas = self._current_canvas
+
+        # While the message is sent, the current canvas is the one its first commands are drawn on
+        try:
+            if len(commands) == 1 and not batched:
+                self._send_custom(commands[0], buffers, client=client)
+            else:
+                self._send_custom(commands, buffers, frame, client)
+        except BaseException:
+            # The front-end may not have received the switches of the message
+            self._current_canvas = None
+            raise
+        else:
+            if last_canvas is not None:
+                self._current_canvas = last_canvas
+        finally:
+            if counted:
+                with self._frames_in_flight_changed:
+                    self._frames_in_flight -= 1
+                    self._frames_in_flight_changed.notify_all()
+
+    def _switch_command(self, canvas):
+        return [
+            COMMANDS["switchCanvas"],
+            [widget_serialization["to_json"](canvas, None)],
+            0,
+        ]
+
+    def _auto_batch(self, batch, buffers):
+        now = time.monotonic()
+
+        if batch.start is None:
+            batch.start = now
+            batch.nbytes = 0
+
+            # Flush from the event loop if there is one running (e.g. in a kernel), otherwise from a timer
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                batch.flush_handle = threading.Timer(
+                    self.max_batch_latency, self._auto_flush, (batch,)
+                )
+                batch.flush_handle.daemon = True
+                batch.flush_handle.start()
+            else:
+                batch.flush_handle = loop.call_later(
+                    self.max_batch_latency, self._auto_flush, batch
+                )
+
+        batch.nbytes += self._COMMAND_SIZE_ESTIMATE
+        for buffer in buffers:
+            batch.nbytes += memoryview(buffer).nbytes
+
+        # The event loop may be blocked by a long running cell, so we also check the bounds here
+        if (
+            batch.nbytes >= self.max_batch_bytes
+            or now - batch.start >= self.max_batch_latency
+        ):
+            self._flush_batch(batch)
+
+    def _auto_flush(self, batch):
+        with batch.lock:
+            batch.flush_handle = None
+
+            # Commands are held until the end of the hold_canvas block
+            if not batch.caching:
+                self._flush_batch(batch)
 
-        self._commands_cache = []
-        self._buffers_cache = []
+    @default("transport")
+    def _default_transport(self):
+        return CommTransport()
 
-    def _send_custom(self, command, buffers=[]):
-        metadata, command_buffer = commands_to_buffer(command)
-        self.send(metadata, buffers=[command_buffer] + buffers)
+    @observe("transport")
+    def _on_transport_change(self, change):
+        # The new transport does not know which canvas is drawn on, the next message switches to it
+        with self._send_lock:
+            self._current_canvas = None
+
+    @observe("downcast_float64")
+    def _on_downcast_float64_change(self, change):
+        _BUFFER_CONVERTER.downcast_float64 = change["new"]
+
+    @observe("resource_cache_size")
+    def _on_resource_cache_size_change(self, change):
+        # The front-end applies the same eviction when receiving the new size
+        self._resource_cache.resize(change["new"])
+
+    def _handle_frontend_message(self, _, content, buffers):
+        if content.get("event", "") == "client_ready":
+            # A new client starts with an empty cache and no CanvasBuffers, the next arrays are uploaded
+            # again for it
+            with self._send_lock:
+                self._resource_cache.clear()
+            for buffer in list(CanvasBuffer._live.values()):
+                buffer._uploaded = False
+        elif content.get("event", "") == "resource_cache_miss":
+            # A client does not have these arrays (e.g. it attached after they were sent), it waits for
+            # them before drawing the command using them
+            with self._send_lock:
+                self.transport.send(self, *self._resources_reply(content["keys"]))
+        elif content.get("event", "") == "canvas_buffer_miss":
+            # A client does not have this buffer (e.g. the page was reloaded), it waits for it before
+            # drawing the command using it
+            with self._send_lock:
+                self.transport.send(self, *self._canvas_buffer_reply(content["id"]))
+        elif content.get("event", "") == "frame_ack":
+            # The front-end drew the frames up to this one, in order
+            with self._frames_in_flight_changed:
+                while (
+                    self._unacked_frames
+                    and next(iter(self._unacked_frames)) <= content["frame"]
+                ):
+                    self._unacked_frames.popitem(last=False)
+                self._frames_in_flight_changed.notify_all()
+            self._send_pending_frame()
+
+    def _resources_reply(self, keys):
+        """Return the ``(metadata, buffers)`` of the message sending the cached arrays of ``keys`` again."""
+        found = []
+        missing = []
+        buffers = []
+        for key in keys:
+            buffer = self._resource_cache.get(key)
+            if buffer is None:
+                missing.append(key)
+            else:
+                found.append(key)
+                buffers.append(buffer)
+        self._stats["resource_cache_resends"] += len(found)
+
+        if missing:
+            # The arrays were evicted since, the commands using them are skipped and both caches start again
+            self._resource_cache.clear()
+            self._stats["resource_cache_resets"] += 1
+
+        return {"resources": found, "missing": missing}, buffers
+
+    def _canvas_buffer_reply(self, buffer_id):
+        """Return the ``(metadata, buffers)`` of the message sending the content of a CanvasBuffer again."""
+        buffer = CanvasBuffer._live.get(buffer_id)
+        if buffer is None:
+            # The buffer was garbage collected, the commands using it are skipped
+            return {"canvas_buffer": buffer_id, "missing": True}, []
+
+        self._stats["canvas_buffer_bytes"] += buffer.nbytes
+        metadata = {
+            "canvas_buffer": buffer_id,
+            "shape": buffer.shape,
+            "dtype": str(buffer.dtype),
+            "idx": 0,
+        }
+        return metadata, [np.array(buffer._array)]
+
+    def _cache_resources(self, commands, buffers):
+        """Replace the array arguments found in the front-end resource cache by their key."""
+        cached_commands = []
+        cached_buffers = []
+        remaining_buffers = buffers
+        for command in commands:
+            n_buffers = command[2] if len(command) > 2 else 0
+            command_buffers = remaining_buffers[:n_buffers]
+            remaining_buffers = remaining_buffers[n_buffers:]
+
+            if n_buffers:
+                command, command_buffers = self._cache_command_resources(
+                    command, command_buffers
+                )
+            cached_commands.append(command)
+            cached_buffers += command_buffers
+
+        return cached_commands, cached_buffers + remaining_buffers
+
+    def _cache_command_resources(self, command, buffers):
+        name, args, n_buffers = command
+
+        # Only commands whose buffers are all described by an argument can be rewritten
+        indices = sorted(
+            arg["idx"] for arg in args if isinstance(arg, dict) and "idx" in arg
+        )
+        if indices != list(range(n_buffers)):
+            return command, buffers
+
+        # The arguments are copied, the commands may also be kept by the retained log
+        cached_args = []
+        cached_buffers = []
+        for arg in args:
+            if isinstance(arg, dict) and "idx" in arg:
+                buffer = buffers[arg["idx"]]
+                nbytes = memoryview(buffer).nbytes
+                arg = dict(arg)
+
+                if self.resource_cache_min_bytes <= nbytes <= self.resource_cache_size:
+                    arg["key"] = _ResourceCache.key(buffer)
+
+                    if self._resource_cache.get(arg["key"]) is not None:
+                        del arg["idx"]
+                        cached_args.append(arg)
+                        self._stats["resource_cache_hits"] += 1
+                        self._stats["resource_cache_bytes_saved"] += nbytes
+                        continue
+
+                    # The array may be modified afterwards, the kernel keeps a copy for sending it again
+                    self._resource_cache.put(
+                        arg["key"], bytes(memoryview(buffer)), nbytes
+                    )
+                    self._stats["resource_cache_misses"] += 1
+
+                arg["idx"] = len(cached_buffers)
+                cached_buffers.append(buffer)
+            cached_args.append(arg)
+
+        return [name, cached_args, len(cached_buffers)], cached_buffers
+
+    @staticmethod
+    def _binary_pays_off(commands):
+        """Whether most commands of a message are path segments, checked on a sample of the commands."""
+        if not len(commands) or not isinstance(commands[0], list):
+            return False
+
+        sample = commands[:: max(len(commands) // 64, 1)]
+        n_segments = sum(command[0] in _PATH_SEGMENT_COMMANDS for command in sample)
+        return 2 * n_segments >= len(sample)
+
+    def _send_custom(self, command, buffers=[], frame=None, client=None):
+        # The arrays sent to a single client cannot be cached, the other clients would not have them
+        if self.resource_cache_size > 0 and len(buffers) and client is None:
+            if len(command) and isinstance(command[0], list):
+                command, buffers = self._cache_resources(command, buffers)
+            else:
+                [command], buffers = self._cache_resources([command], buffers)
+
+        encoding = self.command_encoding
+        if encoding == "binary" and not self._binary_pays_off(command):
+            encoding = "json"
+
+        metadata, command_buffer = commands_to_buffer(command, encoding)
+        if frame is not None:
+            # The front-end reports when it drew the frame
+            metadata["frame"] = frame
+        if client is not None:
+            metadata["client"] = client
+        self.transport.send(self, metadata, [command_buffer] + buffers)
+
+        self._stats["messages"] += 1
+        if len(command) and isinstance(command[0], list):
+            self._stats["commands"] += len(command)
+        else:
+            self._stats["commands"] += 1
 
 
 # Main canvas manager
 _CANVAS_MANAGER = _CanvasManager()
 
 
+def get_canvas_manager():
+    """Return the canvas manager in charge of sending the draw commands to the front-end.
+
+    Its attributes configure how the draw commands are sent, e.g.
+    ``get_canvas_manager().command_encoding = "binary"``.
+    """
+    return _CANVAS_MANAGER
+
+
 class Path2D(Widget):
     """Create a Path2D.
 
     Args:
         value (str): The path value, e.g. "M10 10 h 80 v 80 h -80 Z"
+        opcodes (list or NumPy array): The path opcodes, e.g. ``Path2D.MOVE_TO``, see ``Path2D.from_arrays``
+        coords (list or NumPy array): The coordinates taken by the opcodes, in order
     """
 
+    # Path opcodes, followed by the coordinates they take
+    MOVE_TO = 0  # x, y
+    LINE_TO = 1  # x, y
+    QUADRATIC_CURVE_TO = 2  # cpx, cpy, x, y
+    BEZIER_CURVE_TO = 3  # cp1x, cp1y, cp2x, cp2y, x, y
+    ARC = 4  # x, y, radius, start_angle, end_angle, anticlockwise
+    ARC_TO = 5  # x1, y1, x2, y2, radius
+    ELLIPSE = 6  # x, y, radius_x, radius_y, rotation, start, end, anticlockwise
+    RECT = 7  # x, y, width, height
+    CLOSE_PATH = 8
+
     _model_module = Unicode(module_name).tag(sync=True)
     _model_module_version = Unicode(module_version).tag(sync=True)
 
     _model_name = Unicode("Path2DModel").tag(sync=True)
 
     value = Unicode(allow_none=False, read_only=True).tag(sync=True)
+    opcodes = Bytes(default_value=None, allow_none=True, read_only=True).tag(
+        sync=True, **bytes_serialization
+    )
+    coords = Bytes(default_value=None, allow_none=True, read_only=True).tag(
+        sync=True, **bytes_serialization
+    )
 
-    def __init__(self, value):
-        """Create a Path2D object given the path string."""
+    def __init__(self, value="", opcodes=None, coords=None):
+        """Create a Path2D object given the path string, or the path opcodes and coordinates."""
         self.set_trait("value", value)
+        if opcodes is not None:
+            opcodes, coords = path_arrays(opcodes, coords)
+            self.set_trait("opcodes", opcodes.tobytes())
+            self.set_trait("coords", coords.tobytes())
 
         super(Path2D, self).__init__()
 
+    @classmethod
+    def from_polygons(cls, points, points_per_polygon=None):
+        """Create a Path2D made of closed polygons.
+
+        ``points`` and ``points_per_polygon`` are given like for ``Canvas.fill_polygons``, a single (n, 2)
+        array is one polygon.
+        """
+        return cls._from_items(points, points_per_polygon, True, "polygon")
+
+    @classmethod
+    def from_polylines(cls, points, points_per_polyline=None):
+        """Create a Path2D made of open polylines.
+
+        ``points`` and ``points_per_polyline`` are given like for ``Canvas.stroke_line_segments``, a single
+        (n, 2) array is one polyline.
+        """
+        return cls._from_items(points, points_per_polyline, False, "polyline")
+
+    @classmethod
+    def _from_items(cls, points, points_per_item, closed, item_name):
+        if (
+            isinstance(points, np.ndarray)
+            and points.ndim == 2
+            and points_per_item is None
+        ):
+            points_per_item = [len(points)]
+
+        n_items, flat_points, points_per_item = (
+            _serialize_list_of_polygons_or_linestrokes(
+                points=points,
+                points_per_item=points_per_item,
+                item_name=item_name,
+                min_elements=3 if closed else 2,
+            )
+        )
+
+        # One move_to per item followed by line_to, and a close_path after each polygon
+        sizes = np.broadcast_to(np.asarray(points_per_item, dtype=np.int64), n_items)
+        opcodes = np.full(int(sizes.sum()), cls.LINE_TO, dtype=np.uint8)
+        ends = np.cumsum(sizes)
+        opcodes[(ends - sizes)[sizes > 0]] = cls.MOVE_TO
+        if closed:
+            opcodes = np.insert(opcodes, ends, cls.CLOSE_PATH)
+
+        return cls.from_arrays(opcodes, flat_points)
+
+    @classmethod
+    def from_arrays(cls, opcodes, coords):
+        """Create a Path2D from an array of opcodes and an array of coordinates.
+
+        Each opcode (``Path2D.MOVE_TO``, ``Path2D.LINE_TO``...) takes the next coordinates of ``coords``, in
+        the order of the matching path method arguments. ``coords`` can be flat or e.g. a (n, 2) array when
+        all the opcodes take two coordinates.
+        """
+        return cls(opcodes=opcodes, coords=coords)
+
 
 class Pattern(Widget):
     """Create a Pattern.
@@ -322,6 +1701,61 @@ class Pattern(Widget):
         return self.image._ipython_display_(*args, **kwargs)
 
 
+class SpriteAtlas(Widget):
+    """Create a SpriteAtlas, an image containing many sprites that can be drawn in batch with ``Canvas.draw_images``.
+
+    Args:
+        image (Canvas or MultiCanvas or ipywidgets.Image): The image containing the sprites (sprite sheet)
+        rects (list or NumPy array): The (n, 4) source rectangles ``(x, y, width, height)`` of the sprites in the image,
+            the index of a rectangle is the index of the sprite
+    """
+
+    _model_module = Unicode(module_name).tag(sync=True)
+    _model_module_version = Unicode(module_version).tag(sync=True)
+
+    _model_name = Unicode("SpriteAtlasModel").tag(sync=True)
+
+    image = Union(
+        (
+            Instance(Image),
+            Instance("ipycanvas.Canvas"),
+            Instance("ipycanvas.MultiCanvas"),
+        ),
+        allow_none=False,
+        read_only=True,
+    ).tag(sync=True, **widget_serialization)
+    rects = List(read_only=True).tag(sync=True)
+
+    def __init__(self, image, rects):
+        """Create a SpriteAtlas object given the image and the source rectangles of the sprites."""
+        rects = np.asarray(rects, dtype=np.float64).reshape((-1, 4))
+
+        self.set_trait("image", image)
+        self.set_trait("rects", rects.tolist())
+
+        super(SpriteAtlas, self).__init__()
+
+    @classmethod
+    def from_grid(cls, image, sprite_width, sprite_height, columns, rows):
+        """Create a SpriteAtlas from an image made of ``rows`` rows of ``columns`` sprites of the same size.
+
+        The sprites are indexed row by row, starting from the top-left one.
+        """
+        y, x = np.divmod(np.arange(columns * rows), columns)
+        rects = np.column_stack(
+            (
+                x * sprite_width,
+                y * sprite_height,
+                np.full(len(x), sprite_width),
+                np.full(len(x), sprite_height),
+            )
+        )
+        return cls(image, rects)
+
+    def __len__(self):
+        return len(self.rects)
+
+
 class _CanvasGradient(Widget):
     _model_module = Unicode(module_name).tag(sync=True)
     _model_module_version = Unicode(module_version).tag(sync=True)
@@ -416,35 +1850,135 @@ class _CanvasBase(DOMWidget):
         sync=True, **bytes_serialization
     )
 
+    #: (str) How the image is synchronized when ``sync_image_data`` is ``True``: ``"png"`` sends the whole
+    #: image PNG encoded and updates ``image_data``, ``"tiles"`` only sends the 64x64 tiles that changed
+    #: as raw RGBA pixels and leaves ``image_data`` untouched. Default to ``"png"``.
+    image_data_sync_mode = Enum(["png", "tiles"], default_value="png").tag(sync=True)
+
+    #: (str) Compression of the tiles sent in ``"tiles"`` mode, ``"none"`` or ``"deflate"``. The front-end
+    #: falls back to ``"none"`` if the browser does not support compression. Default to ``"none"``.
+    image_data_compression = Enum(["none", "deflate"], default_value="none").tag(
+        sync=True
+    )
+
+    #: (int) Maximum number of ``mouse_move`` and ``touch_move`` messages per second sent by the front-end, the
+    #: move events happening in between are coalesced (see ``event_coalescing``). ``0`` means no limit.
+    #: Default to ``0``.
+    max_event_rate = CInt(0).tag(sync=True)
+
+    #: (str) How the mouse move events are coalesced when ``max_event_rate`` is set: ``"latest"`` only sends the latest
+    #: position, ``"batch"`` also sends all the intermediate positions (see ``on_mouse_move_batch``).
+    #: Touch move events always only send the latest touches. Default to ``"latest"``.
+    event_coalescing = Enum(["latest", "batch"], default_value="latest").tag(sync=True)
+
+    #: (bool) Keep a log of the draw commands and replay it automatically to new clients (see ``on_client_ready``).
+    #: Default to ``False``.
+    retain_commands = Bool(False)
+
+    #: (int) Maximum number of commands kept in the retained log. Default to ``100000``.
+    max_retained_commands = CInt(100_000)
+
+    #: (int) Maximum size in bytes of the retained log, including binary buffers. Default to 64MB.
+    max_retained_bytes = CInt(64 << 20)
+
+    _framebuffer = None
+    # Whether an array returned by get_image_data views the framebuffer, which must then be copied on write
+    _framebuffer_shared = False
+    _image_array = None
+
+    def __init__(self, *args, **kwargs):
+        super(_CanvasBase, self).__init__(*args, **kwargs)
+
+        self.on_msg(self._handle_image_tiles)
+
+    @observe("image_data")
+    def _on_image_data_change(self, change):
+        self._image_array = None
+
+    def _handle_image_tiles(self, _, content, buffers):
+        if content.get("event", "") != "image_tiles":
+            return
+
+        width = content["width"]
+        height = content["height"]
+        if self._framebuffer is None or self._framebuffer.shape[:2] != (height, width):
+            self._framebuffer = np.zeros((height, width, 4), dtype=np.uint8)
+            self._framebuffer_shared = False
+        elif self._framebuffer_shared:
+            # The arrays already returned keep showing the image they were taken from
+            self._framebuffer = self._framebuffer.copy()
+            self._framebuffer_shared = False
+
+        data = buffers[0]
+        if content.get("compression", "none") == "deflate":
+            data = zlib.decompress(data)
+        data = np.frombuffer(data, dtype=np.uint8)
+
+        offset = 0
+        for x, y, tile_width, tile_height in content["tiles"]:
+            size = tile_width * tile_height * 4
+            self._framebuffer[y : y + tile_height, x : x + tile_width] = data[
+                offset : offset + size
+            ].reshape((tile_height, tile_width, 4))
+            offset += size
+
+    def _synced_image_data(self):
+        """Return the synchronized image as a read-only NumPy array, or ``None`` if there is none."""
+        if self.image_data_sync_mode == "tiles":
+            if self._framebuffer is None:
+                return None
+
+            image_data = self._framebuffer.view()
+            image_data.flags.writeable = False
+            self._framebuffer_shared = True
+            return image_data
+
+        if self.image_data is None:
+            return None
+
+        # The decoded image is cached until ``image_data`` changes
+        if self._image_array is None:
+            image_array = image_bytes_to_array(self.image_data)
+            image_array.flags.writeable = False
+            self._image_array = image_array
+
+        return self._image_array
+
     def to_file(self, filename):
         """Save the current Canvas image to a PNG file.
 
-        This will raise an exception if there is no image to save (_e.g._ if ``image_data`` is ``None``).
+        This will raise an exception if there is no image to save (_e.g._ if ``image_data`` is ``None``
+        and the transport of the canvas manager cannot compute the image).
         """
-        if self.image_data is None:
+        if not filename.endswith(".png") and not filename.endswith(".PNG"):
+            raise RuntimeError("Can only save to a PNG file")
+
+        if self.image_data is not None and self.image_data_sync_mode == "png":
+            with open(filename, "wb") as fobj:
+                fobj.write(self.image_data)
+            return
+
+        image_data = self._synced_image_data()
+        if image_data is None:
+            image_data = self._canvas_manager.transport.get_image_data(self)
+        if image_data is None:
             raise RuntimeError(
                 "No image data to save, please be sure that ``sync_image_data`` is set to True"
             )
-        if not filename.endswith(".png") and not filename.endswith(".PNG"):
-            raise RuntimeError("Can only save to a PNG file")
 
         with open(filename, "wb") as fobj:
-            fobj.write(self.image_data)
+            fobj.write(binary_image(image_data))
 
     def get_image_data(self, x=0, y=0, width=None, height=None):
         """Return a NumPy array representing the underlying pixel data for a specified portion of the canvas.
 
         This will throw an error if there is no ``image_data`` to retrieve, this happens when nothing was drawn yet or
-        when the ``sync_image_data`` attribute is not set to ``True``.
+        when the ``sync_image_data`` attribute is not set to ``True``, unless the transport of the canvas manager can
+        compute the image (_e.g._ the ``RasterizingTransport``).
         The returned value is a NumPy array containing the image data for the rectangle of the canvas specified. The
         coordinates of the rectangle's top-left corner are (``x``, ``y``), while the coordinates of the bottom corner
         are (``x + width``, ``y + height``).
         """
-        if self.image_data is None:
-            raise RuntimeError(
-                "No image data, please be sure that ``sync_image_data`` is set to True"
-            )
-
         x = int(x)
         y = int(y)
 
@@ -456,7 +1990,14 @@ class _CanvasBase(DOMWidget):
         width = int(width)
         height = int(height)
 
-        image_data = image_bytes_to_array(self.image_data)
+        image_data = self._synced_image_data()
+        if image_data is None:
+            image_data = self._canvas_manager.transport.get_image_data(self)
+        if image_data is None:
+            raise RuntimeError(
+                "No image data, please be sure that ``sync_image_data`` is set to True"
+            )
+
         return image_data[y : y + height, x : x + width]
 
 
@@ -584,10 +2125,16 @@ class Canvas(_CanvasBase):
     #: (float) Specifies where to start a dash array on a line. Default is ``0.``.
     line_dash_offset = Float(0.0)
 
+    #: (bool) Only send the parts of a ``put_image_data`` image that changed since the previous image drawn at the
+    #: same position with the same shape, if nothing else was drawn on the Canvas in between. Only opaque images
+    #: benefit from it. Default to ``False``.
+    delta_image_data = Bool(False)
+
     _client_ready_callbacks = Instance(CallbackDispatcher, ())
 
     _mouse_wheel_callbacks = Instance(CallbackDispatcher, ())
     _mouse_move_callbacks = Instance(CallbackDispatcher, ())
+    _mouse_move_batch_callbacks = Instance(CallbackDispatcher, ())
     _mouse_down_callbacks = Instance(CallbackDispatcher, ())
     _mouse_up_callbacks = Instance(CallbackDispatcher, ())
     _mouse_out_callbacks = Instance(CallbackDispatcher, ())
@@ -598,6 +2145,29 @@ class Canvas(_CanvasBase):
     _touch_cancel_callbacks = Instance(CallbackDispatcher, ())
 
     _key_down_callbacks = Instance(CallbackDispatcher, ())
+    _key_up_callbacks = Instance(CallbackDispatcher, ())
+
+    # Front-end events forwarded to callbacks: event name -> (callbacks attribute, function returning the callback args)
+    _EVENT_CALLBACKS = {
+        "mouse_down": ("_mouse_down_callbacks", _position_event_args),
+        "mouse_up": ("_mouse_up_callbacks", _position_event_args),
+        "mouse_out": ("_mouse_out_callbacks", _position_event_args),
+        "mouse_wheel": ("_mouse_wheel_callbacks", _position_event_args),
+        "touch_start": ("_touch_start_callbacks", _touch_event_args),
+        "touch_end": ("_touch_end_callbacks", _touch_event_args),
+        "touch_move": ("_touch_move_callbacks", _touch_event_args),
+        "touch_cancel": ("_touch_cancel_callbacks", _touch_event_args),
+        "key_down": ("_key_down_callbacks", _key_event_args),
+        "key_up": ("_key_up_callbacks", _key_event_args),
+    }
+
+    _retained_log = None
+
+    # Last opaque image drawn by put_image_data for each (x, y, shape) slot, when delta_image_data is set
+    _image_slots = {}
+
+    # Whether a fill_rect covering the canvas with an opaque color hides everything drawn before
+    _fill_rect_covers_canvas = True
 
     ATTRS = {
         "fill_style": 0,
@@ -623,6 +2193,11 @@ class Canvas(_CanvasBase):
 
     def __init__(self, *args, **kwargs):
         """Create a Canvas widget."""
+        # Drawing state of the front-end context as far as we know it: attribute -> last value sent,
+        # and the states saved by save()
+        self._drawing_state = {}
+        self._drawing_state_stack = []
+
         super(Canvas, self).__init__(*args, **kwargs)
 
         if "caching" in kwargs:
@@ -633,8 +2208,52 @@ class Canvas(_CanvasBase):
                 DeprecationWarning,
             )
 
+        self._event_handlers = {
+            event: partial(_dispatch_event, getattr(self, callbacks), get_args)
+            for event, (callbacks, get_args) in self._EVENT_CALLBACKS.items()
+        }
+        self._event_handlers["client_ready"] = self._handle_client_ready
+        self._event_handlers["mouse_move"] = self._handle_mouse_move
+        self._event_callbacks = {}
+        self._event_queues = []
+
         self.on_msg(self._handle_frontend_event)
 
+    @observe("retain_commands")
+    def _on_retain_commands_change(self, change):
+        self._retained_log = _RetainedLog(self) if change["new"] else None
+
+    @observe("width", "height", "delta_image_data")
+    def _on_image_slots_change(self, change):
+        self._image_slots = {}
+
+    @observe("width", "height")
+    def _on_size_change(self, change):
+        # Resizing the front-end canvas resets its drawing state
+        self._reset_drawing_state()
+
+    def _reset_drawing_state(self):
+        with self._canvas_manager._drawing_state_lock:
+            self._drawing_state = {}
+            self._drawing_state_stack = []
+
+    def _send_state_command(self, key, command):
+        """Send a command setting the drawing state attribute ``key``, unless it would not change its value."""
+        manager = self._canvas_manager
+        value = command[1][-1]
+
+        # The command is sent under the lock, so that the values are sent in the order they are recorded
+        with manager._drawing_state_lock:
+            if key in self._drawing_state:
+                current = self._drawing_state[key]
+                if type(current) is type(value) and current == value:
+                    with manager._stats_lock:
+                        manager._stats["elided_sets"] += 1
+                    return
+
+            self._drawing_state[key] = value
+            manager.send_command(self, command)
+
     def sleep(self, time):
         """Make the Canvas sleep for `time` milliseconds."""
         self._canvas_manager.send_draw_command(self, COMMANDS["sleep"], [time])
@@ -1264,16 +2883,16 @@ class Canvas(_CanvasBase):
         else:
             self._canvas_manager.send_draw_command(self, COMMANDS["stroke"])
 
-    def fill(self, rule_or_path="nonzero"):
+    def fill(self, rule_or_path="nonzero", rule="nonzero"):
         """Fill the current path with the current ``fill_style`` and given the rule, or fill the given Path2D.
 
-        Possible rules are ``nonzero`` and ``evenodd``.
+        Possible rules are ``nonzero`` and ``evenodd``. When filling a Path2D, the rule is given by ``rule``.
         """
         if isinstance(rule_or_path, Path2D):
             self._canvas_manager.send_draw_command(
                 self,
                 COMMANDS["fillPath"],
-                [widget_serialization["to_json"](rule_or_path, None)],
+                [widget_serialization["to_json"](rule_or_path, None), rule],
             )
         else:
             self._canvas_manager.send_draw_command(
@@ -1361,6 +2980,25 @@ class Canvas(_CanvasBase):
             self, COMMANDS["bezierCurveTo"], [cp1x, cp1y, cp2x, cp2y, x, y]
         )
 
+    def path_from_arrays(self, opcodes, coords):
+        """Add the segments given by an array of opcodes and an array of coordinates to the current path.
+
+        This is the batch version of the path methods: each opcode (``Path2D.MOVE_TO``, ``Path2D.LINE_TO``...)
+        takes the next coordinates of ``coords``, in the order of the matching path method arguments.
+        The whole path is sent in a single command.
+        """
+        opcodes, coords = path_arrays(opcodes, coords)
+
+        args = []
+        buffers = []
+
+        populate_args(opcodes, args, buffers)
+        populate_args(coords, args, buffers)
+
+        self._canvas_manager.send_draw_command(
+            self, COMMANDS["pathFromArrays"], args, buffers
+        )
+
     # Text methods
     def fill_text(self, text, x, y, max_width=None):
         """Fill a given text at the given ``(x, y)`` position. Optionally with a maximum width to draw."""
@@ -1374,6 +3012,69 @@ class Canvas(_CanvasBase):
             self, COMMANDS["strokeText"], [text, x, y, max_width]
         )
 
+    def fill_texts(self, texts, x, y, color=None, alpha=1, font=None, max_width=None):
+        """Fill many texts at the given ``(x, y)`` positions in one command.
+
+        ``texts`` is a sequence of strings (or a single string drawn at every position), ``x``, ``y``, ``alpha`` and
+        ``max_width`` are NumPy arrays, lists or scalar values. ``color`` is an optional (n x 3) NumPy array with the color
+        of each text, the current ``fill_style`` is used otherwise. ``font`` is an optional CSS font, or a sequence with
+        the font of each text. Repeated texts and fonts are only sent once.
+        """
+        self._draw_texts(
+            COMMANDS["fillTexts"], texts, x, y, color, alpha, font, max_width
+        )
+
+    def stroke_texts(self, texts, x, y, color=None, alpha=1, font=None, max_width=None):
+        """Stroke many texts at the given ``(x, y)`` positions in one command.
+
+        ``texts`` is a sequence of strings (or a single string drawn at every position), ``x``, ``y``, ``alpha`` and
+        ``max_width`` are NumPy arrays, lists or scalar values. ``color`` is an optional (n x 3) NumPy array with the color
+        of each text, the current ``stroke_style`` is used otherwise. ``font`` is an optional CSS font, or a sequence with
+        the font of each text. Repeated texts and fonts are only sent once.
+        """
+        self._draw_texts(
+            COMMANDS["strokeTexts"], texts, x, y, color, alpha, font, max_width
+        )
+
+    def _draw_texts(self, cmd, texts, x, y, color, alpha, font, max_width):
+        # The number of texts is the length of the arrays, use fill_text or stroke_text for a single text
+        if isinstance(texts, str) and not any(
+            isinstance(value, (list, np.ndarray, CanvasBuffer)) for value in (x, y)
+        ):
+            raise TypeError(
+                "At least one of texts, x and y should be a list or an array of values"
+            )
+
+        if isinstance(texts, str):
+            strings, indices = [texts], 0
+        else:
+            strings, indices = string_table(texts)
+
+        args = [strings]
+        buffers = []
+
+        populate_args(indices, args, buffers)
+        populate_args(x, args, buffers)
+        populate_args(y, args, buffers)
+
+        if color is None:
+            args.append(None)
+        else:
+            populate_args(color, args, buffers)
+        populate_args(alpha, args, buffers)
+
+        if font is None or isinstance(font, str):
+            args.append(font)
+            args.append(None)
+        else:
+            fonts, font_indices = string_table(font)
+            args.append(fonts)
+            populate_args(font_indices, args, buffers)
+
+        populate_args(max_width, args, buffers)
+
+        self._canvas_manager.send_draw_command(self, cmd, args, buffers)
+
     # Line methods
     def get_line_dash(self):
         """Return the current line dash pattern array containing an even number of non-negative numbers."""
@@ -1385,8 +3086,8 @@ class Canvas(_CanvasBase):
             self._line_dash = segments + segments
         else:
             self._line_dash = segments
-        self._canvas_manager.send_draw_command(
-            self, COMMANDS["setLineDash"], [self._line_dash]
+        self._send_state_command(
+            "line_dash", [COMMANDS["setLineDash"], [self._line_dash], 0]
         )
 
     # Image methods
@@ -1406,14 +3107,119 @@ class Canvas(_CanvasBase):
             self, COMMANDS["drawImage"], [serialized_image, x, y, width, height]
         )
 
-    def put_image_data(self, image_data, x=0, y=0):
+    def draw_images(self, atlas, indices, x, y, scale=1, rotation=0, alpha=1):
+        """Draw many sprites of a ``SpriteAtlas`` in one command.
+
+        The sprite ``indices[i]`` of the atlas is drawn centered at (``x[i]``, ``y[i]``), scaled by ``scale[i]``,
+        rotated by ``rotation[i]`` radians around its center, with an opacity of ``alpha[i]`` (multiplied by
+        ``global_alpha``). All arguments but ``atlas`` are NumPy arrays, lists or scalar values.
+        """
+        if not isinstance(atlas, SpriteAtlas):
+            raise TypeError("The atlas argument should be a SpriteAtlas")
+
+        args = [widget_serialization["to_json"](atlas, None)]
+        buffers = []
+
+        populate_args(indices, args, buffers)
+        populate_args(x, args, buffers)
+        populate_args(y, args, buffers)
+        populate_args(scale, args, buffers)
+        populate_args(rotation, args, buffers)
+        populate_args(alpha, args, buffers)
+
+        self._canvas_manager.send_draw_command(
+            self, COMMANDS["drawImages"], args, buffers
+        )
+
+    def put_image_data(
+        self, image_data, x=0, y=0, codec="auto", quality=75, compress_level=6
+    ):
         """Draw an image on the Canvas.
 
         ``image_data`` should be  a NumPy array containing the image to draw and ``x`` and ``y`` the pixel position where to
         draw. Unlike the CanvasRenderingContext2D.putImageData method, this method **is** affected by the canvas transformation
         matrix, and supports transparency.
+
+        ``codec`` selects how the image is sent to the front-end:
+
+        - ``"raw"``: uncompressed RGBA pixels, a contiguous RGBA uint8 array is sent without any copy. This is the
+          fastest codec for local kernels and frames that change every time (videos, heatmaps).
+        - ``"png"``: lossless, ``compress_level`` goes from 0 (fastest) to 9 (smallest).
+        - ``"jpeg"`` and ``"webp"``: lossy with the given ``quality``, a quality of 100 gives a lossless WebP image.
+          JPEG does not support transparency.
+        - ``"auto"`` (default): JPEG for RGB images and PNG otherwise.
+
+        If ``delta_image_data`` is set, only the regions that changed since the previous image drawn at the same
+        position are sent. The whole image is always sent while ``global_alpha`` is not 1 or
+        ``global_composite_operation`` is not ``"source-over"``.
         """
-        image_buffer = binary_image(image_data)
+        if not self.delta_image_data:
+            self._put_image_data(image_data, x, y, codec, quality, compress_level)
+            return
+
+        image_data = np.asarray(image_data)
+        key = (x, y, image_data.shape)
+
+        # Sending any command invalidates the slots, keep the ones that do not overlap with this image
+        slots = {
+            slot: previous
+            for slot, previous in self._image_slots.items()
+            if slot == key or not _rects_overlap(slot, key)
+        }
+        previous = slots.pop(key, None)
+
+        # The pixels drawn with transparency or another composite operation depend on the ones below
+        replaces_pixels = (
+            self._drawing_state.get("global_alpha", 1.0) == 1
+            and self._drawing_state.get("global_composite_operation", "source-over")
+            == "source-over"
+        )
+
+        rects = None
+        if previous is not None and replaces_pixels:
+            rects = changed_rects(previous, image_data)
+
+            # Sending the whole image is cheaper than sending many regions covering most of it
+            changed_area = sum(width * height for _, _, width, height in rects)
+            if changed_area > image_data.shape[0] * image_data.shape[1] / 2:
+                rects = None
+
+        if rects is None:
+            self._put_image_data(image_data, x, y, codec, quality, compress_level)
+        else:
+            for rect_x, rect_y, width, height in rects:
+                self._put_image_data(
+                    image_data[rect_y : rect_y + height, rect_x : rect_x + width],
+                    x + rect_x,
+                    y + rect_y,
+                    codec,
+                    quality,
+                    compress_level,
+                )
+
+        # Only opaque images can be updated in place, the new pixels of a transparent image would be
+        # blended with the previous ones
+        if (
+            replaces_pixels
+            and image_data.ndim == 3
+            and (image_data.shape[2] == 3 or np.all(image_data[..., 3] >= 255))
+        ):
+            slots[key] = image_data.copy()
+        self._image_slots = slots
+
+    def _put_image_data(self, image_data, x, y, codec, quality, compress_level):
+        if codec == "raw":
+            args = [x, y]
+            buffers = []
+            populate_args(image_to_rgba(image_data), args, buffers)
+            self._canvas_manager.send_draw_command(
+                self, COMMANDS["putImageData"], args, buffers
+            )
+            return
+
+        image_buffer = binary_image(
+            image_data, quality=quality, codec=codec, compress_level=compress_level
+        )
         self._canvas_manager.send_draw_command(
             self, COMMANDS["putImageData"], [x, y], [image_buffer]
         )
@@ -1434,11 +3240,16 @@ class Canvas(_CanvasBase):
     # Transformation methods
     def save(self):
         """Save the entire state of the canvas."""
-        self._canvas_manager.send_draw_command(self, COMMANDS["save"])
+        with self._canvas_manager._drawing_state_lock:
+            self._drawing_state_stack.append(dict(self._drawing_state))
+            self._canvas_manager.send_draw_command(self, COMMANDS["save"])
 
     def restore(self):
         """Restore the most recently saved canvas state."""
-        self._canvas_manager.send_draw_command(self, COMMANDS["restore"])
+        with self._canvas_manager._drawing_state_lock:
+            if self._drawing_state_stack:
+                self._drawing_state = self._drawing_state_stack.pop()
+            self._canvas_manager.send_draw_command(self, COMMANDS["restore"])
 
     def translate(self, x, y):
         """Move the canvas and its origin on the grid.
@@ -1505,7 +3316,8 @@ class Canvas(_CanvasBase):
         When a new client connects to the kernel he will get an empty Canvas (because the canvas is
         almost stateless, the new client does not know what draw commands were previously sent). So
         this function is useful for replaying your drawing whenever a new client connects and is
-        ready to receive draw commands.
+        ready to receive draw commands. Alternatively, set ``retain_commands`` to ``True`` for
+        replaying the drawing automatically.
         """
         self._client_ready_callbacks.register_callback(callback, remove=remove)
 
@@ -1513,6 +3325,14 @@ class Canvas(_CanvasBase):
         """Register a callback that will be called on mouse move."""
         self._mouse_move_callbacks.register_callback(callback, remove=remove)
 
+    def on_mouse_move_batch(self, callback, remove=False):
+        """Register a callback that will be called with all the mouse positions since the previous call.
+
+        This is only used when ``max_event_rate`` is set and ``event_coalescing`` is ``"batch"``, the callback receives
+        a NumPy array of shape (n, 2) with the x and y coordinates of the mouse, the last row being the current position.
+        """
+        self._mouse_move_batch_callbacks.register_callback(callback, remove=remove)
+
     def on_mouse_down(self, callback, remove=False):
         """Register a callback that will be called on mouse click down."""
         self._mouse_down_callbacks.register_callback(callback, remove=remove)
@@ -1549,6 +3369,31 @@ class Canvas(_CanvasBase):
         """Register a callback that will be called on keyboard event."""
         self._key_down_callbacks.register_callback(callback, remove=remove)
 
+    def on_key_up(self, callback, remove=False):
+        """Register a callback that will be called when a key is released."""
+        self._key_up_callbacks.register_callback(callback, remove=remove)
+
+    def on_event(self, event, callback, remove=False):
+        """Register a callback that will be called with the content and the buffers of the front-end messages of type ``event``.
+
+        This gives access to the whole message of the built-in events (_e.g._ the modifier keys of ``mouse_wheel``),
+        and allows handling new event types sent by the front-end.
+        """
+        callbacks = self._event_callbacks.setdefault(event, CallbackDispatcher())
+        callbacks.register_callback(callback, remove=remove)
+
+    def events(self, maxlen=100_000):
+        """Return an ``EventQueue`` accumulating the mouse, touch and keyboard events of the Canvas.
+
+        The queue stores the events in columnar NumPy buffers, call its ``drain()`` method once per frame (_e.g._ in a
+        ``set_render_loop`` function) to process all the events received since the previous frame at once, and its
+        ``close()`` method to stop receiving events. At most ``maxlen`` events are kept, the oldest are dropped first.
+        """
+        queue = EventQueue(maxlen)
+        queue._close_callback = self._event_queues.remove
+        self._event_queues.append(queue)
+        return queue
+
     def __setattr__(self, name, value):
         super(Canvas, self).__setattr__(name, value)
 
@@ -1557,49 +3402,41 @@ class Canvas(_CanvasBase):
             if isinstance(value, Widget):
                 value = widget_serialization["to_json"](value, None)
 
-            self._canvas_manager.send_command(
-                self, [COMMANDS["set"], [self.ATTRS[name], value]]
-            )
+            self._send_state_command(name, [COMMANDS["set"], [self.ATTRS[name], value]])
 
     def _handle_frontend_event(self, _, content, buffers):
-        if content.get("event", "") == "client_ready":
-            self._client_ready_callbacks()
-
-        if content.get("event", "") == "mouse_move":
-            self._mouse_move_callbacks(content["x"], content["y"])
-        if content.get("event", "") == "mouse_down":
-            self._mouse_down_callbacks(content["x"], content["y"])
-        if content.get("event", "") == "mouse_up":
-            self._mouse_up_callbacks(content["x"], content["y"])
-        if content.get("event", "") == "mouse_out":
-            self._mouse_out_callbacks(content["x"], content["y"])
-        if content.get("event", "") == "mouse_wheel":
-            self._mouse_wheel_callbacks(content["x"], content["y"])
-
-        if content.get("event", "") == "touch_start":
-            self._touch_start_callbacks(
-                [(touch["x"], touch["y"]) for touch in content["touches"]]
-            )
-        if content.get("event", "") == "touch_end":
-            self._touch_end_callbacks(
-                [(touch["x"], touch["y"]) for touch in content["touches"]]
-            )
-        if content.get("event", "") == "touch_move":
-            self._touch_move_callbacks(
-                [(touch["x"], touch["y"]) for touch in content["touches"]]
-            )
-        if content.get("event", "") == "touch_cancel":
-            self._touch_cancel_callbacks(
-                [(touch["x"], touch["y"]) for touch in content["touches"]]
+        event = content.get("event", "")
+
+        handler = self._event_handlers.get(event)
+        if handler is not None:
+            handler(content, buffers)
+
+        callbacks = self._event_callbacks.get(event)
+        if callbacks is not None:
+            callbacks(content, buffers)
+
+        for queue in self._event_queues:
+            queue.push(event, content, buffers)
+
+    def _handle_client_ready(self, content, buffers):
+        # The new client does not have the previous put_image_data images, and starts from the default state
+        self._image_slots = {}
+        self._reset_drawing_state()
+        if self._retained_log is not None:
+            # Only the new client is reset, the others already show the canvas
+            self._canvas_manager.replay(
+                self,
+                *self._retained_log.replay_commands(),
+                client=content.get("client"),
             )
+        self._client_ready_callbacks()
 
-        if content.get("event", "") == "key_down":
-            self._key_down_callbacks(
-                content["key"],
-                content["shift_key"],
-                content["ctrl_key"],
-                content["meta_key"],
+    def _handle_mouse_move(self, content, buffers):
+        if content.get("batch", False):
+            self._mouse_move_batch_callbacks(
+                np.frombuffer(buffers[0], dtype=np.float64).reshape((-1, 2))
             )
+        self._mouse_move_callbacks(content["x"], content["y"])
 
     def _draw_polygons_or_linesegments(
         self,
@@ -1626,7 +3463,7 @@ class Canvas(_CanvasBase):
             min_elements=min_elements,
         )
 
-        if with_style:
+        if with_style and not isinstance(color, CanvasBuffer):
             color = np.require(color, requirements=["C"], dtype="uint8")
             if color.ndim != 1:
                 color = color.ravel()
@@ -1651,6 +3488,9 @@ class RoughCanvas(Canvas):
     _model_name = Unicode("RoughCanvasModel").tag(sync=True)
     _view_name = Unicode("CanvasView").tag(sync=True)
 
+    # Rough rectangles do not entirely cover their area
+    _fill_rect_covers_canvas = False
+
     #: (str) Sets the appearance of the filling, possible values are ``'hachure'``, ``'solid'``, ``'zigzag'``,
     #: ``'cross-hatch'``, ``'dots'``, ``'sunburst'``, ``'dashed'``, ``'zigzag-line'``.
     #: Default to ``'hachure'``.
@@ -1722,7 +3562,13 @@ class MultiCanvas(_CanvasBase):
     def __setattr__(self, name, value):
         super(MultiCanvas, self).__setattr__(name, value)
 
-        if name in ("width", "height"):
+        if name in (
+            "width",
+            "height",
+            "retain_commands",
+            "max_retained_commands",
+            "max_retained_bytes",
+        ):
             for layer in self._canvases:
                 setattr(layer, name, value)
 
@@ -1761,6 +3607,14 @@ class MultiCanvas(_CanvasBase):
         """Register a callback that will be called on mouse move."""
         self._canvases[-1].on_mouse_move(callback, remove=remove)
 
+    def on_mouse_move_batch(self, callback, remove=False):
+        """Register a callback that will be called with all the mouse positions since the previous call.
+
+        This is only used when ``max_event_rate`` is set and ``event_coalescing`` is ``"batch"``, the callback receives
+        a NumPy array of shape (n, 2) with the x and y coordinates of the mouse, the last row being the current position.
+        """
+        self._canvases[-1].on_mouse_move_batch(callback, remove=remove)
+
     def on_mouse_down(self, callback, remove=False):
         """Register a callback that will be called on mouse click down."""
         self._canvases[-1].on_mouse_down(callback, remove=remove)
@@ -1797,6 +3651,27 @@ class MultiCanvas(_CanvasBase):
         """Register a callback that will be called on keyboard event."""
         self._canvases[-1].on_key_down(callback, remove=remove)
 
+    def on_key_up(self, callback, remove=False):
+        """Register a callback that will be called when a key is released."""
+        self._canvases[-1].on_key_up(callback, remove=remove)
+
+    def on_event(self, event, callback, remove=False):
+        """Register a callback that will be called with the content and the buffers of the front-end messages of type ``event``.
+
+        This gives access to the whole message of the built-in events (_e.g._ the modifier keys of ``mouse_wheel``),
+        and allows handling new event types sent by the front-end.
+        """
+        self._canvases[-1].on_event(event, callback, remove=remove)
+
+    def events(self, maxlen=100_000):
+        """Return an ``EventQueue`` accumulating the mouse, touch and keyboard events of the MultiCanvas.
+
+        The queue stores the events in columnar NumPy buffers, call its ``drain()`` method once per frame (_e.g._ in a
+        ``set_render_loop`` function) to process all the events received since the previous frame at once, and its
+        ``close()`` method to stop receiving events. At most ``maxlen`` events are kept, the oldest are dropped first.
+        """
+        return self._canvases[-1].events(maxlen)
+
     def clear(self):
         """Clear the Canvas."""
         for layer in self._canvases:
@@ -1826,22 +3701,53 @@ class MultiRoughCanvas(MultiCanvas):
 
 
 @contextmanager
-def hold_canvas(canvas=None):
+def hold_canvas(canvas=None, on_error="flush", async_flush=False):
     """Hold any drawing, and perform all commands in a single shot at the end.
 
-    This is way more efficient than sending commands one by one.
+    This is way more efficient than sending commands one by one. Nested ``hold_canvas`` blocks are part
+    of the outermost one, the commands are sent at its end.
+
+    Args:
+        on_error (str): What to do with the commands of the block if an exception is raised in it:
+            ``'flush'`` sends them with the rest of the frame, ``'discard'`` drops them. Default to ``'flush'``.
+        async_flush (bool): Send the frame from a background thread, so that the next frame can be
+            built in the meantime. Only used by the outermost block. Default to ``False``.
     """
     if canvas is not None:
         warnings.warn(
             "hold_canvas does not take a canvas as parameter anymore, please use hold_canvas() instead.",
             DeprecationWarning,
         )
+    if on_error not in ("flush", "discard"):
+        raise ValueError(
+            f"on_error must be 'flush' or 'discard', got {on_error!r} instead"
+        )
 
-    orig_caching = _CANVAS_MANAGER._caching
-
-    _CANVAS_MANAGER._caching = True
-    yield
+    batch = _CANVAS_MANAGER._held_batch.get()
+    if batch is not None and batch.caching:
+        scope = _CANVAS_MANAGER._begin_scope(batch) if on_error == "discard" else None
+        try:
+            yield
+        except BaseException:
+            if scope is not None:
+                _CANVAS_MANAGER._discard_scope(batch, scope)
+            raise
+        return
+
+    # The commands batched so far by this thread are drawn first
     _CANVAS_MANAGER.flush()
 
-    if not orig_caching:
-        _CANVAS_MANAGER._caching = False
+    # The commands of this block are held in their own batch, drawings from other threads or asyncio
+    # tasks in the meantime are not mixed with them
+    batch = _Batch(caching=True)
+    token = _CANVAS_MANAGER._held_batch.set(batch)
+    try:
+        yield
+    except BaseException:
+        if on_error == "discard":
+            _CANVAS_MANAGER._discard_scope(batch, (0, 0, None))
+        raise
+    finally:
+        batch.caching = False
+        _CANVAS_MANAGER._held_batch.reset(token)
+        _CANVAS_MANAGER._flush_batch(batch, background=async_flush, frame=True)
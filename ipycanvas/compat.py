@@ -4,9 +4,12 @@ import os
 from IPython.display import display
 
 # this is very usefull for testing compatibility with offscreen canvas
-IPYCANVAS_DISABLE_OFFSCREEN_CANVAS =  bool(int(os.environ.get('IPYCANVAS_DISABLE_OFFSCREEN_CANVAS', '0')))
+IPYCANVAS_DISABLE_OFFSCREEN_CANVAS = bool(
+    int(os.environ.get("IPYCANVAS_DISABLE_OFFSCREEN_CANVAS", "0"))
+)
 
 import sys
+
 is_emscripten = sys.platform.startswith("emscripten")
 
 # has pyjs
@@ -23,33 +26,33 @@ else:
 
     class Canvas(CanvasBase):
         """Compatibility layer for offscreen canvas and regular canvas."""
-        
+
         def initialize():
             """
-                After the canvas has been displayed, we need to call this method to initialize the canvas.
-                This method can only be used when the display method has been called in a **different cell**.
+            After the canvas has been displayed, we need to call this method to initialize the canvas.
+            This method can only be used when the display method has been called in a **different cell**.
 
-                # Cell1:
-                ```python
-                from ipycanvas.compat import Canvas
-                from IPython.display import display
-                canvas = Canvas(width=800, height=600)
-                display(canvas)
-                ```
+            # Cell1:
+            ```python
+            from ipycanvas.compat import Canvas
+            from IPython.display import display
+            canvas = Canvas(width=800, height=600)
+            display(canvas)
+            ```
 
-                # Cell2:
-                ```python
-                canvas.initialize()
-                ```
+            # Cell2:
+            ```python
+            canvas.initialize()
+            ```
 
-                For more information, see the `async_initialize` method.
+            For more information, see the `async_initialize` method.
 
             """
-        
+
         async def async_initialize(self):
             """
-        
-                If we want to use the canvas in the same cell where it 
+
+                If we want to use the canvas in the same cell where it
                 was created **and displayed** we need to call this async function.
                 While this sounds a bit counterintuitive, it is necessary because the
                 offscreen canvas is created as regular canvas in the main-thread,
@@ -70,9 +73,9 @@ else:
 
 
             """
-        
+
         async def display(self):
-            """ shorthand for displaying the canvas and then initializing it.
+            """shorthand for displaying the canvas and then initializing it.
             See `async_initialize` for more information.
             """
 
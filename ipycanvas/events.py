@@ -0,0 +1,190 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) Martin Renou.
+# Distributed under the terms of the Modified BSD License.
+
+"""Columnar queue of the front-end events, for processing them in batch in a render loop."""
+
+import time
+from collections import namedtuple
+
+import numpy as np
+
+#: The event types stored in the queue, the ``type`` column holds the index of the type in this tuple
+EVENT_TYPES = (
+    "mouse_move",
+    "mouse_down",
+    "mouse_up",
+    "mouse_out",
+    "mouse_wheel",
+    "touch_start",
+    "touch_end",
+    "touch_move",
+    "touch_cancel",
+    "key_down",
+    "key_up",
+)
+
+_EVENT_CODES = {name: code for code, name in enumerate(EVENT_TYPES)}
+
+_KEY_EVENTS = frozenset(["key_down", "key_up"])
+_TOUCH_EVENTS = frozenset(["touch_start", "touch_end", "touch_move", "touch_cancel"])
+
+
+class EventBatch(
+    namedtuple("EventBatch", ["type", "x", "y", "buttons", "timestamp", "key"])
+):
+    """The events drained from an ``EventQueue``, one NumPy array per column.
+
+    - ``type``: the event type, as an index in ``EVENT_TYPES``
+    - ``x`` and ``y``: the position of the event (the deltas for ``mouse_wheel``, NaN for key events and touch
+      events without any finger left on the screen)
+    - ``buttons``: the mouse buttons pressed, the finger index for touch events (-1 when no finger is left), the
+      modifier keys for key events (1 for shift, 2 for ctrl and 4 for meta)
+    - ``timestamp``: the time of the event in seconds since the epoch, from the browser clock (comparable with
+      ``time.time()`` up to the clock difference between the browser and the kernel machines), or the time the
+      kernel received the event for front-ends that do not send it
+    - ``key``: the key for key events, ``None`` otherwise
+    """
+
+    __slots__ = ()
+
+    def __len__(self):
+        return len(self.type)
+
+    def mask(self, *types):
+        """Return a boolean array selecting the events of the given types."""
+        return np.isin(self.type, [_EVENT_CODES[name] for name in types])
+
+    def select(self, *types):
+        """Return a new batch with only the events of the given types."""
+        mask = self.mask(*types)
+        return EventBatch(*(column[mask] for column in self))
+
+
+class EventQueue:
+    """Accumulate the front-end events of a Canvas in columnar NumPy buffers.
+
+    Use ``Canvas.events()`` to create one. The events are appended as they arrive and ``drain()`` returns all
+    of them at once, which is meant to be called once per frame in a render loop. When more than ``maxlen``
+    events are waiting, the oldest ones are dropped.
+    """
+
+    _COLUMNS = (
+        ("type", np.uint8),
+        ("x", np.float64),
+        ("y", np.float64),
+        ("buttons", np.int32),
+        ("timestamp", np.float64),
+        ("key", object),
+    )
+
+    def __init__(self, maxlen=100_000):
+        self.maxlen = maxlen
+        self.dropped = 0
+        self._size = 0
+        self._columns = [np.empty(64, dtype=dtype) for _, dtype in self._COLUMNS]
+        self._close_callback = None
+
+    def __len__(self):
+        return self._size
+
+    def drain(self):
+        """Return the waiting events as an ``EventBatch`` and empty the queue."""
+        batch = EventBatch(*(column[: self._size].copy() for column in self._columns))
+        self._size = 0
+        return batch
+
+    def close(self):
+        """Stop receiving events."""
+        if self._close_callback is not None:
+            self._close_callback(self)
+            self._close_callback = None
+
+    def push(self, event, content, buffers):
+        """Append a front-end message to the queue, ignoring the events that are not in ``EVENT_TYPES``."""
+        code = _EVENT_CODES.get(event)
+        if code is None:
+            return
+
+        key = None
+        timestamp = content["time"] / 1000 if "time" in content else time.time()
+        if event in _KEY_EVENTS:
+            xy = np.full((1, 2), np.nan)
+            buttons = (
+                bool(content["shift_key"])
+                | bool(content["ctrl_key"]) << 1
+                | bool(content["meta_key"]) << 2
+            )
+            key = content["key"]
+        elif event in _TOUCH_EVENTS:
+            xy = np.frombuffer(buffers[0], dtype=np.float64).reshape((-1, 2))
+            buttons = np.arange(len(xy))
+            if len(xy) == 0:
+                # The last finger left the screen, keep the event without a position
+                xy = np.full((1, 2), np.nan)
+                buttons = -1
+        elif content.get("batch", False):
+            xy = np.frombuffer(buffers[0], dtype=np.float64).reshape((-1, 2))
+            buttons = content.get("buttons", 0)
+            if len(buffers) > 2:
+                # The time and the buttons of every point
+                timestamp = np.frombuffer(buffers[1], dtype=np.float64) / 1000
+                buttons = np.frombuffer(buffers[2], dtype=np.int32)
+        else:
+            xy = ((content["x"], content["y"]),)
+            buttons = content.get("buttons", 0)
+
+        self._append(code, xy, buttons, timestamp, key)
+
+    def _append(self, code, xy, buttons, timestamp, key):
+        xy = np.asarray(xy, dtype=np.float64)
+        n = len(xy)
+        if n > self.maxlen:
+            # Only the newest events fit in the queue
+            self.dropped += n - self.maxlen
+            xy = xy[n - self.maxlen :]
+            if np.ndim(buttons):
+                buttons = buttons[n - self.maxlen :]
+            if np.ndim(timestamp):
+                timestamp = timestamp[n - self.maxlen :]
+            n = self.maxlen
+        if n == 0:
+            return
+
+        self._reserve(n)
+
+        start = self._size
+        end = start + n
+        type_, x, y, buttons_, timestamps, keys = self._columns
+        type_[start:end] = code
+        x[start:end] = xy[:, 0]
+        y[start:end] = xy[:, 1]
+        buttons_[start:end] = buttons
+        timestamps[start:end] = timestamp
+        keys[start:end] = key
+        self._size = end
+
+    def _reserve(self, n):
+        # Drop the oldest events if the queue is full
+        excess = self._size + n - self.maxlen
+        if excess > 0:
+            excess = min(excess, self._size)
+            for column in self._columns:
+                column[: self._size - excess] = column[excess : self._size]
+            self._size -= excess
+            self.dropped += excess
+
+        capacity = len(self._columns[0])
+        if self._size + n > capacity:
+            capacity = max(2 * capacity, self._size + n)
+            self._columns = [
+                np.concatenate(
+                    [
+                        column[: self._size],
+                        np.empty(capacity - self._size, column.dtype),
+                    ]
+                )
+                for column in self._columns
+            ]
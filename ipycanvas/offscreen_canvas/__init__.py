@@ -1,2 +1,2 @@
 from .offscreen_canvas_core import OffscreenCanvasCore
-from .offscreen_canvas import OffscreenCanvas,hold_canvas
\ No newline at end of file
+from .offscreen_canvas import OffscreenCanvas, hold_canvas
@@ -389,6 +389,67 @@ OffscreenCanvasRenderingContext2D.prototype.strokeStyledLineSegments = function
 };
 
 
+// batch api for texts, the strings and fonts are "\0" separated tables
+// indexed by the indices and fontIndices buffers
+OffscreenCanvasRenderingContext2D.prototype._texts = function (strings, fonts, indices, x, y, color, alpha, fontIndices, maxWidth, sizes, fill) {
+    const stringTable = strings.split('\0');
+    const fontTable = fonts.split('\0');
+    const ii = new ScalarBatchAccessor(indices, sizes[0]);
+    const xx = new ScalarBatchAccessor(x, sizes[1]);
+    const yy = new ScalarBatchAccessor(y, sizes[2]);
+    const cc = sizes[3] > 0 ? new ColorBatchAccessor(color, sizes[3], alpha, sizes[4]) : null;
+    const aa = new ScalarBatchAccessor(alpha, sizes[4]);
+    const ff = sizes[5] > 0 ? new ScalarBatchAccessor(fontIndices, sizes[5]) : null;
+    const ww = sizes[6] > 0 ? new ScalarBatchAccessor(maxWidth, sizes[6]) : null;
+
+    // get the the longest array size
+    const n_items = largest_value(sizes, 3);
+
+    this.save();
+    const globalAlpha = this.globalAlpha;
+    if (ff === null && fontTable[0] !== '') {
+        this.font = fontTable[0];
+    }
+    for (let i = 0; i < n_items; i++) {
+        if (ff !== null) {
+            this.font = fontTable[ff.get(i)];
+        }
+        if (cc !== null) {
+            if (fill) {
+                this.fillStyle = cc.get(i);
+            } else {
+                this.strokeStyle = cc.get(i);
+            }
+        } else {
+            this.globalAlpha = globalAlpha * aa.get(i);
+        }
+
+        const text = stringTable[ii.get(i)];
+        if (fill) {
+            if (ww === null) {
+                this.fillText(text, xx.get(i), yy.get(i));
+            } else {
+                this.fillText(text, xx.get(i), yy.get(i), ww.get(i));
+            }
+        } else {
+            if (ww === null) {
+                this.strokeText(text, xx.get(i), yy.get(i));
+            } else {
+                this.strokeText(text, xx.get(i), yy.get(i), ww.get(i));
+            }
+        }
+    }
+    this.restore();
+};
+
+OffscreenCanvasRenderingContext2D.prototype.fillTexts = function (strings, fonts, indices, x, y, color, alpha, fontIndices, maxWidth, sizes) {
+    this._texts(strings, fonts, indices, x, y, color, alpha, fontIndices, maxWidth, sizes, true);
+};
+
+OffscreenCanvasRenderingContext2D.prototype.strokeTexts = function (strings, fonts, indices, x, y, color, alpha, fontIndices, maxWidth, sizes) {
+    this._texts(strings, fonts, indices, x, y, color, alpha, fontIndices, maxWidth, sizes, false);
+};
+
 function largest_value(buffers, size) {
     let largest = 0;
     for (let i = 0; i < size; i++) {
@@ -1,6 +1,6 @@
 from .offscreen_canvas_core import OffscreenCanvasCore
 from contextlib import contextmanager
-from functools import partial,partialmethod
+from functools import partial, partialmethod
 import pyjs
 import numpy as np
 from numbers import Number
@@ -9,16 +9,17 @@ from IPython.display import display
 from ipywidgets import Image as IpywidgetImage
 import io
 import PIL
+from ..utils import string_table
+
 
 @contextmanager
 def hold_canvas(canvas):
     yield None
 
-class OffscreenCanvas(OffscreenCanvasCore):
-    
 
+class OffscreenCanvas(OffscreenCanvasCore):
 
-    def __init__(self, *args, **kwargs): 
+    def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
         # create buffers for the batch API:
@@ -29,81 +30,83 @@ class OffscreenCanvas(OffscreenCanvasCore):
         # the other buffers.
         # the number of buffers can be fixed since we only use a fixed number of arguments in the batch calls.
         initial_buffer_size = 10
-        n_buffers = 8 # max number of args / buffers we need at the same time
-        self._buffers = [ np.zeros(initial_buffer_size, dtype=np.float32) for _ in range(n_buffers)]
+        n_buffers = 8  # max number of args / buffers we need at the same time
+        self._buffers = [
+            np.zeros(initial_buffer_size, dtype=np.float32) for _ in range(n_buffers)
+        ]
         self._js_buffers = [
-            pyjs.buffer_to_js_typed_array(fbuffer, view=True) for fbuffer in self._buffers
+            pyjs.buffer_to_js_typed_array(fbuffer, view=True)
+            for fbuffer in self._buffers
         ]
 
     def initialize(self):
-        """ After the canvas has been displayed, we need to call this method to initialize the canvas.
+        """After the canvas has been displayed, we need to call this method to initialize the canvas.
 
-            After the canvas has been displayed, we need to call this method to initialize the canvas.
-            This method can only be used when the display method has been called in a **different cell**.
+        After the canvas has been displayed, we need to call this method to initialize the canvas.
+        This method can only be used when the display method has been called in a **different cell**.
 
-            # Cell1:
-            ```python
-            from ipycanvas.compat import Canvas
-            from IPython.display import display
-            canvas = Canvas(width=800, height=600)
-            display(canvas)
-            ```
+        # Cell1:
+        ```python
+        from ipycanvas.compat import Canvas
+        from IPython.display import display
+        canvas = Canvas(width=800, height=600)
+        display(canvas)
+        ```
 
-            # Cell2:
-            ```python
-            canvas.initialize()
-            ```
+        # Cell2:
+        ```python
+        canvas.initialize()
+        ```
 
-            For more information, see the `async_initialize` method.
+        For more information, see the `async_initialize` method.
 
         """
         super().initialize()
-        if  self._canvas is None:
+        if self._canvas is None:
             raise RuntimeError("Canvas is not displayed yet")
         self._ctx = self._canvas.getContext("2d")
 
     async def async_initialize(self):
         """
-        
-                If we want to use the canvas in the same cell where it 
-                was created **and displayed** we need to call this async function.
-                While this sounds a bit counterintuitive, it is necessary because the
-                offscreen canvas is created as regular canvas in the main-thread,
-                and transfered to and recieved by the worker-thread. This transfering mechanism (in particular the
-                receiving part) would be blocked by the cell execution.
-                To get a chance to  receive the canvas in the worker-thread (ie where
-                the kernel is running), we need to do run some asyc code (with some sleeping in between)
-                Note that for an ordinary canvas, `async_initialize` is a no-op.
-
-            from ipycanvas.compat import Canvas
-            from IPython.display import display
-            canvas = Canvas(width=800, height=600)
-            display(canvas)
-            await canvas.async_initialize()
-
-            # canvas is now ready to use
-            canvas.fill_style = 'red'
+
+            If we want to use the canvas in the same cell where it
+            was created **and displayed** we need to call this async function.
+            While this sounds a bit counterintuitive, it is necessary because the
+            offscreen canvas is created as regular canvas in the main-thread,
+            and transfered to and recieved by the worker-thread. This transfering mechanism (in particular the
+            receiving part) would be blocked by the cell execution.
+            To get a chance to  receive the canvas in the worker-thread (ie where
+            the kernel is running), we need to do run some asyc code (with some sleeping in between)
+            Note that for an ordinary canvas, `async_initialize` is a no-op.
+
+        from ipycanvas.compat import Canvas
+        from IPython.display import display
+        canvas = Canvas(width=800, height=600)
+        display(canvas)
+        await canvas.async_initialize()
+
+        # canvas is now ready to use
+        canvas.fill_style = 'red'
 
 
         """
-        
+
         await super().async_initialize()
-        if  self._canvas is None:
+        if self._canvas is None:
             raise RuntimeError("Canvas is not displayed yet")
         self._ctx = self._canvas.getContext("2d")
-    
+
     async def display(self):
-        """ shorthand for displaying the canvas and then initializing it.
-            See `async_initialize` for more information.
+        """shorthand for displaying the canvas and then initializing it.
+        See `async_initialize` for more information.
         """
         display(self)
         await self.async_initialize()
 
-  
     # ipycanvas api
     def clear(self):
         self._ctx.clearRect(0, 0, self._canvas.width, self._canvas.height)
-    
+
     # for compatibility with the regular canvas
     def sleep(self, seconds):
         """in the non-lite version this sleeps in the fronend / canvas, but not in the kernel.
@@ -116,7 +119,7 @@ class OffscreenCanvas(OffscreenCanvasCore):
         for offset, color in color_stops:
             gradient.addColorStop(offset, color)
         return gradient
-    
+
     def create_radial_gradient(self, x0, y0, r0, x1, y1, r1, color_stops):
         """Create a radial gradient."""
         gradient = self._ctx.createRadialGradient(x0, y0, r0, x1, y1, r1)
@@ -124,38 +127,46 @@ class OffscreenCanvas(OffscreenCanvasCore):
             gradient.addColorStop(offset, color)
         return gradient
 
-    def create_pattern(self, image, repetition='repeat'):
+    def create_pattern(self, image, repetition="repeat"):
         if isinstance(image, OffscreenCanvasCore):
             # if the image is an OffscreenCanvasCore, we need to convert it to a js image
             image = image._canvas
         else:
-            raise NotImplementedError("create_pattern only supports OffscreenCanvas images at the moment")
-        
+            raise NotImplementedError(
+                "create_pattern only supports OffscreenCanvas images at the moment"
+            )
+
         pattern = self._ctx.createPattern(image, repetition)
         return pattern
 
     def fill_rect(self, x, y, width, height):
         self._ctx.fillRect(x, y, width, height)
+
     def stroke_rect(self, x, y, width, height):
         self._ctx.strokeRect(x, y, width, height)
+
     def clear_rect(self):
         self._ctx.clearRect(x, y, width, height)
+
     def fill_arc(self, x, y, radius, start_angle, end_angle, anticlockwise=False):
         self._ctx.fillArc(x, y, radius, start_angle, end_angle, anticlockwise)
+
     def fill_circle(self, x, y, radius):
         self._ctx.fillCircle(x, y, radius)
+
     def stroke_arc(self, x, y, radius, start_angle, end_angle, anticlockwise=False):
         self._ctx.strokeArc(x, y, radius, start_angle, end_angle, anticlockwise)
+
     def stroke_circle(self, x, y, radius):
         self._ctx.strokeCircle(x, y, radius)
 
     def fill_polygon(self, points):
         n_points = self._fill_buffer_with_points(0, points)
-        self._ctx.fillPolygon(n_points, self._js_buffers[0] )
+        self._ctx.fillPolygon(n_points, self._js_buffers[0])
 
     def stroke_polygon(self, points):
         n_points = self._fill_buffer_with_points(0, points)
-        self._ctx.strokePolygon(n_points ,self._js_buffers[0])
+        self._ctx.strokePolygon(n_points, self._js_buffers[0])
 
     def fill_and_stroke_polygon(self, points):
         n_points = self._fill_buffer_with_points(0, points)
@@ -163,80 +174,136 @@ class OffscreenCanvas(OffscreenCanvasCore):
 
     def stroke_line(self, x1, y1, x2, y2):
         self._ctx.strokeLine(x1, y1, x2, y2)
+
     def begin_path(self):
         self._ctx.beginPath()
+
     def close_path(self):
         self._ctx.closePath()
+
     def stroke(self):
         self._ctx.stroke()
+
     def fill(self):
         self._ctx.fill()
+
     def move_to(self, x, y):
         self._ctx.moveTo(x, y)
+
     def line_to(self, x, y):
         self._ctx.lineTo(x, y)
+
     def rect(self, x, y, width, height):
         self._ctx.rect(x, y, width, height)
+
     def arc(self, x, y, radius, start_angle, end_angle, anticlockwise=False):
-        self._ctx.arc(x, y, radius, start_angle, end_angle, anticlockwise)  
-    def ellipse(self, x, y, radius_x, radius_y, rotation=0, start_angle=0, end_angle=2 * 3.14159, anticlockwise=False):
-        self._ctx.ellipse(x, y, radius_x, radius_y, rotation, start_angle, end_angle, anticlockwise)
+        self._ctx.arc(x, y, radius, start_angle, end_angle, anticlockwise)
+
+    def ellipse(
+        self,
+        x,
+        y,
+        radius_x,
+        radius_y,
+        rotation=0,
+        start_angle=0,
+        end_angle=2 * 3.14159,
+        anticlockwise=False,
+    ):
+        self._ctx.ellipse(
+            x, y, radius_x, radius_y, rotation, start_angle, end_angle, anticlockwise
+        )
+
     def arc_to(self, x1, y1, x2, y2, radius):
         self._ctx.arcTo(x1, y1, x2, y2, radius)
+
     def quadratic_curve_to(self, cp_x, cp_y, to_x, to_y):
         self._ctx.quadraticCurveTo(cp_x, cp_y, to_x, to_y)
+
     def bezier_curve_to(self, cp1_x, cp1_y, cp2_x, cp2_y, to_x, to_y):
         self._ctx.bezierCurveTo(cp1_x, cp1_y, cp2_x, cp2_y, to_x, to_y)
+
     def fill_text(self, text, x, y, max_width=None):
         if max_width is not None:
             self._ctx.fillText(text, x, y, max_width)
         else:
             self._ctx.fillText(text, x, y)
+
     def stroke_text(self, text, x, y, max_width=None):
         if max_width is not None:
             self._ctx.strokeText(text, x, y, max_width)
         else:
             self._ctx.strokeText(text, x, y)
+
     def get_line_dash(self):
-        raise NotImplementedError("get_line_dash is not implemented in the offscreen canvas version yet")
+        raise NotImplementedError(
+            "get_line_dash is not implemented in the offscreen canvas version yet"
+        )
+
     def set_line_dash(self, segments):
-        raise NotImplementedError("set_line_dash is not implemented in the offscreen canvas version yet")
+        raise NotImplementedError(
+            "set_line_dash is not implemented in the offscreen canvas version yet"
+        )
+
     def draw_image(self):
-        raise NotImplementedError("draw_image is not implemented in the offscreen canvas version yet")
-    def put_image_data(self, image_data, dx, dy, dirty_x=None, dirty_y=None, dirty_width=None, dirty_height=None):
-        raise NotImplementedError("put_image_data is not implemented in the offscreen canvas version yet")
+        raise NotImplementedError(
+            "draw_image is not implemented in the offscreen canvas version yet"
+        )
+
+    def put_image_data(
+        self,
+        image_data,
+        dx,
+        dy,
+        dirty_x=None,
+        dirty_y=None,
+        dirty_width=None,
+        dirty_height=None,
+    ):
+        raise NotImplementedError(
+            "put_image_data is not implemented in the offscreen canvas version yet"
+        )
+
     def create_image_data(self, sw=None, sh=None):
-        raise NotImplementedError("create_image_data is not implemented in the offscreen canvas version yet")
+        raise NotImplementedError(
+            "create_image_data is not implemented in the offscreen canvas version yet"
+        )
+
     def clip(self):
         self._ctx.clip()
+
     def save(self):
         self._ctx.save()
+
     def restore(self):
         self._ctx.restore()
+
     def translate(self, x, y):
         self._ctx.translate(x, y)
-        
+
     def rotate(self, angle):
         self._ctx.rotate(angle)
-        
+
     def scale(self, x, y):
         self._ctx.scale(x, y)
-        
+
     def transform(self, a, b, c, d, e, f):
         self._ctx.transform(a, b, c, d, e, f)
-        
+
     def set_transform(self, a, b, c, d, e, f):
         self._ctx.setTransform(a, b, c, d, e, f)
+
     def reset_transform(self):
-        self._ctx.resetTransform()  
+        self._ctx.resetTransform()
+
     def clear(self):
         """Clear the canvas."""
         self._ctx.clearRect(0, 0, self._canvas.width, self._canvas.height)
-        
+
     def flush(self):
         """Flush the canvas. In the offscreen canvas version this does nothing."""
         pass
-    
+
     def draw_image(self, image, dx, dy, dw=None, dh=None):
         """Draw an image on the canvas."""
         if isinstance(image, OffscreenCanvasCore):
@@ -245,81 +312,97 @@ class OffscreenCanvas(OffscreenCanvasCore):
 
         elif isinstance(image, IpywidgetImage):
             if dw is not None and dh is not None:
-                raise NotImplementedError("ipywidget.Image does not support width and height parameters in draw_image")
+                raise NotImplementedError(
+                    "ipywidget.Image does not support width and height parameters in draw_image"
+                )
 
             # convert to stream an open with pillow
             data_stream = io.BytesIO(image.value)
             pil_img = PIL.Image.open(data_stream)
 
             # convert to RGBA if not already in that mode
-            if pil_img.mode != 'RGBA':
-                pil_img = pil_img.convert('RGBA'
-            )
+            if pil_img.mode != "RGBA":
+                pil_img = pil_img.convert("RGBA")
 
             # convert to numpy
-            img_rgba = np.array(pil_img) 
+            img_rgba = np.array(pil_img)
 
             # create a js array view (this will be of the type Uint8)
             js_arr = pyjs.buffer_to_js_typed_array(img_rgba.ravel(), view=True)
             # convert to Uint8ClampedArray without copying the data
-            js_arr = pyjs.js.Uint8ClampedArray.new(js_arr.buffer, js_arr.byteOffset, js_arr.length)
+            js_arr = pyjs.js.Uint8ClampedArray.new(
+                js_arr.buffer, js_arr.byteOffset, js_arr.length
+            )
 
             # create settings to ensure the pixel format is correct
             settings = pyjs.js_object()
             settings.pixelFormat = "rgba-unorm8"
 
             # create the ImageData object
-            image = pyjs.js.ImageData.new(js_arr, pil_img.width, pil_img.height, settings)
+            image = pyjs.js.ImageData.new(
+                js_arr, pil_img.width, pil_img.height, settings
+            )
 
             # create an OffscreenCanvas and draw the image data on it
-            offscreen_canvas = pyjs.js.OffscreenCanvas.new( pil_img.width, pil_img.height)
-            ctx = offscreen_canvas.getContext('2d')
+            offscreen_canvas = pyjs.js.OffscreenCanvas.new(
+                pil_img.width, pil_img.height
+            )
+            ctx = offscreen_canvas.getContext("2d")
 
             # put the image data on the offscreen canvas
-            ctx.putImageData(image,0,0)
+            ctx.putImageData(image, 0, 0)
             drawable_image = offscreen_canvas
-          
+
         else:
-            raise NotImplementedError("draw_image only supports OffscreenCanvas and ipywidget.Image as images at the moment")
+            raise NotImplementedError(
+                "draw_image only supports OffscreenCanvas and ipywidget.Image as images at the moment"
+            )
 
         if dw is not None and dh is not None:
             self._ctx.drawImage(drawable_image, dx, dy, dw, dh)
         else:
-            self._ctx.drawImage(drawable_image, dx, dy)    
-    
-    def put_image_data(self, image_data, x=0,y=0):
+            self._ctx.drawImage(drawable_image, dx, dy)
+
+    def put_image_data(self, image_data, x=0, y=0):
         n_dim = image_data.ndim
         width = image_data.shape[0]
         height = image_data.shape[1]
         if n_dim == 2:
             # grayscale image
             # convert to RGBA
-            image_data = np.stack((image_data,)*3, axis=-1)
-            image_data = np.concatenate((image_data, np.full(image_data.shape[:2] + (1,), 255)), axis=-1)
+            image_data = np.stack((image_data,) * 3, axis=-1)
+            image_data = np.concatenate(
+                (image_data, np.full(image_data.shape[:2] + (1,), 255)), axis=-1
+            )
 
-            
         elif n_dim == 3 and image_data.shape[-1] == 1:
             # single channel image (grayscale)
             # convert to RGBA
-            image_data = np.concatenate((image_data, np.full(image_data.shape[:2] + (1,), 255)), axis=-1)
+            image_data = np.concatenate(
+                (image_data, np.full(image_data.shape[:2] + (1,), 255)), axis=-1
+            )
 
-        elif n_dim == 3: 
+        elif n_dim == 3:
             # RGB image
             if image_data.shape[-1] == 3:
                 # add alpha channel
-                image_data = np.concatenate((image_data, np.full(image_data.shape[:2] + (1,), 255)), axis=-1)
+                image_data = np.concatenate(
+                    (image_data, np.full(image_data.shape[:2] + (1,), 255)), axis=-1
+                )
             elif image_data.shape[-1] == 4:
                 # already RGBA
                 pass
             else:
                 raise ValueError("Image data must be 2D or 3D with 3 or 4 channels")
 
-        image_data = np.require(image_data, requirements='C', dtype=np.uint8)
+        image_data = np.require(image_data, requirements="C", dtype=np.uint8)
 
         # create a js array view (this will be of the type Uint8)
         js_arr = pyjs.buffer_to_js_typed_array(image_data.ravel(), view=True)
         # convert to Uint8ClampedArray without copying the data
-        js_arr = pyjs.js.Uint8ClampedArray.new(js_arr.buffer, js_arr.byteOffset, js_arr.length)
+        js_arr = pyjs.js.Uint8ClampedArray.new(
+            js_arr.buffer, js_arr.byteOffset, js_arr.length
+        )
 
         # create settings to ensure the pixel format is correct
         settings = pyjs.js_object()
@@ -330,8 +413,6 @@ class OffscreenCanvas(OffscreenCanvasCore):
         # put_image_data on the offscreen canvas
         self._ctx.putImageData(image, x, y)
 
-
-
     # ensure that the buffer at index hast at least the given size.
     def _ensure_size(self, index, size):
         buffer_size = len(self._buffers[index])
@@ -339,13 +420,15 @@ class OffscreenCanvas(OffscreenCanvasCore):
             # resize the buffer
             new_size = max(size, buffer_size * 2)
             new_buffer = np.zeros(new_size, dtype=np.float32)
-            self._buffers[index] =  new_buffer
-            self._js_buffers[index] = pyjs.buffer_to_js_typed_array(new_buffer, view=True)
+            self._buffers[index] = new_buffer
+            self._js_buffers[index] = pyjs.buffer_to_js_typed_array(
+                new_buffer, view=True
+            )
 
-    # helper to add a list / array of points to a buffer 
+    # helper to add a list / array of points to a buffer
     # (for instance when drawing a polygon from a list of points)
-    def _fill_buffer_with_points(self,index, points):
-        points = np.require(points, requirements='C', dtype=np.float32)
+    def _fill_buffer_with_points(self, index, points):
+        points = np.require(points, requirements="C", dtype=np.float32)
         n_points = int(points.shape[0])
         n_points2 = 2 * n_points
         self._ensure_size(index, n_points2)
@@ -354,25 +437,25 @@ class OffscreenCanvas(OffscreenCanvasCore):
 
     # helper to fill a buffer with a scalar value
     def _fill_buffer_with_scalars(self, index, value):
-        # is number ? 
+        # is number ?
         if isinstance(value, Number):
             self._ensure_size(index, 1)
             self._buffers[index][0] = value
             return 1
-        else: # assume iterable
-            value = np.require(value, requirements='C', dtype=np.float32)
+        else:  # assume iterable
+            value = np.require(value, requirements="C", dtype=np.float32)
             n_values = int(value.shape[0])
             self._ensure_size(index, n_values)
             self._buffers[index][:n_values] = value
             return n_values
+
     # helper to fill a buffer with a color value
     def _fill_buffer_with_colors(self, index, color):
-        arr = np.require(color, requirements='C', dtype=np.float32).flatten()
+        arr = np.require(color, requirements="C", dtype=np.float32).flatten()
         self._ensure_size(index, len(arr))
-        self._buffers[index][:len(arr)] = arr
+        self._buffers[index][: len(arr)] = arr
         return len(arr) / 3
 
-
     def fill_styled_circles(self, x, y, radius, color, alpha=1):
         self._buffers[5][0:5] = [
             self._fill_buffer_with_scalars(0, x),
@@ -380,7 +463,7 @@ class OffscreenCanvas(OffscreenCanvasCore):
             self._fill_buffer_with_scalars(2, radius),
             self._fill_buffer_with_colors(3, color),
             self._fill_buffer_with_scalars(4, alpha),
-        ]   
+        ]
         self._ctx.fillStyledCircles(*self._js_buffers[:6])
 
     def stroke_styled_circles(self, x, y, radius, color, alpha=1):
@@ -390,9 +473,9 @@ class OffscreenCanvas(OffscreenCanvasCore):
             self._fill_buffer_with_scalars(2, radius),
             self._fill_buffer_with_colors(3, color),
             self._fill_buffer_with_scalars(4, alpha),
-        ]   
+        ]
         self._ctx.strokeStyledCircles(*self._js_buffers[:6])
-    
+
     def fill_circles(self, x, y, radius):
         self._buffers[3][0:3] = [
             self._fill_buffer_with_scalars(0, x),
@@ -400,7 +483,7 @@ class OffscreenCanvas(OffscreenCanvasCore):
             self._fill_buffer_with_scalars(2, radius),
         ]
         self._ctx.fillCircles(*self._js_buffers[:4])
-    
+
     def stroke_circles(self, x, y, radius):
         self._buffers[3][0:3] = [
             self._fill_buffer_with_scalars(0, x),
@@ -408,7 +491,7 @@ class OffscreenCanvas(OffscreenCanvasCore):
             self._fill_buffer_with_scalars(2, radius),
         ]
         self._ctx.strokeCircles(*self._js_buffers[:4])
-    
+
     def fill_rects(self, x, y, width, height):
         self._buffers[4][0:4] = [
             self._fill_buffer_with_scalars(0, x),
@@ -417,7 +500,7 @@ class OffscreenCanvas(OffscreenCanvasCore):
             self._fill_buffer_with_scalars(3, height),
         ]
         self._ctx.fillRects(*self._js_buffers[:5])
-    
+
     def stroke_rects(self, x, y, width, height):
         self._buffers[4][0:4] = [
             self._fill_buffer_with_scalars(0, x),
@@ -426,7 +509,7 @@ class OffscreenCanvas(OffscreenCanvasCore):
             self._fill_buffer_with_scalars(3, height),
         ]
         self._ctx.strokeRects(*self._js_buffers[:5])
-    
+
     def fill_styled_rects(self, x, y, width, height, color, alpha=1):
         self._buffers[6][0:6] = [
             self._fill_buffer_with_scalars(0, x),
@@ -437,7 +520,7 @@ class OffscreenCanvas(OffscreenCanvasCore):
             self._fill_buffer_with_scalars(5, alpha),
         ]
         self._ctx.fillStyledRects(*self._js_buffers[:7])
-    
+
     def stroke_styled_rects(self, x, y, width, height, color, alpha=1):
         self._buffers[6][0:6] = [
             self._fill_buffer_with_scalars(0, x),
@@ -448,7 +531,7 @@ class OffscreenCanvas(OffscreenCanvasCore):
             self._fill_buffer_with_scalars(5, alpha),
         ]
         self._ctx.strokeStyledRects(*self._js_buffers[:7])
-    
+
     def fill_arcs(self, x, y, radius, start_angle, end_angle, anticlockwise=False):
         self._buffers[5][0:5] = [
             self._fill_buffer_with_scalars(0, x),
@@ -458,7 +541,7 @@ class OffscreenCanvas(OffscreenCanvasCore):
             self._fill_buffer_with_scalars(4, end_angle),
         ]
         self._ctx.fillArcs(*self._js_buffers[:6], anticlockwise)
-    
+
     def stroke_arcs(self, x, y, radius, start_angle, end_angle, anticlockwise=False):
         self._buffers[5][0:5] = [
             self._fill_buffer_with_scalars(0, x),
@@ -468,8 +551,10 @@ class OffscreenCanvas(OffscreenCanvasCore):
             self._fill_buffer_with_scalars(4, end_angle),
         ]
         self._ctx.strokeArcs(*self._js_buffers[:6], anticlockwise)
-    
-    def fill_styled_arcs(self, x, y, radius, start_angle, end_angle, color, alpha=1, anticlockwise=False):
+
+    def fill_styled_arcs(
+        self, x, y, radius, start_angle, end_angle, color, alpha=1, anticlockwise=False
+    ):
         self._buffers[7][0:7] = [
             self._fill_buffer_with_scalars(0, x),
             self._fill_buffer_with_scalars(1, y),
@@ -480,8 +565,10 @@ class OffscreenCanvas(OffscreenCanvasCore):
             self._fill_buffer_with_scalars(6, alpha),
         ]
         self._ctx.fillStyledArcs(*self._js_buffers[:8], anticlockwise)
-    
-    def stroke_styled_arcs(self, x, y, radius, start_angle, end_angle, color, alpha=1, anticlockwise=False):
+
+    def stroke_styled_arcs(
+        self, x, y, radius, start_angle, end_angle, color, alpha=1, anticlockwise=False
+    ):
         self._buffers[7][0:7] = [
             self._fill_buffer_with_scalars(0, x),
             self._fill_buffer_with_scalars(1, y),
@@ -497,8 +584,10 @@ class OffscreenCanvas(OffscreenCanvasCore):
     def _prepare_multipoint(self, points, points_per_item=None):
         if isinstance(points, list):
             if points_per_item is not None:
-                raise RuntimeError("when points are a list, points_per_item must be None")
-            
+                raise RuntimeError(
+                    "when points are a list, points_per_item must be None"
+                )
+
             points_per_item = []
             np_polygons = []
             for i, polygon_points in enumerate(points):
@@ -516,55 +605,71 @@ class OffscreenCanvas(OffscreenCanvasCore):
 
             return flat_points, points_per_item, num_polygons
         else:
-            raise RuntimeError("points must be a list of numpy arrays or a numpy array with shape (n,2)")
+            raise RuntimeError(
+                "points must be a list of numpy arrays or a numpy array with shape (n,2)"
+            )
 
     def fill_polygons(self, points, points_per_polygon=None):
-        flat_points, points_per_item, num_items = self._prepare_multipoint(points, points_per_polygon)
+        flat_points, points_per_item, num_items = self._prepare_multipoint(
+            points, points_per_polygon
+        )
         self._buffers[2][0:2] = [
             self._fill_buffer_with_scalars(0, flat_points),
             self._fill_buffer_with_scalars(1, points_per_item),
         ]
         self._ctx.fillPolygons(num_items, *self._js_buffers[:3])
-    
+
     def stroke_polygons(self, points, points_per_polygon=None):
-        flat_points, points_per_item, num_items = self._prepare_multipoint(points, points_per_polygon)
+        flat_points, points_per_item, num_items = self._prepare_multipoint(
+            points, points_per_polygon
+        )
         self._buffers[2][0:2] = [
             self._fill_buffer_with_scalars(0, flat_points),
-            self._fill_buffer_with_scalars(1, points_per_item)
+            self._fill_buffer_with_scalars(1, points_per_item),
         ]
         self._ctx.strokePolygons(num_items, *self._js_buffers[:3])
 
-    def fill_styled_polygons(self, points, color, alpha=1, points_per_polygon=None): 
-        flat_points, points_per_item, num_items = self._prepare_multipoint(points, points_per_polygon)
+    def fill_styled_polygons(self, points, color, alpha=1, points_per_polygon=None):
+        flat_points, points_per_item, num_items = self._prepare_multipoint(
+            points, points_per_polygon
+        )
         self._buffers[4][0:4] = [
             self._fill_buffer_with_scalars(0, flat_points),
             self._fill_buffer_with_scalars(1, points_per_item),
-            self._fill_buffer_with_colors(2,  color),
+            self._fill_buffer_with_colors(2, color),
             self._fill_buffer_with_scalars(3, alpha),
         ]
         self._ctx.fillStyledPolygons(num_items, *self._js_buffers[:5])
-    
+
     def stroke_styled_polygons(self, points, color, alpha=1, points_per_polygon=None):
-        flat_points, points_per_item, num_items = self._prepare_multipoint(points, points_per_polygon)
+        flat_points, points_per_item, num_items = self._prepare_multipoint(
+            points, points_per_polygon
+        )
         self._buffers[4][0:4] = [
             self._fill_buffer_with_scalars(0, flat_points.shape[0]),
             self._fill_buffer_with_scalars(1, points_per_item.shape[0]),
-            self._fill_buffer_with_colors(2,  color),
+            self._fill_buffer_with_colors(2, color),
             self._fill_buffer_with_scalars(3, alpha),
         ]
         self._ctx.strokeStyledPolygons(num_items, *self._js_buffers[:5])
 
     # stroke_line_segments
     def stroke_line_segments(self, points, points_per_segment=None):
-        flat_points, points_per_item, num_items = self._prepare_multipoint(points, points_per_segment)
+        flat_points, points_per_item, num_items = self._prepare_multipoint(
+            points, points_per_segment
+        )
         self._buffers[2][0:2] = [
             self._fill_buffer_with_scalars(0, flat_points),
-            self._fill_buffer_with_scalars(1, points_per_item)
+            self._fill_buffer_with_scalars(1, points_per_item),
         ]
         self._ctx.strokeLineSegments(num_items, *self._js_buffers[:3])
-    
-    def stroke_styled_line_segments(self, points, color, alpha=1, points_per_segment=None):
-        flat_points, points_per_item, num_items = self._prepare_multipoint(points, points_per_segment)
+
+    def stroke_styled_line_segments(
+        self, points, color, alpha=1, points_per_segment=None
+    ):
+        flat_points, points_per_item, num_items = self._prepare_multipoint(
+            points, points_per_segment
+        )
         self._buffers[4][0:4] = [
             self._fill_buffer_with_scalars(0, flat_points),
             self._fill_buffer_with_scalars(1, points_per_item),
@@ -573,42 +678,81 @@ class OffscreenCanvas(OffscreenCanvasCore):
         ]
         self._ctx.strokeStyledLineSegments(num_items, *self._js_buffers[:5])
 
+    def _texts_args(self, texts, x, y, color, alpha, font, max_width):
+        # the strings are deduplicated and sent as one "\0" separated string,
+        # the buffers contain the index of the string (and font) of each item
+        if isinstance(texts, str):
+            strings, indices = [texts], 0
+        else:
+            strings, indices = string_table(texts)
+        if font is None or isinstance(font, str):
+            fonts, font_indices = [font or ""], None
+        else:
+            fonts, font_indices = string_table(font)
+
+        self._buffers[7][0:7] = [
+            self._fill_buffer_with_scalars(0, indices),
+            self._fill_buffer_with_scalars(1, x),
+            self._fill_buffer_with_scalars(2, y),
+            0 if color is None else self._fill_buffer_with_colors(3, color),
+            self._fill_buffer_with_scalars(4, alpha),
+            (
+                0
+                if font_indices is None
+                else self._fill_buffer_with_scalars(5, font_indices)
+            ),
+            0 if max_width is None else self._fill_buffer_with_scalars(6, max_width),
+        ]
+        return ["\0".join(strings), "\0".join(fonts), *self._js_buffers[:8]]
+
+    def fill_texts(self, texts, x, y, color=None, alpha=1, font=None, max_width=None):
+        self._ctx.fillTexts(
+            *self._texts_args(texts, x, y, color, alpha, font, max_width)
+        )
+
+    def stroke_texts(self, texts, x, y, color=None, alpha=1, font=None, max_width=None):
+        self._ctx.strokeTexts(
+            *self._texts_args(texts, x, y, color, alpha, font, max_width)
+        )
+
 
 # helper function to create a property that maps to a js property
 def _make_prop(js_name):
     @property
     def prop(self):
         return getattr(self._ctx, js_name)
+
     @prop.setter
     def prop(self, value):
         setattr(self._ctx, js_name, value)
 
     return prop
-    
+
+
 # helper function st. we can have pythonic properties (ie `fill_style` instead of `fillStyle`)
 def _extend_canvas():
 
     # add properties to the Canvas class
     py_to_js_name = {
-        'fill_style': 'fillStyle',
-        'stroke_style': 'strokeStyle',
-        'global_alpha': 'globalAlpha',
-        'font': 'font',
-        'text_align': 'textAlign',
-        'text_baseline': 'textBaseline',
-        'direction': 'direction',
-        'global_composite_operation': 'globalCompositeOperation',
-        'shadow_offset_x': 'shadowOffsetX',
-        'shadow_offset_y': 'shadowOffsetY',
-        'shadow_blur': 'shadowBlur',
-        'shadow_color': 'shadowColor',
-        'line_width': 'lineWidth',
-        'line_cap': 'lineCap',
-        'line_join': 'lineJoin',
-        'miter_limit': 'miterLimit',
-        'filter': 'filter',
-        'image_smoothing_enabled': 'imageSmoothingEnabled',
-        'line_dash_offset': 'lineDashOffset'
+        "fill_style": "fillStyle",
+        "stroke_style": "strokeStyle",
+        "global_alpha": "globalAlpha",
+        "font": "font",
+        "text_align": "textAlign",
+        "text_baseline": "textBaseline",
+        "direction": "direction",
+        "global_composite_operation": "globalCompositeOperation",
+        "shadow_offset_x": "shadowOffsetX",
+        "shadow_offset_y": "shadowOffsetY",
+        "shadow_blur": "shadowBlur",
+        "shadow_color": "shadowColor",
+        "line_width": "lineWidth",
+        "line_cap": "lineCap",
+        "line_join": "lineJoin",
+        "miter_limit": "miterLimit",
+        "filter": "filter",
+        "image_smoothing_enabled": "imageSmoothingEnabled",
+        "line_dash_offset": "lineDashOffset",
     }
     for py_name, js_name in py_to_js_name.items():
         prop = _make_prop(js_name)
@@ -616,4 +760,4 @@ def _extend_canvas():
 
 
 _extend_canvas()
-del _extend_canvas
\ No newline at end of file
+del _extend_canvas
@@ -0,0 +1,1335 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) Martin Renou.
+# Distributed under the terms of the Modified BSD License.
+
+"""Reference rasterizer executing the draw commands in Python.
+
+Shapes are turned into polygons in device space and scan-converted with NumPy, sampling one point
+at the center of each pixel (no anti-aliasing). Pixels are stored as premultiplied RGBA floats and
+composited with the ``source-over`` operator, respecting the order of the draw commands.
+
+Known differences with the browser:
+
+- no anti-aliasing, text rendering (``fill_text``, ``fill_texts``, ``stroke_texts``...), gradients,
+  patterns, shadows, filters or line dashes
+- ``Path2D`` objects built from an SVG path string are not drawn, only the ones built from arrays
+- composite operations other than ``source-over`` are rendered as ``source-over``
+- line joins are rendered round and line caps butt, line widths are scaled uniformly by transforms
+- images are only translated and scaled by the current transform
+- ``arc_to`` draws a straight line to its first control point
+- RoughCanvas commands are rendered as regular shapes
+"""
+
+import math
+import re
+import warnings
+import weakref
+from contextlib import contextmanager
+from io import BytesIO
+
+import numpy as np
+from PIL import Image as PILImage, ImageColor
+
+from ipywidgets import Image, widget_serialization
+
+from .transport import RecordingTransport
+from .utils import PATH_OPCODE_SIZES
+
+# Maximum number of pixels rasterized at once by batch commands, bounding the memory usage
+_PIXEL_BUDGET = 1 << 21
+
+# Indices of the attributes set with the "set" command, see ``Canvas.ATTRS``
+_FILL_STYLE = 0
+_STROKE_STYLE = 1
+_GLOBAL_ALPHA = 2
+_GLOBAL_COMPOSITE_OPERATION = 7
+_LINE_WIDTH = 8
+
+_rgba_re = re.compile(r"^\s*(rgb|hsl)a?\((.*)\)\s*$")
+
+
+def _parse_color(value):
+    """Turn a CSS color into a tuple of RGBA floats in [0, 1], ``None`` if it is not a plain color."""
+    if not isinstance(value, str) or value.startswith("IPY_MODEL_"):
+        return None
+
+    value = value.strip().lower()
+    if value == "transparent":
+        return (0.0, 0.0, 0.0, 0.0)
+
+    alpha = 1.0
+    match = _rgba_re.match(value)
+    if match is not None:
+        components = match.group(2).replace(",", " ").replace("/", " ").split()
+        if len(components) == 4:
+            alpha = components[3]
+            alpha = float(alpha[:-1]) / 100 if alpha.endswith("%") else float(alpha)
+        value = "{}({})".format(match.group(1), ",".join(components[:3]))
+
+    try:
+        r, g, b, a = ImageColor.getcolor(value, "RGBA")
+    except ValueError:
+        return None
+
+    return (r / 255, g / 255, b / 255, a / 255 * min(max(alpha, 0.0), 1.0))
+
+
+def _premultiply(colors, alpha):
+    """Turn RGB colors in [0, 1] and alphas into premultiplied RGBA colors."""
+    colors = np.asarray(colors, dtype=np.float64).reshape(-1, 3)
+    alpha = np.broadcast_to(np.asarray(alpha, dtype=np.float64), len(colors))
+    return np.column_stack((colors * alpha[:, None], alpha))
+
+
+def _apply_transform(transform, points):
+    return points @ transform[:2, :2].T + transform[:2, 2]
+
+
+def _rgba(image):
+    """Turn a grayscale, RGB or RGBA uint8 image into an RGBA one."""
+    image = np.asarray(image)
+    if image.ndim == 2:
+        image = np.stack((image,) * 3, axis=-1)
+    if image.shape[2] == 3:
+        image = np.concatenate(
+            (image, np.full(image.shape[:2] + (1,), 255, image.dtype)), axis=-1
+        )
+    return image
+
+
+def _batch_arg(value, n):
+    """Broadcast a scalar or array argument to ``n`` float values."""
+    return np.broadcast_to(np.asarray(value, dtype=np.float64).ravel(), n)[:n]
+
+
+def _batch_length(*values):
+    lengths = [np.size(value) for value in values if np.ndim(value) > 0]
+    return min(lengths) if lengths else 1
+
+
+def _chunks(costs, budget=_PIXEL_BUDGET):
+    """Split items into consecutive slices whose total cost is bounded by ``budget``."""
+    if not len(costs):
+        return []
+    chunk_ids = (np.cumsum(costs) - costs) // budget
+    bounds = np.concatenate(([0], np.flatnonzero(np.diff(chunk_ids)) + 1, [len(costs)]))
+    return [slice(start, stop) for start, stop in zip(bounds[:-1], bounds[1:])]
+
+
+def _arc_points(cx, cy, rx, ry, start, end, anticlockwise, n_segments, rotation=0.0):
+    """Return an array of shape (n_arcs, n_segments + 1, 2) of points on arcs, following the canvas
+    spec for the sweep angle."""
+    start = np.asarray(start, dtype=np.float64)
+    end = np.asarray(end, dtype=np.float64)
+    anticlockwise = np.asarray(anticlockwise, dtype=bool)
+
+    two_pi = 2 * math.pi
+    sweep = np.where(
+        anticlockwise,
+        np.where(start - end >= two_pi, -two_pi, -np.mod(start - end, two_pi)),
+        np.where(end - start >= two_pi, two_pi, np.mod(end - start, two_pi)),
+    )
+
+    t = np.linspace(0.0, 1.0, n_segments + 1)
+    angles = start[..., None] + sweep[..., None] * t
+    x = np.asarray(rx)[..., None] * np.cos(angles)
+    y = np.asarray(ry)[..., None] * np.sin(angles)
+    if rotation:
+        x, y = (
+            x * math.cos(rotation) - y * math.sin(rotation),
+            x * math.sin(rotation) + y * math.cos(rotation),
+        )
+
+    return np.stack(
+        (np.asarray(cx)[..., None] + x, np.asarray(cy)[..., None] + y), axis=-1
+    )
+
+
+def _segments_for_radius(radius):
+    return int(min(max(math.ceil(radius), 8), 256))
+
+
+def _rings(rings):
+    """Concatenate a list of (n_points, 2) arrays into the (points, ring_starts) representation."""
+    rings = [ring for ring in rings if len(ring)]
+    if not rings:
+        return np.empty((0, 2)), np.empty(0, dtype=np.int64)
+    lengths = np.array([len(ring) for ring in rings])
+    return np.concatenate(rings), np.concatenate(([0], np.cumsum(lengths)[:-1]))
+
+
+def _scan(points, ring_starts, ring_shapes, width, height, evenodd=False):
+    """Scan-convert polygons (made of one or several rings) into horizontal pixel spans.
+
+    Returns the shape, row, first and last (exclusive) columns of each span, sorted by shape.
+    """
+    empty = np.empty(0, dtype=np.int64)
+    n_points = len(points)
+    if not n_points:
+        return empty, empty, empty, empty
+
+    ring_lengths = np.diff(np.append(ring_starts, n_points))
+    ring_of_point = np.repeat(np.arange(len(ring_starts)), ring_lengths)
+
+    # Edges between consecutive points, closing the rings
+    next_point = np.arange(1, n_points + 1)
+    next_point[ring_starts + ring_lengths - 1] = ring_starts
+
+    x0, y0 = points[:, 0], points[:, 1]
+    x1, y1 = x0[next_point], y0[next_point]
+
+    with np.errstate(invalid="ignore"):
+        # Rows whose center is crossed by the edge
+        row_start = np.ceil(np.minimum(y0, y1) - 0.5)
+        row_stop = np.ceil(np.maximum(y0, y1) - 0.5)
+        row_start = np.nan_to_num(np.clip(row_start, 0, height)).astype(np.int64)
+        row_stop = np.nan_to_num(np.clip(row_stop, 0, height)).astype(np.int64)
+    counts = np.maximum(row_stop - row_start, 0)
+
+    edges = np.flatnonzero(counts)
+    counts = counts[edges]
+    total = int(counts.sum())
+    if not total:
+        return empty, empty, empty, empty
+
+    offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    crossing_edges = np.repeat(edges, counts)
+    rows = np.repeat(row_start[edges], counts) + offsets
+
+    ex0, ey0 = x0[crossing_edges], y0[crossing_edges]
+    ex1, ey1 = x1[crossing_edges], y1[crossing_edges]
+    xs = ex0 + (rows + 0.5 - ey0) * (ex1 - ex0) / (ey1 - ey0)
+    directions = np.where(ey1 > ey0, 1, -1)
+    shapes = ring_shapes[ring_of_point[crossing_edges]]
+
+    order = np.lexsort((xs, rows, shapes))
+    xs, rows, shapes, directions = (
+        xs[order],
+        rows[order],
+        shapes[order],
+        directions[order],
+    )
+
+    keys = shapes * height + rows
+    group_start = np.ones(total, dtype=bool)
+    group_start[1:] = keys[1:] != keys[:-1]
+    starts = np.flatnonzero(group_start)
+    group_of = np.cumsum(group_start) - 1
+
+    if evenodd:
+        inside = (np.arange(total) - starts[group_of]) % 2 == 0
+    else:
+        winding = np.cumsum(directions)
+        winding -= (winding[starts] - directions[starts])[group_of]
+        inside = winding != 0
+
+    span = inside[:-1] & ~group_start[1:]
+    first = np.flatnonzero(span)
+
+    with np.errstate(invalid="ignore"):
+        col_start = np.clip(np.ceil(xs[first] - 0.5), 0, width)
+        col_stop = np.clip(np.ceil(xs[first + 1] - 0.5), 0, width)
+    col_start = np.nan_to_num(col_start).astype(np.int64)
+    col_stop = np.nan_to_num(col_stop).astype(np.int64)
+    valid = col_stop > col_start
+
+    return (
+        shapes[first][valid],
+        rows[first][valid],
+        col_start[valid],
+        col_stop[valid],
+    )
+
+
+def _spans_to_pixels(shapes, rows, col_start, col_stop, width):
+    lengths = col_stop - col_start
+    total = int(lengths.sum())
+    offsets = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    pixels = np.repeat(rows * width + col_start, lengths) + offsets
+    return pixels, np.repeat(shapes, lengths)
+
+
+def _stroke_outline(points, line_starts, line_shapes, closed, half_width):
+    """Turn polylines into rings covering their stroke: one quad per segment and a polygonal disc
+    per join, all of them with the same orientation so that they add up with the nonzero rule.
+    """
+    n_points = len(points)
+    if not n_points:
+        return np.empty((0, 2)), np.empty(0, dtype=np.int64), np.empty(0, np.int64)
+
+    line_lengths = np.diff(np.append(line_starts, n_points))
+    line_of_point = np.repeat(np.arange(len(line_starts)), line_lengths)
+    line_end = line_starts + line_lengths - 1
+
+    # Segments start at every point but the last of open lines
+    next_point = np.arange(1, n_points + 1)
+    next_point[line_end] = line_starts
+    has_segment = np.ones(n_points, dtype=bool)
+    has_segment[line_end[~closed]] = False
+
+    seg_start = np.flatnonzero(has_segment)
+    p = points[seg_start]
+    q = points[next_point[seg_start]]
+    d = q - p
+    length = np.hypot(d[:, 0], d[:, 1])
+    nonzero = length > 0
+    seg_start, p, q, d, length = (
+        seg_start[nonzero],
+        p[nonzero],
+        q[nonzero],
+        d[nonzero],
+        length[nonzero],
+    )
+
+    normal = np.column_stack((-d[:, 1], d[:, 0])) * (half_width / length)[:, None]
+    quads = np.stack((p + normal, q + normal, q - normal, p - normal), axis=1)
+    quad_shapes = line_shapes[line_of_point[seg_start]]
+
+    rings = [quads.reshape(-1, 2)]
+    shapes = [quad_shapes]
+    sizes = [np.full(len(quads), 4)]
+
+    if half_width >= 1:
+        # Round joins between segments
+        is_join = np.ones(n_points, dtype=bool)
+        is_join[line_starts[~closed]] = False
+        is_join[line_end[~closed]] = False
+        joins = np.flatnonzero(is_join)
+
+        n_segments = _segments_for_radius(half_width)
+        angles = np.linspace(2 * math.pi, 0, n_segments, endpoint=False)
+        circle = np.column_stack((np.cos(angles), np.sin(angles))) * half_width
+        discs = points[joins][:, None, :] + circle
+
+        rings.append(discs.reshape(-1, 2))
+        shapes.append(line_shapes[line_of_point[joins]])
+        sizes.append(np.full(len(joins), n_segments))
+
+    sizes = np.concatenate(sizes)
+    return (
+        np.concatenate(rings),
+        np.cumsum(sizes) - sizes,
+        np.concatenate(shapes),
+    )
+
+
+class _State:
+    def __init__(self):
+        self.fill_style = (0.0, 0.0, 0.0, 1.0)
+        self.stroke_style = (0.0, 0.0, 0.0, 1.0)
+        self.global_alpha = 1.0
+        self.line_width = 1.0
+        self.transform = np.eye(3)
+        self.clip = None
+
+    def copy(self):
+        state = _State()
+        state.__dict__.update(self.__dict__)
+        return state
+
+
+class _Surface:
+    """The pixels and drawing state of one canvas."""
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.pixels = np.zeros((width * height, 4))
+        self.state = _State()
+        self.stack = []
+
+        # Sub-paths of the current path in device space: list of [points, closed]
+        self.path = []
+
+        # Coverage counts of the current uniform batch, see ``uniform_batch``
+        self._counts = None
+
+    @property
+    def scale(self):
+        transform = self.state.transform
+        return math.sqrt(abs(np.linalg.det(transform[:2, :2])))
+
+    def image(self):
+        """Return the pixels as a (height, width, 4) array of straight uint8 RGBA values."""
+        pixels = self.pixels.reshape(self.height, self.width, 4)
+        alpha = pixels[..., 3:]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            rgb = np.where(alpha > 0, pixels[..., :3] / alpha, 0)
+        image = np.concatenate((rgb, alpha), axis=-1)
+        return np.round(np.clip(image, 0, 1) * 255).astype(np.uint8)
+
+    def composite(self, pixels, colors, unique=False):
+        """Composite premultiplied ``colors`` over ``pixels`` with the source-over operator.
+
+        Pixels may appear several times, in which case the colors are composited in order.
+        """
+        if self.state.clip is not None:
+            visible = self.state.clip[pixels]
+            pixels = pixels[visible]
+            colors = colors[visible]
+        if not len(pixels):
+            return
+
+        if unique:
+            self.pixels[pixels] = colors + self.pixels[pixels] * (1 - colors[:, 3:])
+            return
+
+        # out = dst * prod(1 - a_j) + sum_i src_i * prod_{j > i}(1 - a_j), computed per pixel in
+        # log space; sources below the last opaque one of a pixel are hidden
+        order = np.argsort(pixels, kind="stable")
+        pixels = pixels[order]
+        colors = colors[order]
+        alpha = colors[:, 3]
+
+        n = len(pixels)
+        group_start = np.ones(n, dtype=bool)
+        group_start[1:] = pixels[1:] != pixels[:-1]
+        starts = np.flatnonzero(group_start)
+        group_of = np.cumsum(group_start) - 1
+
+        position = np.arange(n)
+        opaque = alpha >= 1
+        last_opaque = np.maximum.reduceat(np.where(opaque, position, -1), starts)
+        alive = position >= last_opaque[group_of]
+
+        with np.errstate(divide="ignore"):
+            log_transmittance = np.log1p(-np.minimum(alpha, 1))
+        log_transmittance = np.where(alive & ~opaque, log_transmittance, 0)
+
+        cumulative = np.cumsum(log_transmittance)
+        before_group = (cumulative[starts] - log_transmittance[starts])[group_of]
+        group_total = np.add.reduceat(log_transmittance, starts)
+        after = group_total[group_of] - (cumulative - before_group)
+
+        weights = np.where(alive, np.exp(after), 0)
+        contributions = np.add.reduceat(colors * weights[:, None], starts)
+        dst_factor = np.where(last_opaque >= 0, 0, np.exp(group_total))
+
+        targets = pixels[starts]
+        self.pixels[targets] = (
+            self.pixels[targets] * dst_factor[:, None] + contributions
+        )
+
+    def composite_uniform(self, pixels, color):
+        """Composite the premultiplied ``color`` over ``pixels``, which may appear several times."""
+        if self.state.clip is not None:
+            pixels = pixels[self.state.clip[pixels]]
+        counts = np.bincount(pixels, minlength=len(self.pixels))
+
+        if self._counts is not None:
+            self._counts += counts
+        else:
+            self._composite_counts(counts, color)
+
+    @contextmanager
+    def uniform_batch(self, colors):
+        """Accumulate the coverage of the shapes drawn with a single color, compositing them at once."""
+        if len(colors) != 1:
+            yield
+            return
+
+        self._counts = np.zeros(len(self.pixels), dtype=np.int64)
+        try:
+            yield
+        finally:
+            counts, self._counts = self._counts, None
+            self._composite_counts(counts, colors[0])
+
+    def _composite_counts(self, counts, color):
+        targets = np.flatnonzero(counts)
+        alpha = color[3]
+        if not len(targets) or alpha <= 0:
+            return
+
+        if alpha >= 1:
+            self.pixels[targets] = color
+            return
+
+        # Compositing a color k times: dst * (1 - a)^k + src * (1 - (1 - a)^k) / a
+        transmittance = (1 - alpha) ** counts[targets]
+        self.pixels[targets] = (
+            self.pixels[targets] * transmittance[:, None]
+            + color * ((1 - transmittance) / alpha)[:, None]
+        )
+
+    def fill_rings(self, points, ring_starts, ring_shapes, colors, evenodd=False):
+        """Fill polygons in device space, ``colors`` being premultiplied RGBA colors per shape."""
+        shapes, rows, col_start, col_stop = _scan(
+            points, ring_starts, ring_shapes, self.width, self.height, evenodd
+        )
+        pixels, pixel_shapes = _spans_to_pixels(
+            shapes, rows, col_start, col_stop, self.width
+        )
+        if len(colors) == 1:
+            self.composite_uniform(pixels, colors[0])
+        else:
+            self.composite(pixels, colors[pixel_shapes])
+
+    def clear_rings(self, points, ring_starts):
+        shapes, rows, col_start, col_stop = _scan(
+            points,
+            ring_starts,
+            np.zeros(len(ring_starts), dtype=np.int64),
+            self.width,
+            self.height,
+        )
+        pixels, _ = _spans_to_pixels(shapes, rows, col_start, col_stop, self.width)
+        if self.state.clip is not None:
+            pixels = pixels[self.state.clip[pixels]]
+        self.pixels[pixels] = 0
+
+    def stroke_lines(self, points, line_starts, line_shapes, closed, colors):
+        """Stroke polylines in device space, ``colors`` being premultiplied RGBA colors per line."""
+        half_width = self.state.line_width * self.scale / 2
+        if half_width <= 0:
+            return
+        points, ring_starts, ring_shapes = _stroke_outline(
+            points, line_starts, line_shapes, closed, half_width
+        )
+        self.fill_rings(points, ring_starts, ring_shapes, colors)
+
+    def style_colors(self, fill):
+        """The premultiplied color of the current fill or stroke style, ``None`` if unsupported."""
+        style = self.state.fill_style if fill else self.state.stroke_style
+        if style is None:
+            return None
+        r, g, b, a = style
+        return _premultiply([r, g, b], [a * self.state.global_alpha])
+
+
+class Rasterizer:
+    """Execute draw commands into NumPy RGBA images, one per canvas."""
+
+    def __init__(self):
+        self._surfaces = weakref.WeakKeyDictionary()
+        self._warned = set()
+
+    def get_image_data(self, canvas):
+        """Return the image of a Canvas or MultiCanvas as a (height, width, 4) uint8 array, ``None``
+        if nothing was drawn on it."""
+        layers = getattr(canvas, "_canvases", None)
+        if layers is None:
+            surface = self._surfaces.get(canvas)
+            return surface.image() if surface is not None else None
+
+        surfaces = [self._surfaces.get(layer) for layer in layers]
+        surfaces = [surface for surface in surfaces if surface is not None]
+        if not surfaces:
+            return None
+
+        result = _Surface(surfaces[0].width, surfaces[0].height)
+        for surface in surfaces:
+            if (surface.width, surface.height) == (result.width, result.height):
+                result.composite(
+                    np.arange(len(surface.pixels)), surface.pixels, unique=True
+                )
+        return result.image()
+
+    def execute(self, canvas, name, args, buffers=[], arg=None):
+        """Execute the command ``name`` on the surface of ``canvas``.
+
+        ``arg`` is a function returning an argument by index, decoding the binary buffers.
+        """
+        surface = self._surfaces.get(canvas)
+        if surface is None or (surface.width, surface.height) != (
+            canvas.width,
+            canvas.height,
+        ):
+            # Resizing a canvas clears it
+            surface = self._surfaces[canvas] = _Surface(canvas.width, canvas.height)
+
+        handler = self._HANDLERS.get(name)
+        if handler is None:
+            self._warn(name)
+            return
+
+        if arg is None:
+            arg = args.__getitem__
+        handler(self, surface, args, buffers, arg)
+
+    def _warn(self, what):
+        if what not in self._warned:
+            self._warned.add(what)
+            warnings.warn(
+                "'{}' is not supported by the rasterizer and will be ignored".format(
+                    what
+                ),
+                RuntimeWarning,
+            )
+
+    # Rectangles
+    def _rect_rings(self, surface, x, y, width, height):
+        corners = np.stack(
+            (
+                np.column_stack((x, y)),
+                np.column_stack((x + width, y)),
+                np.column_stack((x + width, y + height)),
+                np.column_stack((x, y + height)),
+            ),
+            axis=1,
+        )
+        points = _apply_transform(surface.state.transform, corners.reshape(-1, 2))
+        return points, np.arange(len(x)) * 4
+
+    def _draw_rects(self, surface, x, y, width, height, fill, colors=None):
+        if colors is None:
+            colors = surface.style_colors(fill)
+            if colors is None:
+                return self._warn("gradient and pattern styles")
+
+        scale = surface.scale
+        costs = (np.abs(width * height) + np.abs(width) + np.abs(height)) * scale**2
+        with surface.uniform_batch(colors):
+            self._draw_rect_chunks(surface, x, y, width, height, fill, colors, costs)
+
+    def _draw_rect_chunks(self, surface, x, y, width, height, fill, colors, costs):
+        for chunk in _chunks(np.nan_to_num(costs) + 4):
+            points, ring_starts = self._rect_rings(
+                surface, x[chunk], y[chunk], width[chunk], height[chunk]
+            )
+            chunk_colors = colors if len(colors) == 1 else colors[chunk]
+            shapes = np.arange(len(ring_starts))
+            if fill:
+                surface.fill_rings(points, ring_starts, shapes, chunk_colors)
+            else:
+                surface.stroke_lines(
+                    points,
+                    ring_starts,
+                    shapes,
+                    np.ones(len(ring_starts), dtype=bool),
+                    chunk_colors,
+                )
+
+    def _fill_rect(self, surface, args, buffers, arg):
+        x, y, width, height = (np.array([value], dtype=np.float64) for value in args)
+        self._draw_rects(surface, x, y, width, height, True)
+
+    def _stroke_rect(self, surface, args, buffers, arg):
+        x, y, width, height = (np.array([value], dtype=np.float64) for value in args)
+        self._draw_rects(surface, x, y, width, height, False)
+
+    def _clear_rect(self, surface, args, buffers, arg):
+        x, y, width, height = (np.array([value], dtype=np.float64) for value in args)
+        surface.clear_rings(*self._rect_rings(surface, x, y, width, height))
+
+    def _rect_batch(self, args, arg):
+        values = [arg(idx) for idx in range(4)]
+        n = _batch_length(*values)
+        return [_batch_arg(value, n) for value in values]
+
+    def _fill_rects(self, surface, args, buffers, arg):
+        self._draw_rects(surface, *self._rect_batch(args, arg), True)
+
+    def _stroke_rects(self, surface, args, buffers, arg):
+        self._draw_rects(surface, *self._rect_batch(args, arg), False)
+
+    def _styled_colors(self, surface, colors, alpha, n):
+        colors = np.asarray(colors, dtype=np.float64).ravel()[: 3 * n] / 255
+        alpha = _batch_arg(alpha, n) * surface.state.global_alpha
+        return _premultiply(colors, alpha)
+
+    def _fill_styled_rects(self, surface, args, buffers, arg):
+        x, y, width, height = self._rect_batch(args, arg)
+        colors = self._styled_colors(surface, arg(4), arg(5), len(x))
+        self._draw_rects(surface, x, y, width, height, True, colors)
+
+    def _stroke_styled_rects(self, surface, args, buffers, arg):
+        x, y, width, height = self._rect_batch(args, arg)
+        colors = self._styled_colors(surface, arg(4), arg(5), len(x))
+        self._draw_rects(surface, x, y, width, height, False, colors)
+
+    # Arcs and circles
+    def _draw_arcs(
+        self, surface, x, y, radius, start, end, anticlockwise, fill, colors
+    ):
+        if colors is None:
+            colors = surface.style_colors(fill)
+            if colors is None:
+                return self._warn("gradient and pattern styles")
+
+        with surface.uniform_batch(colors):
+            self._draw_arc_chunks(
+                surface, x, y, radius, start, end, anticlockwise, fill, colors
+            )
+
+    def _draw_arc_chunks(
+        self, surface, x, y, radius, start, end, anticlockwise, fill, colors
+    ):
+        scale = surface.scale
+        costs = (2 * np.abs(radius) * scale + 2) ** 2
+        for chunk in _chunks(np.nan_to_num(costs)):
+            n = chunk.stop - chunk.start
+            n_segments = _segments_for_radius(np.max(np.abs(radius[chunk])) * scale)
+            arcs = _arc_points(
+                x[chunk],
+                y[chunk],
+                radius[chunk],
+                radius[chunk],
+                start[chunk],
+                end[chunk],
+                anticlockwise[chunk],
+                n_segments,
+            )
+            chunk_colors = colors if len(colors) == 1 else colors[chunk]
+            shapes = np.arange(n)
+
+            if fill:
+                # Pie slices: center, then the arc
+                centers = np.column_stack((x[chunk], y[chunk]))[:, None, :]
+                rings = np.concatenate((centers, arcs), axis=1)
+                points = _apply_transform(surface.state.transform, rings.reshape(-1, 2))
+                surface.fill_rings(
+                    points, shapes * rings.shape[1], shapes, chunk_colors
+                )
+            else:
+                points = _apply_transform(surface.state.transform, arcs.reshape(-1, 2))
+                surface.stroke_lines(
+                    points,
+                    shapes * arcs.shape[1],
+                    shapes,
+                    np.zeros(n, dtype=bool),
+                    chunk_colors,
+                )
+
+    def _arc_batch(self, arg):
+        values = [arg(idx) for idx in range(5)]
+        n = _batch_length(*values)
+        values = [_batch_arg(value, n) for value in values]
+        anticlockwise = np.broadcast_to(np.asarray(arg(5), dtype=bool).ravel(), n)
+        return values + [anticlockwise]
+
+    def _circle_batch(self, arg):
+        values = [arg(idx) for idx in range(3)]
+        n = _batch_length(*values)
+        x, y, radius = [_batch_arg(value, n) for value in values]
+        return (
+            x,
+            y,
+            radius,
+            np.zeros(n),
+            np.full(n, 2 * math.pi),
+            np.zeros(n, dtype=bool),
+        )
+
+    def _fill_arc(self, surface, args, buffers, arg):
+        x, y, radius, start, end, anticlockwise = (np.array([value]) for value in args)
+        self._draw_arcs(
+            surface, x, y, radius, start, end, anticlockwise.astype(bool), True, None
+        )
+
+    def _stroke_arc(self, surface, args, buffers, arg):
+        x, y, radius, start, end, anticlockwise = (np.array([value]) for value in args)
+        self._draw_arcs(
+            surface, x, y, radius, start, end, anticlockwise.astype(bool), False, None
+        )
+
+    def _fill_circle(self, surface, args, buffers, arg):
+        self._draw_arcs(surface, *self._circle_batch(arg), True, None)
+
+    def _stroke_circle(self, surface, args, buffers, arg):
+        self._draw_arcs(surface, *self._circle_batch(arg), False, None)
+
+    def _fill_arcs(self, surface, args, buffers, arg):
+        self._draw_arcs(surface, *self._arc_batch(arg), True, None)
+
+    def _stroke_arcs(self, surface, args, buffers, arg):
+        self._draw_arcs(surface, *self._arc_batch(arg), False, None)
+
+    _fillCircles = _fill_circle
+    _strokeCircles = _stroke_circle
+
+    def _fill_styled_circles(self, surface, args, buffers, arg):
+        batch = self._circle_batch(arg)
+        colors = self._styled_colors(surface, arg(3), arg(4), len(batch[0]))
+        self._draw_arcs(surface, *batch, True, colors)
+
+    def _stroke_styled_circles(self, surface, args, buffers, arg):
+        batch = self._circle_batch(arg)
+        colors = self._styled_colors(surface, arg(3), arg(4), len(batch[0]))
+        self._draw_arcs(surface, *batch, False, colors)
+
+    def _fill_styled_arcs(self, surface, args, buffers, arg):
+        batch = self._arc_batch(arg)
+        colors = self._styled_colors(surface, arg(6), arg(7), len(batch[0]))
+        self._draw_arcs(surface, *batch, True, colors)
+
+    def _stroke_styled_arcs(self, surface, args, buffers, arg):
+        batch = self._arc_batch(arg)
+        colors = self._styled_colors(surface, arg(6), arg(7), len(batch[0]))
+        self._draw_arcs(surface, *batch, False, colors)
+
+    # Lines and polygons
+    def _draw_polylines(self, surface, points, sizes, fill, close, colors=None):
+        if colors is None:
+            colors = surface.style_colors(fill)
+            if colors is None:
+                return self._warn("gradient and pattern styles")
+
+        points = _apply_transform(
+            surface.state.transform, np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        )
+        sizes = np.asarray(sizes, dtype=np.int64)
+        starts = np.cumsum(sizes) - sizes
+
+        # Bound the memory usage using the bounding boxes of the polylines
+        non_empty = sizes > 0
+        costs = np.zeros(len(sizes))
+        if non_empty.any():
+            mins = np.minimum.reduceat(points, starts[non_empty])
+            maxs = np.maximum.reduceat(points, starts[non_empty])
+            extent = maxs - mins + 2 + surface.state.line_width * surface.scale
+            costs[non_empty] = np.prod(extent, axis=1) + sizes[non_empty]
+
+        with surface.uniform_batch(colors):
+            self._draw_polyline_chunks(
+                surface, points, sizes, starts, costs, fill, close, colors
+            )
+
+    def _draw_polyline_chunks(
+        self, surface, points, sizes, starts, costs, fill, close, colors
+    ):
+        for chunk in _chunks(np.nan_to_num(costs)):
+            chunk_sizes = sizes[chunk]
+            keep = chunk_sizes > 0
+            chunk_starts = starts[chunk][keep]
+            if not len(chunk_starts):
+                continue
+            first = chunk_starts[0]
+            last = chunk_starts[-1] + chunk_sizes[keep][-1]
+            chunk_points = points[first:last]
+            shapes = np.flatnonzero(keep)
+            chunk_colors = colors if len(colors) == 1 else colors[chunk]
+
+            if fill:
+                surface.fill_rings(
+                    chunk_points, chunk_starts - first, shapes, chunk_colors
+                )
+            else:
+                surface.stroke_lines(
+                    chunk_points,
+                    chunk_starts - first,
+                    shapes,
+                    np.full(len(shapes), close),
+                    chunk_colors,
+                )
+
+    def _stroke_line(self, surface, args, buffers, arg):
+        self._draw_polylines(surface, args[:4], [2], False, False)
+
+    def _stroke_lines(self, surface, args, buffers, arg):
+        points = np.asarray(arg(0)).reshape(-1, 2)
+        self._draw_polylines(surface, points, [len(points)], False, False)
+
+    def _fill_polygon(self, surface, args, buffers, arg):
+        points = np.asarray(arg(0)).reshape(-1, 2)
+        self._draw_polylines(surface, points, [len(points)], True, True)
+
+    def _stroke_polygon(self, surface, args, buffers, arg):
+        points = np.asarray(arg(0)).reshape(-1, 2)
+        self._draw_polylines(surface, points, [len(points)], False, True)
+
+    def _polygon_batch(self, arg):
+        n = int(arg(0))
+        sizes = np.broadcast_to(np.asarray(arg(2), dtype=np.int64).ravel(), n)
+        return arg(1), sizes[:n], n
+
+    def _fill_polygons(self, surface, args, buffers, arg):
+        points, sizes, _ = self._polygon_batch(arg)
+        self._draw_polylines(surface, points, sizes, True, True)
+
+    def _stroke_polygons(self, surface, args, buffers, arg):
+        points, sizes, _ = self._polygon_batch(arg)
+        self._draw_polylines(surface, points, sizes, False, True)
+
+    def _stroke_line_segments(self, surface, args, buffers, arg):
+        points, sizes, _ = self._polygon_batch(arg)
+        self._draw_polylines(surface, points, sizes, False, False)
+
+    def _fill_styled_polygons(self, surface, args, buffers, arg):
+        points, sizes, n = self._polygon_batch(arg)
+        colors = self._styled_colors(surface, arg(3), arg(4), n)
+        self._draw_polylines(surface, points, sizes, True, True, colors)
+
+    def _stroke_styled_polygons(self, surface, args, buffers, arg):
+        points, sizes, n = self._polygon_batch(arg)
+        colors = self._styled_colors(surface, arg(3), arg(4), n)
+        self._draw_polylines(surface, points, sizes, False, True, colors)
+
+    def _stroke_styled_line_segments(self, surface, args, buffers, arg):
+        points, sizes, n = self._polygon_batch(arg)
+        colors = self._styled_colors(surface, arg(3), arg(4), n)
+        self._draw_polylines(surface, points, sizes, False, False, colors)
+
+    # Paths
+    def _path_add(self, surface, points, new_subpath=False):
+        points = _apply_transform(
+            surface.state.transform, np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        )
+        if new_subpath or not surface.path or surface.path[-1][1]:
+            surface.path.append([[points], False])
+        else:
+            surface.path[-1][0].append(points)
+
+    def _current_point(self, surface):
+        """The last point of the path, in user space."""
+        if not surface.path:
+            return None
+        point = surface.path[-1][0][-1][-1]
+        inverse = np.linalg.inv(surface.state.transform)
+        return _apply_transform(inverse, point)
+
+    def _path_rings(self, surface):
+        subpaths = [(np.concatenate(points), closed) for points, closed in surface.path]
+        points, starts = _rings([points for points, _ in subpaths])
+        closed = np.array(
+            [closed for points, closed in subpaths if len(points)], dtype=bool
+        )
+        return points, starts, closed
+
+    def _begin_path(self, surface, args, buffers, arg):
+        surface.path = []
+
+    def _close_path(self, surface, args, buffers, arg):
+        if surface.path and not surface.path[-1][1]:
+            surface.path[-1][1] = True
+            # A new sub-path starts at the first point of the closed one
+            start = surface.path[-1][0][0][:1]
+            surface.path.append([[start], False])
+
+    def _move_to(self, surface, args, buffers, arg):
+        self._path_add(surface, [args[:2]], new_subpath=True)
+
+    def _line_to(self, surface, args, buffers, arg):
+        self._path_add(surface, [args[:2]])
+
+    def _rect(self, surface, args, buffers, arg):
+        x, y, width, height = args
+        self._path_add(
+            surface,
+            [[x, y], [x + width, y], [x + width, y + height], [x, y + height]],
+            new_subpath=True,
+        )
+        surface.path[-1][1] = True
+        self._path_add(surface, [[x, y]], new_subpath=True)
+
+    def _path_arc(self, surface, x, y, rx, ry, rotation, start, end, anticlockwise):
+        radius = max(abs(rx), abs(ry)) * surface.scale
+        points = _arc_points(
+            x,
+            y,
+            rx,
+            ry,
+            start,
+            end,
+            anticlockwise,
+            _segments_for_radius(radius),
+            rotation,
+        )
+        self._path_add(surface, points)
+
+    def _arc(self, surface, args, buffers, arg):
+        x, y, radius, start, end = args[:5]
+        anticlockwise = args[5] if len(args) > 5 else False
+        self._path_arc(surface, x, y, radius, radius, 0, start, end, anticlockwise)
+
+    def _ellipse(self, surface, args, buffers, arg):
+        x, y, rx, ry, rotation, start, end = args[:7]
+        anticlockwise = args[7] if len(args) > 7 else False
+        self._path_arc(surface, x, y, rx, ry, rotation, start, end, anticlockwise)
+
+    def _arc_to(self, surface, args, buffers, arg):
+        self._path_add(surface, [args[:2]])
+
+    def _curve_to(self, surface, control_points):
+        start = self._current_point(surface)
+        if start is None:
+            start = control_points[0]
+        points = np.array([start] + control_points, dtype=np.float64)
+
+        # Flatten the Bézier curve using the Bernstein polynomials
+        degree = len(points) - 1
+        t = np.linspace(0, 1, 17)[1:, None]
+        curve = sum(
+            math.comb(degree, k) * t**k * (1 - t) ** (degree - k) * points[k]
+            for k in range(degree + 1)
+        )
+        self._path_add(surface, curve)
+
+    def _quadratic_curve_to(self, surface, args, buffers, arg):
+        cpx, cpy, x, y = args
+        self._curve_to(surface, [[cpx, cpy], [x, y]])
+
+    def _bezier_curve_to(self, surface, args, buffers, arg):
+        cp1x, cp1y, cp2x, cp2y, x, y = args
+        self._curve_to(surface, [[cp1x, cp1y], [cp2x, cp2y], [x, y]])
+
+    def _add_path_arrays(self, surface, opcodes, coords):
+        # Replay the segments with the path methods, in the order of the Path2D opcodes
+        methods = (
+            self._move_to,
+            self._line_to,
+            self._quadratic_curve_to,
+            self._bezier_curve_to,
+            self._arc,
+            self._arc_to,
+            self._ellipse,
+            self._rect,
+            self._close_path,
+        )
+        coords = np.asarray(coords, dtype=np.float64).tolist()
+        start = 0
+        for opcode in np.asarray(opcodes).tolist():
+            stop = start + int(PATH_OPCODE_SIZES[opcode])
+            methods[opcode](surface, coords[start:stop], None, None)
+            start = stop
+
+    def _path_from_arrays(self, surface, args, buffers, arg):
+        self._add_path_arrays(surface, arg(0), arg(1))
+
+    def _path2d(self, surface, args, draw):
+        """Draw a Path2D built from arrays with ``draw``, leaving the current path untouched."""
+        path = widget_serialization["from_json"](args[0], None)
+        if path.opcodes is None:
+            return self._warn("SVG Path2D")
+
+        current_path = surface.path
+        surface.path = []
+        try:
+            self._add_path_arrays(
+                surface,
+                np.frombuffer(path.opcodes, dtype=np.uint8),
+                np.frombuffer(path.coords, dtype=np.float64),
+            )
+            draw(surface, args[1:], None, None)
+        finally:
+            surface.path = current_path
+
+    def _fill_path(self, surface, args, buffers, arg):
+        self._path2d(surface, args, self._fill)
+
+    def _stroke_path(self, surface, args, buffers, arg):
+        self._path2d(surface, args, self._stroke)
+
+    def _fill(self, surface, args, buffers, arg):
+        colors = surface.style_colors(True)
+        if colors is None:
+            return self._warn("gradient and pattern styles")
+
+        points, starts, _ = self._path_rings(surface)
+        evenodd = len(args) > 0 and args[0] == "evenodd"
+        surface.fill_rings(
+            points, starts, np.zeros(len(starts), dtype=np.int64), colors, evenodd
+        )
+
+    def _stroke(self, surface, args, buffers, arg):
+        colors = surface.style_colors(False)
+        if colors is None:
+            return self._warn("gradient and pattern styles")
+
+        points, starts, closed = self._path_rings(surface)
+        surface.stroke_lines(
+            points, starts, np.zeros(len(starts), dtype=np.int64), closed, colors
+        )
+
+    def _clip(self, surface, args, buffers, arg):
+        points, starts, _ = self._path_rings(surface)
+        shapes, rows, col_start, col_stop = _scan(
+            points,
+            starts,
+            np.zeros(len(starts), dtype=np.int64),
+            surface.width,
+            surface.height,
+            len(args) > 0 and args[0] == "evenodd",
+        )
+        pixels, _ = _spans_to_pixels(shapes, rows, col_start, col_stop, surface.width)
+
+        clip = np.zeros(surface.width * surface.height, dtype=bool)
+        clip[pixels] = True
+        if surface.state.clip is not None:
+            clip &= surface.state.clip
+        surface.state.clip = clip
+
+    # Images
+    def _blit_image(self, surface, image, x, y, width=None, height=None):
+        image = _rgba(image)
+        src_height, src_width = image.shape[:2]
+        if width is None or height is None:
+            width, height = src_width, src_height
+
+        # Only the translation and scale of the transform are taken into account
+        transform = surface.state.transform
+        (x0, y0), (x1, y1) = _apply_transform(
+            transform, np.array([[x, y], [x + width, y + height]], dtype=np.float64)
+        )
+        if x1 == x0 or y1 == y0:
+            return
+
+        cols = np.arange(
+            max(math.ceil(min(x0, x1) - 0.5), 0),
+            min(math.ceil(max(x0, x1) - 0.5), surface.width),
+        )
+        rows = np.arange(
+            max(math.ceil(min(y0, y1) - 0.5), 0),
+            min(math.ceil(max(y0, y1) - 0.5), surface.height),
+        )
+        if not len(cols) or not len(rows):
+            return
+
+        src_cols = np.clip(
+            np.floor((cols + 0.5 - x0) / (x1 - x0) * src_width), 0, src_width - 1
+        ).astype(np.int64)
+        src_rows = np.clip(
+            np.floor((rows + 0.5 - y0) / (y1 - y0) * src_height), 0, src_height - 1
+        ).astype(np.int64)
+
+        src = image[src_rows[:, None], src_cols[None, :]].reshape(-1, 4) / 255
+        colors = _premultiply(src[:, :3], src[:, 3] * surface.state.global_alpha)
+        pixels = (rows[:, None] * surface.width + cols[None, :]).ravel()
+        surface.composite(pixels, colors, unique=True)
+
+    def _put_image_data(self, surface, args, buffers, arg):
+        if len(args) > 2:
+            image = arg(2)
+        else:
+            image = np.array(PILImage.open(BytesIO(buffers[0])))
+        # Like in the front-end, the image is drawn with drawImage
+        self._blit_image(surface, image, args[0], args[1])
+
+    def _image_source(self, source):
+        if isinstance(source, Image):
+            return np.array(PILImage.open(BytesIO(source.value)).convert("RGBA"))
+        return self.get_image_data(source)
+
+    def _draw_image(self, surface, args, buffers, arg):
+        source = widget_serialization["from_json"](args[0], None)
+        x, y = args[1], args[2]
+        width = args[3] if len(args) > 3 else None
+        height = args[4] if len(args) > 4 else None
+
+        image = self._image_source(source)
+        if image is None:
+            return
+
+        self._blit_image(surface, image, x, y, width, height)
+
+    def _draw_images(self, surface, args, buffers, arg):
+        atlas = widget_serialization["from_json"](args[0], None)
+        image = self._image_source(atlas.image)
+        if image is None:
+            return
+
+        values = [arg(idx) for idx in range(1, 7)]
+        n = _batch_length(*values)
+        indices, x, y, scale, rotation, alpha = (
+            _batch_arg(value, n) for value in values
+        )
+        if np.any(rotation != 0):
+            self._warn("drawImages rotation")
+
+        rects = np.asarray(atlas.rects, dtype=np.float64)
+        global_alpha = surface.state.global_alpha
+        try:
+            for idx in range(n):
+                src_x, src_y, width, height = rects[int(indices[idx])]
+                sprite = image[
+                    int(src_y) : int(src_y + height), int(src_x) : int(src_x + width)
+                ]
+                width *= scale[idx]
+                height *= scale[idx]
+
+                surface.state.global_alpha = global_alpha * alpha[idx]
+                self._blit_image(
+                    surface,
+                    sprite,
+                    x[idx] - width / 2,
+                    y[idx] - height / 2,
+                    width,
+                    height,
+                )
+        finally:
+            surface.state.global_alpha = global_alpha
+
+    # State
+    def _set(self, surface, args, buffers, arg):
+        attr, value = args[:2]
+        state = surface.state
+
+        if attr in (_FILL_STYLE, _STROKE_STYLE):
+            color = _parse_color(value)
+            if color is None:
+                self._warn("gradient and pattern styles")
+            if attr == _FILL_STYLE:
+                state.fill_style = color
+            else:
+                state.stroke_style = color
+        elif attr == _GLOBAL_ALPHA:
+            state.global_alpha = float(value)
+        elif attr == _LINE_WIDTH:
+            state.line_width = float(value)
+        elif attr == _GLOBAL_COMPOSITE_OPERATION and value != "source-over":
+            self._warn("global_composite_operation '{}'".format(value))
+
+    def _save(self, surface, args, buffers, arg):
+        surface.stack.append(surface.state.copy())
+
+    def _restore(self, surface, args, buffers, arg):
+        if surface.stack:
+            surface.state = surface.stack.pop()
+
+    def _multiply_transform(self, surface, a, b, c, d, e, f):
+        matrix = np.array([[a, c, e], [b, d, f], [0, 0, 1]], dtype=np.float64)
+        surface.state.transform = surface.state.transform @ matrix
+
+    def _translate(self, surface, args, buffers, arg):
+        self._multiply_transform(surface, 1, 0, 0, 1, args[0], args[1])
+
+    def _rotate(self, surface, args, buffers, arg):
+        cos, sin = math.cos(args[0]), math.sin(args[0])
+        self._multiply_transform(surface, cos, sin, -sin, cos, 0, 0)
+
+    def _scale(self, surface, args, buffers, arg):
+        x = args[0]
+        y = args[1] if len(args) > 1 else x
+        self._multiply_transform(surface, x, 0, 0, y, 0, 0)
+
+    def _transform(self, surface, args, buffers, arg):
+        self._multiply_transform(surface, *args[:6])
+
+    def _set_transform(self, surface, args, buffers, arg):
+        surface.state.transform = np.eye(3)
+        self._multiply_transform(surface, *args[:6])
+
+    def _reset_transform(self, surface, args, buffers, arg):
+        surface.state.transform = np.eye(3)
+
+    def _set_line_dash(self, surface, args, buffers, arg):
+        if len(args[0]):
+            self._warn("line dashes")
+
+    def _clear(self, surface, args, buffers, arg):
+        self._clear_rect(surface, [0, 0, surface.width, surface.height], buffers, arg)
+
+    def _reset_canvas(self, surface, args, buffers, arg):
+        surface.__init__(surface.width, surface.height)
+
+    def _sleep(self, surface, args, buffers, arg):
+        pass
+
+    # Handlers of the draw commands, by command name
+    _HANDLERS = {
+        "fillRect": _fill_rect,
+        "strokeRect": _stroke_rect,
+        "clearRect": _clear_rect,
+        "fillRects": _fill_rects,
+        "strokeRects": _stroke_rects,
+        "fillStyledRects": _fill_styled_rects,
+        "strokeStyledRects": _stroke_styled_rects,
+        "fillArc": _fill_arc,
+        "strokeArc": _stroke_arc,
+        "fillCircle": _fill_circle,
+        "strokeCircle": _stroke_circle,
+        "fillArcs": _fill_arcs,
+        "strokeArcs": _stroke_arcs,
+        "fillStyledCircles": _fill_styled_circles,
+        "strokeStyledCircles": _stroke_styled_circles,
+        "fillStyledArcs": _fill_styled_arcs,
+        "strokeStyledArcs": _stroke_styled_arcs,
+        "strokeLine": _stroke_line,
+        "strokeLines": _stroke_lines,
+        "fillPolygon": _fill_polygon,
+        "strokePolygon": _stroke_polygon,
+        "fillPolygons": _fill_polygons,
+        "strokePolygons": _stroke_polygons,
+        "strokeLineSegments": _stroke_line_segments,
+        "fillStyledPolygons": _fill_styled_polygons,
+        "strokeStyledPolygons": _stroke_styled_polygons,
+        "strokeStyledLineSegments": _stroke_styled_line_segments,
+        "beginPath": _begin_path,
+        "closePath": _close_path,
+        "moveTo": _move_to,
+        "lineTo": _line_to,
+        "rect": _rect,
+        "arc": _arc,
+        "ellipse": _ellipse,
+        "arcTo": _arc_to,
+        "quadraticCurveTo": _quadratic_curve_to,
+        "bezierCurveTo": _bezier_curve_to,
+        "pathFromArrays": _path_from_arrays,
+        "fillPath": _fill_path,
+        "strokePath": _stroke_path,
+        "fill": _fill,
+        "stroke": _stroke,
+        "clip": _clip,
+        "putImageData": _put_image_data,
+        "drawImage": _draw_image,
+        "drawImages": _draw_images,
+        "set": _set,
+        "save": _save,
+        "restore": _restore,
+        "translate": _translate,
+        "rotate": _rotate,
+        "scale": _scale,
+        "transform": _transform,
+        "setTransform": _set_transform,
+        "resetTransform": _reset_transform,
+        "setLineDash": _set_line_dash,
+        "clear": _clear,
+        "resetCanvas": _reset_canvas,
+        "sleep": _sleep,
+    }
+
+
+class RasterizingTransport(RecordingTransport):
+    """Execute the draw commands in-process using the reference ``Rasterizer``.
+
+    Once set as the transport of the canvas manager, ``Canvas.get_image_data`` and ``Canvas.to_file``
+    work without ``sync_image_data``:
+
+    .. code-block:: python
+
+        from ipycanvas import Canvas, get_canvas_manager
+        from ipycanvas.rasterizer import RasterizingTransport
+
+        get_canvas_manager().transport = RasterizingTransport()
+
+        canvas = Canvas(width=200, height=200)
+        canvas.fill_style = "red"
+        canvas.fill_circle(100, 100, 50)
+        canvas.to_file("thumbnail.png")
+
+    Args:
+        forward (Transport): Optional transport receiving the messages as well, e.g. a ``CommTransport``
+            for drawing in the front-end too. Default to ``None``.
+        keep_frames (bool): Keep the decoded commands of every message. Default to ``False``.
+    """
+
+    def __init__(self, forward=None, keep_frames=False):
+        self.forward = forward
+        self.rasterizer = Rasterizer()
+        super(RasterizingTransport, self).__init__(keep_frames=keep_frames)
+
+    def send(self, manager, metadata, buffers):
+        if self.forward is not None:
+            self.forward.send(manager, metadata, buffers)
+        super(RasterizingTransport, self).send(manager, metadata, buffers)
+
+    def record(self, commands, nbytes):
+        super(RasterizingTransport, self).record(commands, nbytes)
+
+        for command in commands:
+            if command.canvas is None:
+                raise RuntimeError(
+                    f"Cannot rasterize the {command.name} command, the canvas it is drawn on is unknown"
+                )
+            self.rasterizer.execute(
+                command.canvas,
+                command.name,
+                command.args,
+                command.buffers,
+                command.arg,
+            )
+
+    def get_image_data(self, canvas):
+        return self.rasterizer.get_image_data(canvas)
@@ -0,0 +1,303 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) Martin Renou.
+# Distributed under the terms of the Modified BSD License.
+
+"""Transports used by the canvas manager for sending the draw commands."""
+
+import json
+import time
+from abc import ABC, abstractmethod
+from collections import namedtuple
+
+import numpy as np
+
+from ipywidgets import Widget, widget_serialization
+
+from .utils import ORJSON_AVAILABLE, _ResourceCache, binary_to_commands
+
+if ORJSON_AVAILABLE:
+    from orjson import loads as _loads
+else:
+    from json import loads as _loads
+
+
+class Transport(ABC):
+    """Base class for the transports of the canvas manager.
+
+    A transport receives the messages of the canvas manager: a metadata dict and a list of buffers,
+    the first buffer being the command stream.
+    """
+
+    @abstractmethod
+    def send(self, manager, metadata, buffers):
+        """Send a message of the canvas manager."""
+
+    def get_image_data(self, canvas):
+        """Return the image of a canvas as a NumPy array, if the transport can compute it."""
+        return None
+
+
+class CommTransport(Transport):
+    """Send the messages to the front-end through the widget comm. This is the default transport."""
+
+    def send(self, manager, metadata, buffers):
+        Widget.send(manager, metadata, buffers=buffers)
+
+
+class RecordedCommand(
+    namedtuple("RecordedCommand", ["canvas", "name", "args", "buffers"])
+):
+    """A draw command captured by the ``RecordingTransport``.
+
+    ``canvas`` is the Canvas receiving the command, ``name`` the front-end name of the command
+    (e.g. ``"fillRect"``), ``args`` its arguments and ``buffers`` its binary buffers as bytes.
+    """
+
+    __slots__ = ()
+
+    def arg(self, idx):
+        """Return the argument ``idx``, as a NumPy array if it was sent as a binary buffer."""
+        arg = self.args[idx]
+
+        if isinstance(arg, dict) and "idx" in arg:
+            return np.frombuffer(self.buffers[arg["idx"]], dtype=arg["dtype"]).reshape(
+                arg["shape"]
+            )
+
+        return arg
+
+
+#: A message captured by the ``RecordingTransport``: its commands, its size in bytes and its timestamp.
+RecordedFrame = namedtuple("RecordedFrame", ["commands", "nbytes", "timestamp"])
+
+
+class RecordingTransport(Transport):
+    """Capture the draw commands in-process instead of sending them to a front-end.
+
+    This allows testing and benchmarking drawing code without a browser:
+
+    .. code-block:: python
+
+        from ipycanvas import Canvas, get_canvas_manager
+        from ipycanvas.transport import RecordingTransport
+
+        recorder = RecordingTransport()
+        get_canvas_manager().transport = recorder
+
+        canvas = Canvas()
+        canvas.fill_rect(0, 0, 10, 10)
+
+        assert recorder.commands[-1].name == "fillRect"
+
+    Args:
+        keep_frames (bool): Keep the decoded commands of every message, otherwise only the statistics
+            are computed. Default to ``True``.
+        auto_ack (bool): Report the frames as drawn as soon as they are received, like a front-end drawing
+            faster than the kernel sends them. Otherwise, call ``ack`` for reporting them, e.g. for testing
+            the ``backpressure`` policies of the canvas manager. Default to ``True``.
+    """
+
+    def __init__(self, keep_frames=True, auto_ack=True):
+        self.keep_frames = keep_frames
+        self.auto_ack = auto_ack
+        self._manager = None
+        self._last_frame = None
+        self._resource_cache = _ResourceCache()
+        # Canvas receiving the commands, following the switchCanvas commands
+        self._current_canvas = None
+        # Copies of the CanvasBuffers: (data, dtype) by id
+        self._canvas_buffers = {}
+        self.clear()
+
+    def clear(self):
+        """Forget the recorded frames and reset the statistics."""
+        self.frames = []
+        self.frame_count = 0
+        self.command_count = 0
+        self.bytes_sent = 0
+        self._start = time.monotonic()
+
+    @property
+    def commands(self):
+        """The list of recorded commands, in order."""
+        return [command for frame in self.frames for command in frame.commands]
+
+    @property
+    def stats(self):
+        """Statistics about the recorded messages."""
+        elapsed = time.monotonic() - self._start
+        return {
+            "frames": self.frame_count,
+            "commands": self.command_count,
+            "bytes": self.bytes_sent,
+            "elapsed": elapsed,
+            "commands_per_second": self.command_count / elapsed if elapsed > 0 else 0.0,
+            "bytes_per_frame": (
+                self.bytes_sent / self.frame_count if self.frame_count else 0.0
+            ),
+        }
+
+    def send(self, manager, metadata, buffers):
+        from .canvas import _CMD_LIST
+
+        buffers = [bytes(memoryview(buffer).cast("B")) for buffer in buffers]
+        nbytes = sum(len(buffer) for buffer in buffers) + len(json.dumps(metadata))
+
+        if "resources" in metadata:
+            self._receive_resources(metadata, buffers)
+            return
+        if "canvas_buffer" in metadata:
+            self._receive_canvas_buffer(metadata, buffers)
+            return
+
+        if metadata.get("encoding") == "binary":
+            commands = binary_to_commands(buffers[0])
+        else:
+            commands = _loads(buffers[0])
+        if not len(commands) or not isinstance(commands[0], list):
+            commands = [commands]
+
+        self._resource_cache.resize(manager.resource_cache_size)
+
+        # A message starts with a switchCanvas, unless it is drawn on the current canvas of the manager
+        if self._current_canvas is None:
+            self._current_canvas = manager._current_canvas
+
+        recorded = []
+        remaining_buffers = buffers[1:]
+        for command in commands:
+            name = _CMD_LIST[command[0]]
+            n_buffers = command[2] if len(command) > 2 else 0
+            command_buffers = remaining_buffers[:n_buffers]
+            remaining_buffers = remaining_buffers[n_buffers:]
+
+            if not self._resolve_cached_buffers(manager, command[1], command_buffers):
+                continue
+
+            if name in ("setCanvasBuffer", "updateCanvasBuffer", "deleteCanvasBuffer"):
+                self._update_canvas_buffer(name, command[1], command_buffers)
+                continue
+
+            if not self._resolve_canvas_buffers(manager, command[1], command_buffers):
+                continue
+
+            if name == "switchCanvas":
+                self._current_canvas = widget_serialization["from_json"](
+                    command[1][0], None
+                )
+                continue
+
+            recorded.append(
+                RecordedCommand(self._current_canvas, name, command[1], command_buffers)
+            )
+
+        self.record(recorded, nbytes)
+
+        if "frame" in metadata:
+            self._manager = manager
+            self._last_frame = metadata["frame"]
+            if self.auto_ack:
+                self.ack()
+
+    def ack(self):
+        """Report the frames received so far as drawn to the canvas manager, like the front-end does."""
+        if self._last_frame is not None:
+            frame, self._last_frame = self._last_frame, None
+            self._manager._handle_frontend_message(
+                self._manager, {"event": "frame_ack", "frame": frame}, []
+            )
+
+    def _resolve_cached_buffers(self, manager, args, buffers):
+        # Same as the front-end: put back the buffers the manager replaced by their resource cache key
+        for arg in args:
+            if not isinstance(arg, dict) or "key" not in arg:
+                continue
+
+            if "idx" in arg:
+                buffer = buffers[arg["idx"]]
+                self._resource_cache.put(arg["key"], buffer, len(buffer))
+                continue
+
+            buffer = self._resource_cache.get(arg["key"])
+            if buffer is None:
+                # Same as a client attached later: wait for the manager to send the array again
+                self._receive_resources(*manager._resources_reply([arg["key"]]))
+                buffer = self._resource_cache.get(arg["key"])
+            if buffer is None:
+                self._resource_cache.clear()
+                return False
+
+            arg["idx"] = len(buffers)
+            buffers.append(buffer)
+
+        return True
+
+    def _receive_resources(self, metadata, buffers):
+        for key, buffer in zip(metadata["resources"], buffers):
+            self._resource_cache.put(
+                key, bytes(memoryview(buffer).cast("B")), len(buffer)
+            )
+
+    def _receive_canvas_buffer(self, metadata, buffers):
+        if not metadata.get("missing", False):
+            self._update_canvas_buffer(
+                "setCanvasBuffer",
+                [metadata["canvas_buffer"], metadata],
+                [bytes(memoryview(buffer).cast("B")) for buffer in buffers],
+            )
+
+    def _update_canvas_buffer(self, name, args, buffers):
+        # Same as the front-end: keep a copy of the CanvasBuffers and apply their updates
+        if name == "deleteCanvasBuffer":
+            self._canvas_buffers.pop(args[0], None)
+            return
+
+        if name == "setCanvasBuffer":
+            metadata = args[1]
+            data = bytearray(buffers[metadata["idx"]])
+            self._canvas_buffers[args[0]] = (data, metadata["dtype"])
+            return
+
+        buffer_id, row_size, rows, metadata = args
+        if buffer_id not in self._canvas_buffers:
+            return
+        data, dtype = self._canvas_buffers[buffer_id]
+
+        target = np.frombuffer(data, dtype=dtype)
+        values = np.frombuffer(buffers[metadata["idx"]], dtype=metadata["dtype"])
+        if isinstance(rows, dict):
+            rows = np.frombuffer(buffers[rows["idx"]], dtype=np.int32)
+            target.reshape(-1, row_size)[rows] = values.reshape(-1, row_size)
+        else:
+            target[rows * row_size : rows * row_size + len(values)] = values
+
+    def _resolve_canvas_buffers(self, manager, args, buffers):
+        resolved = True
+        for arg in args:
+            if not isinstance(arg, dict) or "canvas_buffer" not in arg:
+                continue
+
+            if arg["canvas_buffer"] not in self._canvas_buffers:
+                # Same as the front-end: wait for the manager to send the buffer again
+                self._receive_canvas_buffer(
+                    *manager._canvas_buffer_reply(arg["canvas_buffer"])
+                )
+            if arg["canvas_buffer"] not in self._canvas_buffers:
+                resolved = False
+                continue
+
+            data, arg["dtype"] = self._canvas_buffers[arg["canvas_buffer"]]
+            arg["idx"] = len(buffers)
+            buffers.append(bytes(data))
+
+        return resolved
+
+    def record(self, commands, nbytes):
+        """Record the decoded commands of a message of ``nbytes`` bytes."""
+        self.frame_count += 1
+        self.command_count += len(commands)
+        self.bytes_sent += nbytes
+        if self.keep_frames:
+            self.frames.append(RecordedFrame(commands, nbytes, time.monotonic()))
@@ -1,5 +1,14 @@
 """Binary module."""
 
+import json
+import struct
+import sys
+import threading
+import weakref
+from collections import OrderedDict
+from hashlib import blake2b
+from itertools import chain
+from operator import itemgetter
 from io import BytesIO
 
 from PIL import Image as PILImage
@@ -11,8 +20,6 @@ try:
 
     ORJSON_AVAILABLE = True
 except ImportError:
-    import json
-
     ORJSON_AVAILABLE = False
 
 
@@ -25,56 +32,613 @@ def image_bytes_to_array(im_bytes):
     return np.array(im)
 
 
-def binary_image(ar, quality=75):
+#: Codecs supported by ``binary_image``, and their PIL format
+IMAGE_CODECS = {"png": "PNG", "jpeg": "JPEG", "webp": "WEBP"}
+
+
+def binary_image(ar, quality=75, codec="auto", compress_level=6):
+    """Encode an image array.
+
+    ``codec`` is one of ``"png"``, ``"jpeg"`` or ``"webp"``. ``"auto"`` uses JPEG for RGB images and PNG
+    otherwise. ``quality`` is used by JPEG and WebP (a quality of 100 gives a lossless WebP image) and
+    ``compress_level`` (0 to 9) by PNG.
+    """
+    if codec == "auto":
+        codec = "jpeg" if len(ar.shape) == 3 and ar.shape[2] == 3 else "png"
+    if codec not in IMAGE_CODECS:
+        raise ValueError(f"Unknown image codec {codec}")
+    if codec == "jpeg" and len(ar.shape) == 3 and ar.shape[2] == 4:
+        # JPEG does not support transparency
+        ar = ar[..., :3]
+
     f = BytesIO()
-    if len(ar.shape) == 2:
-        filetype = "PNG"
-    elif ar.shape[2] == 3:
-        filetype = "JPEG"
-    else:
-        filetype = "PNG"
-    PILImage.fromarray(ar.astype(np.uint8)).save(f, filetype, quality=quality)
+    PILImage.fromarray(ar.astype(np.uint8, copy=False)).save(
+        f,
+        IMAGE_CODECS[codec],
+        quality=quality,
+        compress_level=compress_level,
+        lossless=codec == "webp" and quality >= 100,
+    )
     return f.getvalue()
 
 
+def image_to_rgba(ar):
+    """Turn a grayscale, RGB or RGBA image array into a contiguous RGBA uint8 array.
+
+    Contiguous RGBA uint8 arrays are returned as is, without any copy.
+    """
+    ar = np.asarray(ar)
+    if ar.ndim == 3 and ar.shape[2] == 4:
+        return np.ascontiguousarray(ar, dtype=np.uint8)
+
+    rgba = np.empty(ar.shape[:2] + (4,), dtype=np.uint8)
+    rgba[..., 3] = 255
+    if ar.ndim == 2:
+        rgba[..., :3] = ar[..., np.newaxis]
+    else:
+        rgba[..., :3] = ar
+    return rgba
+
+
+def changed_rects(previous, current, tile_size=64):
+    """Return the rectangles ``(x, y, width, height)`` covering the pixels that differ between two images.
+
+    The images are compared tile by tile, horizontal runs of changed tiles are merged with the run of the
+    previous tile row when they span the same columns, and each rectangle is then shrunk to the bounding
+    box of the pixels that changed in it.
+    """
+    changed = previous != current
+    if changed.ndim == 3:
+        changed = changed.any(axis=2)
+
+    height, width = changed.shape
+    n_rows = -(-height // tile_size)
+    n_cols = -(-width // tile_size)
+
+    padded = np.zeros((n_rows * tile_size, n_cols * tile_size), dtype=bool)
+    padded[:height, :width] = changed
+    tiles = padded.reshape(n_rows, tile_size, n_cols, tile_size).any(axis=(1, 3))
+
+    # Runs of changed tiles, as [first_row, last_row, first_col, last_col]
+    rects = []
+    open_runs = {}
+    for row in range(n_rows):
+        runs = {}
+        cols = np.flatnonzero(tiles[row])
+        if len(cols):
+            splits = np.flatnonzero(np.diff(cols) != 1) + 1
+            for run in np.split(cols, splits):
+                span = (int(run[0]), int(run[-1]))
+                rect = open_runs.get(span)
+                if rect is None:
+                    rect = [row, row, span[0], span[1]]
+                    rects.append(rect)
+                rect[1] = row
+                runs[span] = rect
+        open_runs = runs
+
+    result = []
+    for first_row, last_row, first_col, last_col in rects:
+        y0 = first_row * tile_size
+        x0 = first_col * tile_size
+        region = changed[
+            y0 : (last_row + 1) * tile_size, x0 : (last_col + 1) * tile_size
+        ]
+
+        rows = np.flatnonzero(region.any(axis=1))
+        cols = np.flatnonzero(region.any(axis=0))
+        result.append(
+            (
+                x0 + int(cols[0]),
+                y0 + int(rows[0]),
+                int(cols[-1] - cols[0]) + 1,
+                int(rows[-1] - rows[0]) + 1,
+            )
+        )
+
+    return result
+
+
+class _BufferConverter:
+    """Turn NumPy arrays into buffers the front-end can read, copying as little as possible.
+
+    Contiguous arrays with a dtype supported JavaScript side (e.g. float32, float64, int32, uint8) are
+    passed through as memoryviews, without any copy. Other arrays (bool, int64, uint64, float16, non-native
+    byte order, non-contiguous arrays, and float64 arrays when ``downcast_float64`` is set) are converted
+    in one pass into scratch arrays. Scratch arrays are reused across frames once the message holding them
+    has been released.
+    """
+
+    # Dtypes supported JavaScript side, see getTypedArray
+    _SUPPORTED_DTYPES = frozenset(
+        np.dtype(dtype)
+        for dtype in (
+            np.int8,
+            np.uint8,
+            np.int16,
+            np.uint16,
+            np.int32,
+            np.uint32,
+            np.float32,
+            np.float64,
+        )
+    )
+
+    # Dtypes that are not supported JavaScript side, and their replacement
+    _CONVERSIONS = {
+        np.dtype(np.bool_): np.dtype(np.uint8),
+        np.dtype(np.int64): np.dtype(np.int32),
+        np.dtype(np.uint64): np.dtype(np.uint32),
+        np.dtype(np.float16): np.dtype(np.float32),
+    }
+
+    _MAX_SCRATCH_ARRAYS = 8
+
+    def __init__(self):
+        self.downcast_float64 = False
+
+        # Each thread counts the arrays it converts, the commands of a thread are flushed by this thread
+        self._counters = threading.local()
+
+        # Each thread has its own scratch arrays, so that two threads never take the same free array
+        self._pools = threading.local()
+
+    @classmethod
+    def frontend_dtype(cls, dtype):
+        """Return the dtype arrays of ``dtype`` are sent as, raise a ``TypeError`` if they cannot be sent."""
+        dtype = dtype.newbyteorder("=")
+        dtype = cls._CONVERSIONS.get(dtype, dtype)
+        if dtype not in cls._SUPPORTED_DTYPES:
+            raise TypeError(
+                f"Arrays of dtype {dtype} cannot be sent to the front-end, "
+                "use a numeric dtype (e.g. float64, int32 or uint8)"
+            )
+        return dtype
+
+    @property
+    def bytes_copied(self):
+        """Number of bytes copied by the current thread since its last call to ``reset_counters``."""
+        return getattr(self._counters, "bytes_copied", 0)
+
+    @property
+    def bytes_passed(self):
+        """Number of bytes passed through without copy by the current thread, see ``bytes_copied``."""
+        return getattr(self._counters, "bytes_passed", 0)
+
+    def reset_counters(self):
+        self._counters.bytes_copied = 0
+        self._counters.bytes_passed = 0
+
+    def convert(self, ar):
+        dtype = self.frontend_dtype(ar.dtype)
+        if self.downcast_float64 and dtype == np.float64:
+            dtype = np.dtype(np.float32)
+
+        if dtype == ar.dtype and ar.flags["C_CONTIGUOUS"]:
+            self._counters.bytes_passed = self.bytes_passed + ar.nbytes
+        else:
+            out = self._scratch_array(ar.shape, dtype)
+            np.copyto(out, ar, casting="unsafe")
+            ar = out
+            self._counters.bytes_copied = self.bytes_copied + ar.nbytes
+
+        return {"shape": ar.shape, "dtype": str(ar.dtype)}, memoryview(ar)
+
+    def _scratch_array(self, shape, dtype):
+        size = int(np.prod(shape))
+
+        # A scratch array is free when the pool is the only one referencing it (the second reference
+        # being the getrefcount argument), the views sent to the front-end hold a reference to it
+        pool = getattr(self._pools, "scratch", None)
+        if pool is None:
+            pool = self._pools.scratch = []
+
+        getrefcount = getattr(sys, "getrefcount", None)
+        if getrefcount is not None:
+            for idx in range(len(pool)):
+                if (
+                    pool[idx].dtype == dtype
+                    and size <= pool[idx].size <= 2 * size
+                    and getrefcount(pool[idx]) == 2
+                ):
+                    return pool[idx][:size].reshape(shape)
+
+        scratch = np.empty(size, dtype=dtype)
+        pool.append(scratch)
+        if len(pool) > self._MAX_SCRATCH_ARRAYS:
+            pool.pop(0)
+        return scratch.reshape(shape)
+
+
+_BUFFER_CONVERTER = _BufferConverter()
+
+
+class _ResourceCache:
+    """LRU cache of binary buffers keyed by the hash of their content, bounded to ``max_bytes``.
+
+    The kernel keeps a mirror of the front-end cache: both sides apply the same insertions, look-ups
+    and evictions in the same order, so the kernel knows which buffers the front-end already has. The
+    clients attached later ask the kernel for the buffers they miss.
+    """
+
+    def __init__(self, max_bytes=0):
+        self.max_bytes = max_bytes
+        self.clear()
+
+    def clear(self):
+        self._entries = OrderedDict()
+        self.nbytes = 0
+
+    @staticmethod
+    def key(buffer):
+        """The cache key of a buffer."""
+        return blake2b(buffer, digest_size=16).hexdigest()
+
+    def get(self, key):
+        """Return the value cached for ``key`` and mark it as recently used, ``None`` if it is not cached."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key, value, nbytes):
+        """Cache ``value`` of size ``nbytes`` for ``key``, evicting the least recently used values."""
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.nbytes -= previous[1]
+        self._entries[key] = (value, nbytes)
+        self.nbytes += nbytes
+        self._evict()
+
+    def resize(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._evict()
+
+    def _evict(self):
+        while self.nbytes > self.max_bytes and self._entries:
+            _, (_, nbytes) = self._entries.popitem(last=False)
+            self.nbytes -= nbytes
+
+
+class CanvasBuffer:
+    """An array argument of the batch methods, kept in the front-end from one frame to the next.
+
+    A ``CanvasBuffer`` can be given instead of a NumPy array to the batch methods (``fill_circles``,
+    ``fill_styled_rects``, ``stroke_line_segments``...). Its content is sent once, then only the rows
+    changed through item assignment (e.g. ``buffer[moved] = new_positions``) are sent, the next time
+    the buffer is drawn. Its shape and dtype cannot change.
+
+    Args:
+        array (NumPy array or list): The initial content of the buffer, it is copied
+    """
+
+    _next_id = 0
+
+    # Buffers by id, for finding the buffers referenced by the draw commands
+    _live = weakref.WeakValueDictionary()
+    # Ids of the garbage collected buffers, to be released in the front-end
+    _released = []
+
+    def __init__(self, array):
+        array = np.asarray(array)
+        if array.ndim == 0:
+            raise ValueError("A CanvasBuffer cannot be created from a scalar")
+
+        dtype = _BufferConverter.frontend_dtype(array.dtype)
+        self._array = np.array(array, dtype=dtype, order="C")
+        self._dirty_rows = np.zeros(len(self._array), dtype=bool)
+        self._uploaded = False
+
+        self.id = CanvasBuffer._next_id
+        CanvasBuffer._next_id += 1
+        CanvasBuffer._live[self.id] = self
+        weakref.finalize(self, CanvasBuffer._released.append, self.id)
+
+    @property
+    def array(self):
+        """A read-only view on the content of the buffer."""
+        view = self._array.view()
+        view.flags.writeable = False
+        return view
+
+    @property
+    def shape(self):
+        return self._array.shape
+
+    @property
+    def dtype(self):
+        return self._array.dtype
+
+    @property
+    def ndim(self):
+        return self._array.ndim
+
+    @property
+    def nbytes(self):
+        return self._array.nbytes
+
+    def __len__(self):
+        return len(self._array)
+
+    def __getitem__(self, key):
+        return self.array[key]
+
+    def __setitem__(self, key, value):
+        self._array[key] = value
+
+        # Rows are the entries along the first axis, e.g. the points of a (n, 2) array
+        rows = key[0] if isinstance(key, tuple) and len(key) else key
+        try:
+            self._dirty_rows[rows] = True
+        except IndexError:
+            self._dirty_rows[:] = True
+
+    def update(self, array):
+        """Replace the whole content of the buffer."""
+        self[...] = array
+
+    def _metadata(self):
+        return {"canvas_buffer": self.id, "shape": self.shape, "dtype": str(self.dtype)}
+
+    def _sync_command(self):
+        """Return the ``(name, args, buffers)`` command updating the front-end copy, ``None`` if it is up to date.
+
+        The data is copied, so that later assignments do not change the commands that are held.
+        """
+        if not self._uploaded:
+            rows = None
+        else:
+            rows = np.flatnonzero(self._dirty_rows)
+            if not len(rows):
+                return None
+            if 2 * len(rows) > len(self._array):
+                rows = None
+
+        self._uploaded = True
+        self._dirty_rows[:] = False
+
+        if rows is None:
+            metadata = {"shape": self.shape, "dtype": str(self.dtype), "idx": 0}
+            return "setCanvasBuffer", [self.id, metadata], [np.array(self._array)]
+
+        row_size = self._array[0].size
+        if rows[-1] - rows[0] + 1 == len(rows):
+            # Contiguous range, sent from its first row
+            values = np.array(self._array[rows[0] : rows[-1] + 1])
+            metadata = {"shape": values.shape, "dtype": str(self.dtype), "idx": 0}
+            args = [self.id, row_size, int(rows[0]), metadata]
+            return "updateCanvasBuffer", args, [values]
+
+        values = self._array[rows]
+        rows = rows.astype(np.int32)
+        rows_metadata = {"shape": rows.shape, "dtype": "int32", "idx": 0}
+        metadata = {"shape": values.shape, "dtype": str(self.dtype), "idx": 1}
+        args = [self.id, row_size, rows_metadata, metadata]
+        return "updateCanvasBuffer", args, [rows, values]
+
+
 def array_to_binary(ar):
-    """Turn a NumPy array into a binary buffer."""
-    # Unsupported int64 array JavaScript side
-    if ar.dtype == np.int64:
-        ar = ar.astype(np.int32)
+    """Turn a NumPy array into a binary buffer.
+
+    The buffer is a view on ``ar`` when the front-end can read it as is, see ``_BufferConverter``.
+    """
+    return _BUFFER_CONVERTER.convert(ar)
+
 
-    # Unsupported float16 array JavaScript side
-    if ar.dtype == np.float16:
-        ar = ar.astype(np.float32)
+def string_table(values):
+    """Deduplicate a sequence of strings.
 
-    # make sure it's contiguous
-    if not ar.flags["C_CONTIGUOUS"]:
-        ar = np.ascontiguousarray(ar)
+    Return the list of the unique strings and an int32 NumPy array with the index of each value in this list.
+    """
+    table, indices = np.unique(np.asarray(values, dtype=str), return_inverse=True)
+    return table.tolist(), indices.astype(np.int32).ravel()
 
-    return {"shape": ar.shape, "dtype": str(ar.dtype)}, memoryview(ar)
+
+# Number of coordinates taken by each path opcode, indexed by opcode (see ``Path2D.MOVE_TO`` and
+# following constants): move_to, line_to, quadratic_curve_to, bezier_curve_to, arc, arc_to, ellipse,
+# rect and close_path. The anticlockwise flag of arc and ellipse is a coordinate (0 or 1).
+PATH_OPCODE_SIZES = np.array([2, 2, 4, 6, 6, 5, 8, 4, 0], dtype=np.int64)
+
+
+def path_arrays(opcodes, coords):
+    """Validate the opcodes and coordinates of a path.
+
+    Return the opcodes as a uint8 NumPy array and the coordinates as a flat float64 NumPy array.
+    """
+    opcodes = np.asarray(opcodes).ravel()
+    coords = np.asarray(coords, dtype=np.float64).ravel()
+
+    if len(opcodes) and (opcodes.min() < 0 or opcodes.max() >= len(PATH_OPCODE_SIZES)):
+        raise ValueError("Unknown path opcode")
+
+    opcodes = opcodes.astype(np.uint8)
+    expected = int(PATH_OPCODE_SIZES[opcodes].sum())
+    if expected != len(coords):
+        raise ValueError(
+            f"The path opcodes take {expected} coordinates, got {len(coords)}"
+        )
+
+    return opcodes, coords
+
+
+# Arguments sent as is, checked first as they are the most common ones. NumPy scalars support the
+# buffer protocol but are numbers
+_SCALAR_ARG_TYPES = (int, float, str, dict, type(None), np.generic)
 
 
 def populate_args(arg, args, buffers):
+    if isinstance(arg, CanvasBuffer):
+        # The front-end already has the data
+        args.append(arg._metadata())
+        return
     if isinstance(arg, (list, np.ndarray)):
-        arg_metadata, arg_buffer = array_to_binary(np.asarray(arg))
-        arg_metadata["idx"] = len(buffers)
-
-        args.append(arg_metadata)
-        buffers.append(arg_buffer)
-    else:
+        array = np.asarray(arg)
+    elif isinstance(arg, _SCALAR_ARG_TYPES):
         args.append(arg)
+        return
+    else:
+        # Any other object supporting the buffer protocol (memoryview, bytes, array.array...)
+        try:
+            array = np.asarray(memoryview(arg))
+        except TypeError:
+            args.append(arg)
+            return
 
+    arg_metadata, arg_buffer = array_to_binary(array)
+    arg_metadata["idx"] = len(buffers)
 
-def commands_to_buffer(commands):
-    # Turn the commands list into a binary buffer
-    if ORJSON_AVAILABLE:
-        return array_to_binary(
-            np.frombuffer(
-                bytes(orjson.dumps(commands, option=orjson.OPT_SERIALIZE_NUMPY)),
-                dtype=np.uint8,
-            )
+    args.append(arg_metadata)
+    buffers.append(arg_buffer)
+
+
+# Binary command stream
+#
+# All values are little-endian. The stream is made of:
+#
+# - a 16 bytes header: the magic bytes ``IPYC``, the number of commands (uint32), the number of
+#   numeric operands (uint32) and the dtype of the numeric operands (uint8, 0 for float32 and 1
+#   for float64) followed by 3 bytes of padding
+# - one uint32 word per command: the opcode (8 bits), the number of arguments (7 bits), a flag
+#   telling if the arguments are stored in the side table (1 bit) and the number of buffers (16 bits).
+#   Commands with more arguments than the 7 bits can count go to the side table
+# - the numeric operands, aligned on 8 bytes, consumed in order by the commands whose arguments
+#   are all numbers (booleans are sent as 0 and 1)
+# - the side table, a JSON array with the arguments of the remaining commands (strings, widget
+#   references, buffer metadata...)
+_BINARY_MAGIC = b"IPYC"
+_BINARY_HEADER = struct.Struct("<4sIIB3x")
+_BINARY_SIDE_TABLE_FLAG = 1 << 15
+_BINARY_MAX_ARGS = (1 << 7) - 1
+_BINARY_MAX_BUFFERS = (1 << 16) - 1
+
+
+_NUMERIC_TYPES = frozenset(
+    (int, float, bool, np.float64, np.float32, np.int64, np.int32)
+)
+
+
+def commands_to_binary(commands):
+    """Turn a command, or a list of commands, into the binary command stream."""
+    if not len(commands) or not isinstance(commands[0], (list, tuple)):
+        commands = [commands]
+
+    # Everything is done on flattened arguments so that the per-argument work happens in C
+    opcodes = np.fromiter(map(itemgetter(0), commands), np.int64, len(commands))
+    args = list(map(itemgetter(1), commands))
+    try:
+        n_buffers = np.fromiter(map(itemgetter(2), commands), np.int64, len(commands))
+    except IndexError:
+        n_buffers = np.array([len(command) > 2 and command[2] for command in commands])
+    if len(n_buffers) and n_buffers.max() > _BINARY_MAX_BUFFERS:
+        raise ValueError(
+            f"A command cannot have more than {_BINARY_MAX_BUFFERS} buffers in the binary encoding"
         )
+
+    n_args = np.fromiter(map(len, args), np.int64, len(args))
+    flat_args = list(chain.from_iterable(args))
+    types = list(map(type, flat_args))
+
+    if _NUMERIC_TYPES.issuperset(types) and not (n_args > _BINARY_MAX_ARGS).any():
+        # All the arguments are operands, e.g. for a path made of lineTo commands
+        in_side_table = np.zeros(len(commands), dtype=bool)
+        numbers = np.fromiter(flat_args, np.float64, len(flat_args))
     else:
-        return array_to_binary(
-            np.frombuffer(bytes(json.dumps(commands), encoding="utf8"), dtype=np.uint8)
+        flat_args = np.fromiter(flat_args, object, len(flat_args))
+        numeric = np.fromiter(
+            map(_NUMERIC_TYPES.__contains__, types),
+            dtype=bool,
+            count=len(flat_args),
+        )
+
+        # Commands with at least one non-numeric argument, or too many arguments, go to the side table
+        in_side_table = n_args > _BINARY_MAX_ARGS
+        non_empty = n_args > 0
+        if len(flat_args):
+            starts = np.cumsum(n_args) - n_args
+            in_side_table[non_empty] |= np.add.reduceat(~numeric, starts[non_empty]) > 0
+
+        numbers = flat_args[numeric & ~np.repeat(in_side_table, n_args)].astype(
+            np.float64
+        )
+
+    side_table = [args[idx] for idx in np.flatnonzero(in_side_table).tolist()]
+
+    words = (
+        opcodes
+        | (np.minimum(n_args, _BINARY_MAX_ARGS) << 8)
+        | (in_side_table * _BINARY_SIDE_TABLE_FLAG)
+        | (n_buffers << 16)
+    ).astype("<u4")
+
+    # Use single precision when it does not lose any information, which is the case
+    # for most coordinates (integers, halves...)
+    narrowed = numbers.astype(np.float32)
+    if np.array_equal(narrowed, numbers):
+        numbers = narrowed
+
+    header = _BINARY_HEADER.pack(
+        _BINARY_MAGIC, len(commands), len(numbers), numbers.dtype == np.float64
+    )
+    padding = b"\0" * (-(len(header) + words.nbytes) % 8)
+
+    return b"".join(
+        (
+            header,
+            words.tobytes(),
+            padding,
+            numbers.astype(numbers.dtype.newbyteorder("<")).tobytes(),
+            _dumps(side_table),
         )
+    )
+
+
+def binary_to_commands(data):
+    """Turn a binary command stream back into a list of commands."""
+    data = memoryview(data).cast("B")
+
+    magic, n_commands, n_numbers, double = _BINARY_HEADER.unpack_from(data)
+    if magic != _BINARY_MAGIC:
+        raise ValueError("Invalid binary command stream")
+
+    offset = _BINARY_HEADER.size
+    words = np.frombuffer(data, dtype="<u4", count=n_commands, offset=offset)
+    offset += words.nbytes
+    offset += -offset % 8
+
+    numbers = np.frombuffer(
+        data, dtype="<f8" if double else "<f4", count=n_numbers, offset=offset
+    ).tolist()
+    offset += n_numbers * (8 if double else 4)
+
+    side_table = iter(json.loads(bytes(data[offset:])))
+
+    commands = []
+    number_idx = 0
+    for word in words.tolist():
+        n_args = (word >> 8) & 0x7F
+        if word & _BINARY_SIDE_TABLE_FLAG:
+            args = list(next(side_table))
+        else:
+            args = numbers[number_idx : number_idx + n_args]
+            number_idx += n_args
+        commands.append([word & 0xFF, args, word >> 16])
+
+    return commands
+
+
+def _dumps(obj):
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+    return bytes(json.dumps(obj), encoding="utf8")
+
+
+def commands_to_buffer(commands, encoding="json"):
+    # Turn the commands list into a binary buffer
+    if encoding == "binary":
+        data = commands_to_binary(commands)
+    else:
+        data = _dumps(commands)
+
+    metadata = {"shape": (len(data),), "dtype": "uint8", "encoding": encoding}
+    return metadata, memoryview(data)
@@ -30,6 +30,61 @@ export function getTypedArray(dataview: any, metadata: any) {
   }
 }
 
+// Binary command stream, see ipycanvas/utils.py for the format description
+const BINARY_MAGIC = 'IPYC';
+const BINARY_HEADER_SIZE = 16;
+const BINARY_SIDE_TABLE_FLAG = 1 << 15;
+
+export function decodeBinaryCommands(bytes: Uint8Array): any[] {
+  const view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength);
+
+  if (String.fromCharCode(...bytes.subarray(0, 4)) !== BINARY_MAGIC) {
+    throw 'Invalid binary command stream';
+  }
+
+  const nCommands = view.getUint32(4, true);
+  const nNumbers = view.getUint32(8, true);
+  const double = view.getUint8(12) === 1;
+
+  let offset = BINARY_HEADER_SIZE;
+  const words = new Uint32Array(
+    bytes.slice(offset, offset + 4 * nCommands).buffer
+  );
+  offset += 4 * nCommands;
+  offset += (8 - (offset % 8)) % 8;
+
+  const numbersSize = nNumbers * (double ? 8 : 4);
+  const numbersBuffer = bytes.slice(offset, offset + numbersSize).buffer;
+  const numbers = double
+    ? new Float64Array(numbersBuffer)
+    : new Float32Array(numbersBuffer);
+  offset += numbersSize;
+
+  const sideTable = JSON.parse(
+    new TextDecoder('utf-8').decode(bytes.subarray(offset))
+  );
+
+  const commands = new Array(nCommands);
+  let numberIdx = 0;
+  let sideTableIdx = 0;
+  for (let idx = 0; idx < nCommands; ++idx) {
+    const word = words[idx];
+    const nArgs = (word >> 8) & 0x7f;
+
+    let args: any[];
+    if (word & BINARY_SIDE_TABLE_FLAG) {
+      args = sideTable[sideTableIdx++];
+    } else {
+      args = Array.from(numbers.subarray(numberIdx, numberIdx + nArgs));
+      numberIdx += nArgs;
+    }
+
+    commands[idx] = [word & 0xff, args, word >>> 16];
+  }
+
+  return commands;
+}
+
 // Scalar type
 type Scalar = null | boolean | number | string;
 
@@ -92,6 +147,147 @@ class BufferArg extends Arg {
   value: TypedArray;
 }
 
+// Number of coordinates taken by each path opcode, indexed by opcode (see Path2D.MOVE_TO and
+// following constants in the kernel)
+const PATH_OPCODE_SIZES = [2, 2, 4, 6, 6, 5, 8, 4, 0];
+
+/**
+ * Add the segments given by an array of opcodes and an array of coordinates to a path,
+ * which is either a Path2D or the current path of a context.
+ */
+export function buildPath(
+  path: CanvasPath,
+  opcodes: ArrayLike<number>,
+  coords: ArrayLike<number>
+) {
+  let c = 0;
+  for (let idx = 0; idx < opcodes.length; ++idx) {
+    const opcode = opcodes[idx];
+    switch (opcode) {
+      case 0:
+        path.moveTo(coords[c], coords[c + 1]);
+        break;
+      case 1:
+        path.lineTo(coords[c], coords[c + 1]);
+        break;
+      case 2:
+        path.quadraticCurveTo(
+          coords[c],
+          coords[c + 1],
+          coords[c + 2],
+          coords[c + 3]
+        );
+        break;
+      case 3:
+        path.bezierCurveTo(
+          coords[c],
+          coords[c + 1],
+          coords[c + 2],
+          coords[c + 3],
+          coords[c + 4],
+          coords[c + 5]
+        );
+        break;
+      case 4:
+        path.arc(
+          coords[c],
+          coords[c + 1],
+          coords[c + 2],
+          coords[c + 3],
+          coords[c + 4],
+          coords[c + 5] !== 0
+        );
+        break;
+      case 5:
+        path.arcTo(
+          coords[c],
+          coords[c + 1],
+          coords[c + 2],
+          coords[c + 3],
+          coords[c + 4]
+        );
+        break;
+      case 6:
+        path.ellipse(
+          coords[c],
+          coords[c + 1],
+          coords[c + 2],
+          coords[c + 3],
+          coords[c + 4],
+          coords[c + 5],
+          coords[c + 6],
+          coords[c + 7] !== 0
+        );
+        break;
+      case 7:
+        path.rect(coords[c], coords[c + 1], coords[c + 2], coords[c + 3]);
+        break;
+      case 8:
+        path.closePath();
+        break;
+      default:
+        throw 'Unknown path opcode ' + opcode;
+    }
+    c += PATH_OPCODE_SIZES[opcode];
+  }
+}
+
+/**
+ * LRU cache of binary buffers keyed by the hash of their content, bounded to maxBytes.
+ * The kernel keeps a mirror of it, see _ResourceCache in the kernel.
+ */
+export class ResourceCache {
+  constructor(maxBytes: number) {
+    this.maxBytes = maxBytes;
+  }
+
+  get(key: string): DataView | undefined {
+    const buffer = this.entries.get(key);
+    if (buffer !== undefined) {
+      // Mark as recently used
+      this.entries.delete(key);
+      this.entries.set(key, buffer);
+    }
+    return buffer;
+  }
+
+  set(key: string, buffer: DataView) {
+    const previous = this.entries.get(key);
+    if (previous !== undefined) {
+      this.entries.delete(key);
+      this.nbytes -= previous.byteLength;
+    }
+    this.entries.set(key, buffer);
+    this.nbytes += buffer.byteLength;
+    this.evict();
+  }
+
+  resize(maxBytes: number) {
+    this.maxBytes = maxBytes;
+    this.evict();
+  }
+
+  clear() {
+    this.entries.clear();
+    this.nbytes = 0;
+  }
+
+  private evict() {
+    // Maps iterate in insertion order, the first entry is the least recently used
+    for (const [key, buffer] of this.entries) {
+      if (this.nbytes <= this.maxBytes) {
+        break;
+      }
+      this.entries.delete(key);
+      this.nbytes -= buffer.byteLength;
+    }
+  }
+
+  private maxBytes: number;
+  private nbytes = 0;
+  private entries = new Map<string, DataView>();
+}
+
 export function getArg(metadata: any, buffers: any): Arg {
   if (Scalar.isScalar(metadata)) {
     return new ScalarArg(metadata);
@@ -167,3 +363,275 @@ export async function bufferToImage(buffer: any): Promise<HTMLImageElement> {
     img.src = url;
   });
 }
+
+// Size of the tiles used by the "tiles" image data sync mode
+const TILE_SIZE = 64;
+
+// Minimum time in milliseconds between two readbacks of the canvas in the tiles sync mode
+const TILE_SYNC_INTERVAL = 100;
+
+// Composite operations changing the pixels outside of the drawn shape
+const NON_LOCAL_COMPOSITE_OPERATIONS = new Set([
+  'copy',
+  'source-in',
+  'source-out',
+  'destination-in',
+  'destination-atop'
+]);
+
+/**
+ * Return the region of the canvas a draw command may change, as [x0, y0, x1, y1] in pixels, null
+ * if it is not known and the whole canvas must be considered changed.
+ */
+export function commandBounds(
+  ctx: CanvasRenderingContext2D,
+  name: string,
+  args: any[]
+): number[] | null {
+  let x: number, y: number, width: number, height: number;
+  let margin = 0;
+
+  switch (name) {
+    case 'fillRect':
+    case 'clearRect':
+      [x, y, width, height] = args;
+      break;
+    case 'strokeRect':
+      [x, y, width, height] = args;
+      // Covers the miter joins of the corners
+      margin = ctx.lineWidth;
+      break;
+    case 'putImageData':
+      if (args[2] === undefined) {
+        // The size of the encoded images is only known once decoded
+        return null;
+      }
+      [x, y] = args;
+      [height, width] = args[2].shape;
+      break;
+    default:
+      return null;
+  }
+
+  if (
+    name !== 'clearRect' &&
+    (ctx.shadowBlur !== 0 ||
+      ctx.shadowOffsetX !== 0 ||
+      ctx.shadowOffsetY !== 0 ||
+      ctx.filter !== 'none' ||
+      NON_LOCAL_COMPOSITE_OPERATIONS.has(ctx.globalCompositeOperation))
+  ) {
+    return null;
+  }
+
+  const matrix = ctx.getTransform();
+  const xs: number[] = [];
+  const ys: number[] = [];
+  for (const [cornerX, cornerY] of [
+    [x - margin, y - margin],
+    [x + width + margin, y - margin],
+    [x - margin, y + height + margin],
+    [x + width + margin, y + height + margin]
+  ]) {
+    const point = matrix.transformPoint({ x: cornerX, y: cornerY });
+    xs.push(point.x);
+    ys.push(point.y);
+  }
+
+  // One more pixel for the anti-aliasing
+  return [
+    Math.floor(Math.min(...xs)) - 1,
+    Math.floor(Math.min(...ys)) - 1,
+    Math.ceil(Math.max(...xs)) + 1,
+    Math.ceil(Math.max(...ys)) + 1
+  ];
+}
+
+/**
+ * Keep track of the canvas pixels sent to the kernel, so that only the tiles that changed are sent.
+ *
+ * The draw commands mark the region they change as dirty, and only the tiles of this region are
+ * read back and compared with the pixels sent so far.
+ */
+export class ImageTileTracker {
+  reset() {
+    this.previous = null;
+  }
+
+  /**
+   * Mark the region [x0, y0, x1, y1] as changed since the last sync.
+   */
+  markDirty(x0: number, y0: number, x1: number, y1: number) {
+    if (this.dirty === null) {
+      this.dirty = [x0, y0, x1, y1];
+      return;
+    }
+    this.dirty = [
+      Math.min(this.dirty[0], x0),
+      Math.min(this.dirty[1], y0),
+      Math.max(this.dirty[2], x1),
+      Math.max(this.dirty[3], y1)
+    ];
+  }
+
+  markAllDirty() {
+    this.markDirty(-Infinity, -Infinity, Infinity, Infinity);
+  }
+
+  /**
+   * Run the sync at most once every TILE_SYNC_INTERVAL milliseconds, reading back and diffing the
+   * changed region of the canvas may cost more than drawing a batch. The batches drawn in the meantime
+   * are synced together by the next run.
+   */
+  throttle(sync: () => Promise<void>) {
+    if (this.scheduled) {
+      return;
+    }
+    this.scheduled = true;
+
+    const delay = Math.max(0, this.lastSync + TILE_SYNC_INTERVAL - Date.now());
+    setTimeout(async () => {
+      this.scheduled = false;
+      this.lastSync = Date.now();
+      await sync();
+    }, delay);
+  }
+
+  /**
+   * Return the tiles that changed since the last call, as [x, y, width, height] rectangles, and
+   * their raw RGBA pixels concatenated row by row.
+   */
+  diff(
+    ctx: CanvasRenderingContext2D,
+    width: number,
+    height: number
+  ): { tiles: number[][]; data: Uint8Array } {
+    let previous = this.previous;
+    if (previous === null || this.width !== width || this.height !== height) {
+      // Everything is sent again
+      previous = null;
+      this.markAllDirty();
+    }
+
+    const tiles: number[][] = [];
+    const dirty = this.dirty;
+    this.dirty = null;
+    if (dirty === null) {
+      return { tiles, data: new Uint8Array(0) };
+    }
+
+    // Only the tiles overlapping the dirty region are read back
+    const x0 = Math.max(0, Math.floor(dirty[0] / TILE_SIZE) * TILE_SIZE);
+    const y0 = Math.max(0, Math.floor(dirty[1] / TILE_SIZE) * TILE_SIZE);
+    const x1 = Math.min(width, Math.ceil(dirty[2] / TILE_SIZE) * TILE_SIZE);
+    const y1 = Math.min(height, Math.ceil(dirty[3] / TILE_SIZE) * TILE_SIZE);
+    if (x1 <= x0 || y1 <= y0) {
+      return { tiles, data: new Uint8Array(0) };
+    }
+
+    const regionWidth = x1 - x0;
+    const pixels = ctx.getImageData(x0, y0, regionWidth, y1 - y0).data;
+    const current = new Uint32Array(pixels.buffer, 0, regionWidth * (y1 - y0));
+
+    let size = 0;
+    for (let y = y0; y < y1; y += TILE_SIZE) {
+      const tileHeight = Math.min(TILE_SIZE, y1 - y);
+
+      for (let x = x0; x < x1; x += TILE_SIZE) {
+        const tileWidth = Math.min(TILE_SIZE, x1 - x);
+
+        if (
+          previous === null ||
+          tileChanged(
+            previous,
+            width,
+            current,
+            regionWidth,
+            x0,
+            y0,
+            x,
+            y,
+            tileWidth,
+            tileHeight
+          )
+        ) {
+          tiles.push([x, y, tileWidth, tileHeight]);
+          size += tileWidth * tileHeight * 4;
+        }
+      }
+    }
+
+    const data = new Uint8Array(size);
+    let offset = 0;
+    for (const [x, y, tileWidth, tileHeight] of tiles) {
+      for (let row = y; row < y + tileHeight; row++) {
+        const start = ((row - y0) * regionWidth + x - x0) * 4;
+        data.set(pixels.subarray(start, start + tileWidth * 4), offset);
+        offset += tileWidth * 4;
+      }
+    }
+
+    if (previous === null) {
+      previous = new Uint32Array(width * height);
+    }
+    for (let row = y0; row < y1; row++) {
+      const start = (row - y0) * regionWidth;
+      previous.set(
+        current.subarray(start, start + regionWidth),
+        row * width + x0
+      );
+    }
+
+    this.previous = previous;
+    this.width = width;
+    this.height = height;
+
+    return { tiles, data };
+  }
+
+  private previous: Uint32Array | null = null;
+  private dirty: number[] | null = null;
+  private width = 0;
+  private height = 0;
+  private scheduled = false;
+  private lastSync = 0;
+}
+
+function tileChanged(
+  previous: Uint32Array,
+  width: number,
+  current: Uint32Array,
+  regionWidth: number,
+  x0: number,
+  y0: number,
+  x: number,
+  y: number,
+  tileWidth: number,
+  tileHeight: number
+): boolean {
+  for (let row = y; row < y + tileHeight; row++) {
+    const start = row * width + x;
+    const currentStart = (row - y0) * regionWidth + x - x0;
+    for (let idx = 0; idx < tileWidth; idx++) {
+      if (previous[start + idx] !== current[currentStart + idx]) {
+        return true;
+      }
+    }
+  }
+  return false;
+}
+
+/**
+ * Compress data with the zlib format, returns null if the browser does not support it.
+ */
+export async function deflate(data: Uint8Array): Promise<Uint8Array | null> {
+  const CompressionStream = (globalThis as any).CompressionStream;
+  if (CompressionStream === undefined) {
+    return null;
+  }
+
+  const stream = new Blob([data]).stream().pipeThrough(
+    new CompressionStream('deflate')
+  );
+  return new Uint8Array(await new Response(stream).arrayBuffer());
+}
@@ -21,7 +21,13 @@ import {
   toBytes,
   fromBytes,
   getTypedArray,
-  bufferToImage
+  bufferToImage,
+  buildPath,
+  commandBounds,
+  decodeBinaryCommands,
+  deflate,
+  ImageTileTracker,
+  ResourceCache
 } from './utils';
 
 function getContext(canvas: HTMLCanvasElement) {
@@ -36,6 +42,55 @@ function serializeImageData(array: Uint8ClampedArray) {
   return new DataView(array.buffer.slice(0));
 }
 
+/**
+ * Send the tiles of the canvas that changed since the last call to the kernel, as raw RGBA pixels.
+ */
+async function sendImageTiles(
+  model: WidgetModel,
+  tracker: ImageTileTracker,
+  ctx: CanvasRenderingContext2D
+) {
+  const width = ctx.canvas.width;
+  const height = ctx.canvas.height;
+  const { tiles, data } = tracker.diff(ctx, width, height);
+  if (tiles.length === 0) {
+    return;
+  }
+
+  let compression = 'none';
+  let buffer = data;
+  if (model.get('image_data_compression') === 'deflate') {
+    const compressed = await deflate(data);
+    if (compressed !== null) {
+      compression = 'deflate';
+      buffer = compressed;
+    }
+  }
+
+  model.send(
+    { event: 'image_tiles', width, height, tiles, compression },
+    {},
+    [buffer]
+  );
+}
+
+/**
+ * Time of an event in milliseconds since the epoch, from the browser clock.
+ */
+function getEventTime(event: Event) {
+  return performance.timeOrigin + event.timeStamp;
+}
+
+function getKeyEventContent(event: KeyboardEvent) {
+  return {
+    time: getEventTime(event),
+    key: event.key,
+    shift_key: event.shiftKey,
+    ctrl_key: event.ctrlKey,
+    meta_key: event.metaKey
+  };
+}
+
 function deserializeImageData(dataview: DataView | null) {
   if (dataview === null) {
     return null;
@@ -128,34 +183,102 @@ const COMMANDS = [
   'fillStyledPolygons',
   'strokeStyledPolygons',
   'strokeStyledLineSegments',
-  'switchCanvas'
+  'switchCanvas',
+  'resetCanvas',
+  'drawImages',
+  'fillTexts',
+  'strokeTexts',
+  'pathFromArrays',
+  'setCanvasBuffer',
+  'updateCanvasBuffer',
+  'deleteCanvasBuffer'
 ];
 
+// Commands that do not change the pixels of the canvas
+const NON_DRAWING_COMMANDS = new Set([
+  'switchCanvas',
+  'sleep',
+  'beginPath',
+  'closePath',
+  'moveTo',
+  'lineTo',
+  'rect',
+  'arc',
+  'ellipse',
+  'arcTo',
+  'quadraticCurveTo',
+  'bezierCurveTo',
+  'pathFromArrays',
+  'setLineDash',
+  'clip',
+  'save',
+  'restore',
+  'translate',
+  'rotate',
+  'scale',
+  'transform',
+  'setTransform',
+  'resetTransform',
+  'set',
+  'setCanvasBuffer',
+  'updateCanvasBuffer',
+  'deleteCanvasBuffer'
+]);
+
+// Identifies this front-end client, the kernel replays the retained commands to the new client only
+const CLIENT_ID = Math.random().toString(36).slice(2);
+
 export class CanvasManagerModel extends WidgetModel {
   defaults() {
     return {
       ...super.defaults(),
       _model_name: CanvasManagerModel.model_name,
       _model_module: CanvasManagerModel.model_module,
-      _model_module_version: CanvasManagerModel.model_module_version
+      _model_module_version: CanvasManagerModel.model_module_version,
+      resource_cache_size: 0
     };
   }
 
   initialize(attributes: any, options: any) {
     super.initialize(attributes, options);
 
+    this.resourceCache = new ResourceCache(this.get('resource_cache_size'));
+    this.on('change:resource_cache_size', () => {
+      this.resourceCache.resize(this.get('resource_cache_size'));
+    });
+
     this.on('msg:custom', (command: any, buffers: any) => {
+      if (command.client !== undefined && command.client !== CLIENT_ID) {
+        // Message for another client, e.g. the replay of the commands to a new view
+        return;
+      }
+      if (command.resources !== undefined) {
+        // Answer to a resource_cache_miss, the processing of the commands is waiting for it
+        this.onResources(command, buffers);
+        return;
+      }
+      if (command.canvas_buffer !== undefined) {
+        // Answer to a canvas_buffer_miss, the processing of the commands is waiting for it
+        this.onCanvasBuffer(command, buffers);
+        return;
+      }
+
       this.currentProcessing = this.currentProcessing.then(async () => {
         await this.onCommand(command, buffers);
       });
     });
+
+    // The kernel uploads the cached arrays and the CanvasBuffers again for this new client
+    this.send({ event: 'client_ready' }, {});
   }
 
   private async onCommand(command: any, buffers: any) {
     // Retrieve the commands buffer as an object (list of commands)
-    const commands = JSON.parse(
-      Buffer.from(getTypedArray(buffers[0], command)).toString('utf-8')
-    );
+    const commandsBuffer = getTypedArray(buffers[0], command);
+    const commands =
+      command.encoding === 'binary'
+        ? decodeBinaryCommands(commandsBuffer as Uint8Array)
+        : JSON.parse(Buffer.from(commandsBuffer).toString('utf-8'));
 
     this.canvasesToUpdate =
       this.currentCanvas !== undefined ? [this.currentCanvas] : [];
@@ -165,6 +288,11 @@ export class CanvasManagerModel extends WidgetModel {
     for (const canvas of this.canvasesToUpdate) {
       canvas.syncViews();
     }
+
+    if (command.frame !== undefined) {
+      // Let the kernel know that the frame is drawn, for its backpressure policy
+      this.send({ event: 'frame_ack', frame: command.frame }, {});
+    }
   }
 
   private async processCommand(command: any, buffers: any) {
@@ -186,10 +314,19 @@ export class CanvasManagerModel extends WidgetModel {
 
     const name: string = COMMANDS[command[0]];
     const args: any[] = command[1];
+
+    if (
+      !(await this.resolveCachedBuffers(args, buffers)) ||
+      !(await this.resolveCanvasBuffers(args, buffers))
+    ) {
+      return;
+    }
+
     switch (name) {
       case 'switchCanvas':
-        await this.switchCanvas(args[0]);
-        this.canvasesToUpdate.push(this.currentCanvas);
+        if (await this.switchCanvas(args[0])) {
+          this.canvasesToUpdate.push(this.currentCanvas);
+        }
         break;
       case 'sleep':
         await this.currentCanvas.sleep(args[0]);
@@ -289,6 +426,27 @@ export class CanvasManagerModel extends WidgetModel {
       case 'drawImage':
         await this.currentCanvas.drawImage(args, buffers);
         break;
+      case 'drawImages':
+        await this.currentCanvas.drawImages(args, buffers);
+        break;
+      case 'fillTexts':
+        this.currentCanvas.drawTexts(args, buffers, true);
+        break;
+      case 'strokeTexts':
+        this.currentCanvas.drawTexts(args, buffers, false);
+        break;
+      case 'setCanvasBuffer':
+        this.setCanvasBuffer(args, buffers);
+        break;
+      case 'updateCanvasBuffer':
+        this.updateCanvasBuffer(args, buffers);
+        break;
+      case 'deleteCanvasBuffer':
+        this.canvasBuffers.delete(args[0]);
+        break;
+      case 'pathFromArrays':
+        this.currentCanvas.pathFromArrays(args, buffers);
+        break;
       case 'putImageData':
         await this.currentCanvas.putImageData(args, buffers);
         break;
@@ -298,6 +456,9 @@ export class CanvasManagerModel extends WidgetModel {
       case 'clear':
         this.currentCanvas.clearCanvas();
         break;
+      case 'resetCanvas':
+        this.currentCanvas.resetCanvas();
+        break;
       case 'fillPolygons':
         this.currentCanvas.drawPolygonOrLineSegments(args, buffers, true, true);
         break;
@@ -363,17 +524,215 @@ export class CanvasManagerModel extends WidgetModel {
         this.currentCanvas.executeCommand(name, args);
         break;
     }
+
+    if (!NON_DRAWING_COMMANDS.has(name)) {
+      this.currentCanvas.markDirty(name, args);
+    }
   }
 
-  private async switchCanvas(serializedCanvas: any) {
-    this.currentCanvas = await unpack_models(
-      serializedCanvas,
-      this.widget_manager
+  /**
+   * Put back the buffers the kernel replaced by their resource cache key, and cache the new ones.
+   * A buffer that is not in the cache (e.g. in a client attached after it was sent) is asked to
+   * the kernel. Returns false if the kernel does not have it anymore, the cache is then emptied on
+   * both sides and the command is skipped.
+   */
+  private async resolveCachedBuffers(
+    args: any[],
+    buffers: any[]
+  ): Promise<boolean> {
+    for (const arg of args) {
+      if (arg === null || typeof arg !== 'object' || arg.key === undefined) {
+        continue;
+      }
+
+      if (arg.idx !== undefined) {
+        this.resourceCache.set(arg.key, buffers[arg.idx]);
+        continue;
+      }
+
+      let buffer = this.resourceCache.get(arg.key);
+      if (buffer === undefined) {
+        await this.requestResources([arg.key]);
+        buffer = this.resourceCache.get(arg.key);
+      }
+      if (buffer === undefined) {
+        this.resourceCache.clear();
+        return false;
+      }
+
+      arg.idx = buffers.length;
+      buffers.push(buffer);
+    }
+
+    return true;
+  }
+
+  /**
+   * Ask the kernel for the buffers of the given resource cache keys, resolves once it answered.
+   */
+  private requestResources(keys: string[]): Promise<void> {
+    return new Promise(resolve => {
+      this.resourceRequests.push({ keys, resolve });
+      this.send({ event: 'resource_cache_miss', keys }, {});
+    });
+  }
+
+  /**
+   * Cache the buffers sent again by the kernel, and resume the commands waiting for them.
+   */
+  private onResources(reply: any, buffers: any[]) {
+    const answered = new Set<string>(reply.missing);
+    reply.resources.forEach((key: string, idx: number) => {
+      this.resourceCache.set(key, buffers[idx]);
+      answered.add(key);
+    });
+
+    // Other clients may have asked for other keys
+    this.resourceRequests = this.resourceRequests.filter(request => {
+      if (request.keys.every(key => answered.has(key))) {
+        request.resolve();
+        return false;
+      }
+      return true;
+    });
+  }
+
+  /**
+   * Put the data of the CanvasBuffers in the buffers of a command. A CanvasBuffer that is missing
+   * (e.g. after a page reload) is asked to the kernel. Returns false if the kernel does not have
+   * it anymore, the command is then skipped.
+   */
+  private async resolveCanvasBuffers(
+    args: any[],
+    buffers: any[]
+  ): Promise<boolean> {
+    let resolved = true;
+    for (const arg of args) {
+      if (
+        arg === null ||
+        typeof arg !== 'object' ||
+        arg.canvas_buffer === undefined
+      ) {
+        continue;
+      }
+
+      let canvasBuffer = this.canvasBuffers.get(arg.canvas_buffer);
+      if (canvasBuffer === undefined) {
+        await this.requestCanvasBuffer(arg.canvas_buffer);
+        canvasBuffer = this.canvasBuffers.get(arg.canvas_buffer);
+      }
+      if (canvasBuffer === undefined) {
+        resolved = false;
+        continue;
+      }
+
+      arg.idx = buffers.length;
+      arg.dtype = canvasBuffer.dtype;
+      buffers.push(canvasBuffer.data);
+    }
+
+    return resolved;
+  }
+
+  /**
+   * Ask the kernel for the content of a CanvasBuffer, resolves once it answered.
+   */
+  private requestCanvasBuffer(id: number): Promise<void> {
+    return new Promise(resolve => {
+      const requests = this.canvasBufferRequests.get(id) || [];
+      requests.push(resolve);
+      this.canvasBufferRequests.set(id, requests);
+      this.send({ event: 'canvas_buffer_miss', id }, {});
+    });
+  }
+
+  /**
+   * Store the CanvasBuffer sent again by the kernel, and resume the commands waiting for it.
+   */
+  private onCanvasBuffer(reply: any, buffers: any[]) {
+    if (!reply.missing) {
+      this.setCanvasBuffer([reply.canvas_buffer, reply], buffers);
+    }
+
+    const requests = this.canvasBufferRequests.get(reply.canvas_buffer) || [];
+    this.canvasBufferRequests.delete(reply.canvas_buffer);
+    for (const resolve of requests) {
+      resolve();
+    }
+  }
+
+  private setCanvasBuffer(args: any[], buffers: any[]) {
+    const [id, metadata] = args;
+    const source: DataView = buffers[metadata.idx];
+
+    // Copy the data, it is updated in place afterwards
+    const data = new Uint8Array(source.byteLength);
+    data.set(
+      new Uint8Array(source.buffer, source.byteOffset, source.byteLength)
     );
+
+    this.canvasBuffers.set(id, {
+      data: new DataView(data.buffer),
+      dtype: metadata.dtype
+    });
+  }
+
+  private updateCanvasBuffer(args: any[], buffers: any[]) {
+    const [id, rowSize, rows, metadata] = args;
+
+    const canvasBuffer = this.canvasBuffers.get(id);
+    if (canvasBuffer === undefined) {
+      // It will be reported missing when drawn
+      return;
+    }
+
+    const target = getTypedArray(canvasBuffer.data, canvasBuffer);
+    const values = getTypedArray(buffers[metadata.idx], metadata);
+
+    if (typeof rows === 'number') {
+      // Contiguous rows
+      target.set(values, rows * rowSize);
+      return;
+    }
+
+    const indices = getTypedArray(buffers[rows.idx], rows);
+    for (let idx = 0; idx < indices.length; ++idx) {
+      target.set(
+        values.subarray(idx * rowSize, (idx + 1) * rowSize),
+        indices[idx] * rowSize
+      );
+    }
+  }
+
+  private async switchCanvas(serializedCanvas: any): Promise<boolean> {
+    // The canvas models are kept by reference, switching to a canvas again does not need a lookup
+    let canvas = this.canvasModels.get(serializedCanvas);
+
+    // Switching to the current canvas (e.g. at the start of a replayed log) does nothing
+    if (canvas !== undefined && canvas === this.currentCanvas) {
+      return false;
+    }
+
+    if (canvas === undefined) {
+      canvas = (await unpack_models(
+        serializedCanvas,
+        this.widget_manager
+      )) as CanvasModel;
+      this.canvasModels.set(serializedCanvas, canvas);
+      canvas.once('destroy', () => this.canvasModels.delete(serializedCanvas));
+    }
+
+    this.currentCanvas = canvas;
+    return true;
   }
 
   private currentCanvas: CanvasModel;
+  private canvasModels = new Map<string, CanvasModel>();
   private currentProcessing: Promise<void> = Promise.resolve();
+  private resourceCache: ResourceCache;
+  private resourceRequests: { keys: string[]; resolve: () => void }[] = [];
+  private canvasBuffers = new Map<number, { data: DataView; dtype: string }>();
+  private canvasBufferRequests = new Map<number, (() => void)[]>();
   private canvasesToUpdate: CanvasModel[] = [];
 
   static model_name = 'CanvasManagerModel';
@@ -416,7 +775,9 @@ export class Path2DModel extends WidgetModel {
       _model_name: Path2DModel.model_name,
       _model_module: Path2DModel.model_module,
       _model_module_version: Path2DModel.model_module_version,
-      value: ''
+      value: '',
+      opcodes: null,
+      coords: null
     };
   }
 
@@ -424,6 +785,15 @@ export class Path2DModel extends WidgetModel {
     super.initialize(attributes, options);
 
     this.value = new Path2D(this.get('value'));
+
+    const opcodes = this.get('opcodes');
+    if (opcodes !== null) {
+      buildPath(
+        this.value,
+        getTypedArray(opcodes, { dtype: 'uint8' }),
+        getTypedArray(this.get('coords'), { dtype: 'float64' })
+      );
+    }
   }
 
   value: Path2D;
@@ -433,6 +803,25 @@ export class Path2DModel extends WidgetModel {
   static model_module_version = MODULE_VERSION;
 }
 
+// The Path2D models by serialized reference. The native paths are built once by the models,
+// this avoids resolving the model every time a path is drawn.
+const path2DCache = new Map<string, Path2DModel>();
+
+async function getPath2DModel(
+  serializedPath: string,
+  widgetManager: any
+): Promise<Path2DModel> {
+  let path = path2DCache.get(serializedPath);
+
+  if (path === undefined) {
+    path = (await unpack_models(serializedPath, widgetManager)) as Path2DModel;
+    path2DCache.set(serializedPath, path);
+    path.once('destroy', () => path2DCache.delete(serializedPath));
+  }
+
+  return path;
+}
+
 export class PatternModel extends AsyncValueWidgetModel<CanvasPattern> {
   defaults() {
     return {
@@ -492,6 +881,53 @@ export class PatternModel extends AsyncValueWidgetModel<CanvasPattern> {
   );
 }
 
+export class SpriteAtlasModel extends AsyncValueWidgetModel<
+  HTMLCanvasElement | HTMLImageElement
+> {
+  defaults() {
+    return {
+      ...super.defaults(),
+      _model_name: SpriteAtlasModel.model_name,
+      _model_module: SpriteAtlasModel.model_module,
+      _model_module_version: SpriteAtlasModel.model_module_version,
+      image: '',
+      rects: []
+    };
+  }
+
+  async initialize(attributes: any, options: any) {
+    super.initialize(attributes, options);
+
+    // Flat [x0, y0, width0, height0, x1, ...] source rectangles
+    this.rects = new Float64Array(this.get('rects').flat());
+
+    const image = this.get('image');
+
+    if (image instanceof CanvasModel || image instanceof MultiCanvasModel) {
+      this.value = image.canvas;
+      return;
+    }
+
+    if (image.get('_model_name') == 'ImageModel') {
+      this.value = await createImageFromWidget(image);
+      return;
+    }
+
+    throw 'Could not understand the source for the sprite atlas';
+  }
+
+  rects: Float64Array;
+
+  static serializers: ISerializers = {
+    ...WidgetModel.serializers,
+    image: { deserialize: unpack_models as any }
+  };
+
+  static model_name = 'SpriteAtlasModel';
+  static model_module = MODULE_NAME;
+  static model_module_version = MODULE_VERSION;
+}
+
 class GradientModel extends AsyncValueWidgetModel<CanvasGradient> {
   defaults() {
     return {
@@ -582,6 +1018,10 @@ export class CanvasModel extends DOMWidgetModel {
       height: 500,
       sync_image_data: false,
       image_data: null,
+      image_data_sync_mode: 'png',
+      image_data_compression: 'none',
+      max_event_rate: 0,
+      event_coalescing: 'latest',
       _send_client_ready_event: true
     };
   }
@@ -622,16 +1062,21 @@ export class CanvasModel extends DOMWidgetModel {
 
     this.canvas = document.createElement('canvas');
     this.ctx = getContext(this.canvas);
+    this.tileTracker = new ImageTileTracker();
 
     this.resizeCanvas();
     this.drawImageData();
 
     this.on_some_change(['width', 'height'], this.resizeCanvas, this);
-    this.on('change:sync_image_data', this.syncImageData.bind(this));
+    this.on_some_change(
+      ['sync_image_data', 'image_data_sync_mode'],
+      this.resetImageSync,
+      this
+    );
     // this.on('msg:custom', this.onCommand.bind(this));
 
     if (this.get('_send_client_ready_event')) {
-      this.send({ event: 'client_ready' }, {});
+      this.send({ event: 'client_ready', client: CLIENT_ID }, {});
     }
   }
 
@@ -640,6 +1085,7 @@ export class CanvasModel extends DOMWidgetModel {
       const img = await fromBytes(this.get('image_data'));
 
       this.ctx.drawImage(img, 0, 0);
+      this.tileTracker.markAllDirty();
 
       this.trigger('new-frame');
     }
@@ -933,6 +1379,77 @@ export class CanvasModel extends DOMWidgetModel {
     this.ctx.restore();
   }
 
+  drawTexts(args: any[], buffers: any, fill: boolean) {
+    const strings: string[] = args[0];
+    const indices = getArg(args[1], buffers);
+    const x = getArg(args[2], buffers);
+    const y = getArg(args[3], buffers);
+    const colors = args[4] === null ? null : getArg(args[4], buffers);
+    const alpha = getArg(args[5], buffers);
+    // Trailing null arguments are dropped by the kernel
+    const fonts: string | string[] | null =
+      args[6] === undefined ? null : args[6];
+    const fontIndices =
+      args[7] === undefined || args[7] === null
+        ? null
+        : getArg(args[7], buffers);
+    const maxWidth =
+      args[8] === undefined || args[8] === null
+        ? null
+        : getArg(args[8], buffers);
+
+    // Scalar arguments have an infinite length, the kernel sends at least one array
+    const numberTexts = Math.min(indices.length, x.length, y.length);
+    if (numberTexts === Infinity) {
+      return;
+    }
+
+    this.ctx.save();
+    const globalAlpha = this.ctx.globalAlpha;
+    if (typeof fonts === 'string') {
+      this.ctx.font = fonts;
+    }
+    for (let idx = 0; idx < numberTexts; ++idx) {
+      if (fontIndices !== null) {
+        this.ctx.font = (fonts as string[])[fontIndices.getItem(idx)];
+      }
+
+      if (colors !== null) {
+        const ci = 3 * idx;
+        const color = `rgba(${colors.getItem(ci)}, ${colors.getItem(
+          ci + 1
+        )}, ${colors.getItem(ci + 2)}, ${alpha.getItem(idx)})`;
+        this.setStyle(color, fill);
+      } else {
+        this.ctx.globalAlpha = globalAlpha * alpha.getItem(idx);
+      }
+
+      const text = strings[indices.getItem(idx)];
+      const width = maxWidth === null ? null : maxWidth.getItem(idx);
+      if (fill) {
+        if (width === null) {
+          this.ctx.fillText(text, x.getItem(idx), y.getItem(idx));
+        } else {
+          this.ctx.fillText(text, x.getItem(idx), y.getItem(idx), width);
+        }
+      } else {
+        if (width === null) {
+          this.ctx.strokeText(text, x.getItem(idx), y.getItem(idx));
+        } else {
+          this.ctx.strokeText(text, x.getItem(idx), y.getItem(idx), width);
+        }
+      }
+    }
+    this.ctx.restore();
+  }
+
+  pathFromArrays(args: any[], buffers: any) {
+    const opcodes = getTypedArray(buffers[args[0].idx], args[0]);
+    const coords = getTypedArray(buffers[args[1].idx], args[1]);
+
+    buildPath(this.ctx, opcodes, coords);
+  }
+
   drawStyledPolygonOrLineSegments(
     args: any[],
     buffers: any,
@@ -1062,16 +1579,16 @@ export class CanvasModel extends DOMWidgetModel {
 
   async strokePath(args: any[], buffers: any) {
     const [serializedPath] = args;
-    const path = await unpack_models(serializedPath, this.widget_manager);
+    const path = await getPath2DModel(serializedPath, this.widget_manager);
 
     this.ctx.stroke(path.value);
   }
 
   async fillPath(args: any[], buffers: any) {
-    const [serializedPath] = args;
-    const path = await unpack_models(serializedPath, this.widget_manager);
+    const [serializedPath, rule] = args;
+    const path = await getPath2DModel(serializedPath, this.widget_manager);
 
-    this.ctx.fill(path.value);
+    this.ctx.fill(path.value, rule === undefined ? 'nonzero' : rule);
   }
 
   async drawImage(args: any[], buffers: any) {
@@ -1090,8 +1607,64 @@ export class CanvasModel extends DOMWidgetModel {
     }
   }
 
+  async drawImages(args: any[], buffers: any) {
+    const atlas: SpriteAtlasModel = await unpack_models(
+      args[0],
+      this.widget_manager
+    );
+    const source = await atlas.initialized();
+    const rects = atlas.rects;
+
+    const indices = getArg(args[1], buffers);
+    const x = getArg(args[2], buffers);
+    const y = getArg(args[3], buffers);
+    const scale = getArg(args[4], buffers);
+    const rotation = getArg(args[5], buffers);
+    const alpha = getArg(args[6], buffers);
+
+    const numberSprites = Math.min(
+      indices.length,
+      x.length,
+      y.length,
+      scale.length,
+      rotation.length,
+      alpha.length
+    );
+
+    this.ctx.save();
+    const transform = this.ctx.getTransform();
+    const globalAlpha = this.ctx.globalAlpha;
+    for (let idx = 0; idx < numberSprites; ++idx) {
+      const ri = 4 * indices.getItem(idx);
+      const width = rects[ri + 2];
+      const height = rects[ri + 3];
+
+      // Sprite transform: translation to its center, rotation and scale
+      const angle = rotation.getItem(idx);
+      const s = scale.getItem(idx);
+      const cos = Math.cos(angle) * s;
+      const sin = Math.sin(angle) * s;
+      this.ctx.setTransform(transform);
+      this.ctx.transform(cos, sin, -sin, cos, x.getItem(idx), y.getItem(idx));
+
+      this.ctx.globalAlpha = globalAlpha * alpha.getItem(idx);
+      this.ctx.drawImage(
+        source,
+        rects[ri],
+        rects[ri + 1],
+        width,
+        height,
+        -width / 2,
+        -height / 2,
+        width,
+        height
+      );
+    }
+    this.ctx.restore();
+  }
+
   private _drawImage(
-    image: HTMLCanvasElement | HTMLImageElement,
+    image: HTMLCanvasElement | HTMLImageElement | ImageBitmap,
     x: number,
     y: number,
     width?: number,
@@ -1105,7 +1678,25 @@ export class CanvasModel extends DOMWidgetModel {
   }
 
   async putImageData(args: any[], buffers: any) {
-    const [x, y] = args;
+    const [x, y, metadata] = args;
+
+    if (metadata !== undefined) {
+      // Raw RGBA pixels
+      const [height, width] = metadata.shape;
+      const dataview = buffers[metadata.idx];
+      const pixels = new Uint8ClampedArray(
+        dataview.buffer,
+        dataview.byteOffset,
+        width * height * 4
+      );
+
+      const bitmap = await createImageBitmap(
+        new ImageData(pixels, width, height)
+      );
+      this._drawImage(bitmap, x, y);
+      bitmap.close();
+      return;
+    }
 
     const image = await bufferToImage(buffers[0]);
 
@@ -1131,10 +1722,35 @@ export class CanvasModel extends DOMWidgetModel {
     this.ctx.clearRect(0, 0, this.canvas.width, this.canvas.height);
   }
 
+  resetCanvas() {
+    // Setting the canvas size clears it and resets the context state
+    this.resizeCanvas();
+    this.clearCanvas();
+  }
+
   executeCommand(name: string, args: any[] = []) {
     (this.ctx as any)[name](...args);
   }
 
+  /**
+   * Record the region changed by a draw command, for the tiles image data sync mode.
+   */
+  markDirty(name: string, args: any[]) {
+    if (
+      !this.get('sync_image_data') ||
+      this.get('image_data_sync_mode') !== 'tiles'
+    ) {
+      return;
+    }
+
+    const bounds = commandBounds(this.ctx, name, args);
+    if (bounds === null) {
+      this.tileTracker.markAllDirty();
+    } else {
+      this.tileTracker.markDirty(bounds[0], bounds[1], bounds[2], bounds[3]);
+    }
+  }
+
   private forEachView(callback: (view: CanvasView) => void) {
     for (const view_id in this.views) {
       this.views[view_id].then((view: CanvasView) => {
@@ -1148,11 +1764,24 @@ export class CanvasModel extends DOMWidgetModel {
     this.canvas.setAttribute('height', this.get('height'));
   }
 
+  private resetImageSync() {
+    // Send all the tiles again
+    this.tileTracker.reset();
+    this.syncImageData();
+  }
+
   private async syncImageData() {
     if (!this.get('sync_image_data')) {
       return;
     }
 
+    if (this.get('image_data_sync_mode') === 'tiles') {
+      this.tileTracker.throttle(() =>
+        sendImageTiles(this, this.tileTracker, this.ctx)
+      );
+      return;
+    }
+
     const bytes = await toBytes(this.canvas);
 
     this.set('image_data', bytes);
@@ -1168,6 +1797,7 @@ export class CanvasModel extends DOMWidgetModel {
 
   canvas: HTMLCanvasElement;
   ctx: CanvasRenderingContext2D;
+  tileTracker: ImageTileTracker;
 
   views: Dict<Promise<CanvasView>>;
 }
@@ -1229,7 +1859,12 @@ export class RoughCanvasModel extends CanvasModel {
   async fillPath(args: any[], buffers: any) {
     const [serializedPath] = args;
 
-    const path = await unpack_models(serializedPath, this.widget_manager);
+    const path = await getPath2DModel(serializedPath, this.widget_manager);
+
+    if (path.get('opcodes') !== null) {
+      // Paths built from arrays have no SVG value for roughjs
+      return super.fillPath(args, buffers);
+    }
 
     this.roughCanvas.path(path.get('value'), this.getRoughFillStyle());
   }
@@ -1399,6 +2034,10 @@ export class CanvasView extends DOMWidgetView {
       handleEvent: this.onKeyDown.bind(this)
     }, { passive: false });
 
+    this.el.addEventListener('keyup', {
+      handleEvent: this.onKeyUp.bind(this)
+    }, { passive: false });
+
     this.el.setAttribute('tabindex', '0');
 
     this.updateCanvas();
@@ -1419,27 +2058,147 @@ export class CanvasView extends DOMWidgetView {
   }
 
   private onMouseMove(event: MouseEvent) {
-    this.model.send({ event: 'mouse_move', ...this.getCoordinates(event) }, {});
+    const { x, y } = this.getCoordinates(event);
+    const buttons = event.buttons;
+    const time = getEventTime(event);
+
+    if (this.model.get('max_event_rate') <= 0) {
+      this.model.send({ event: 'mouse_move', x, y, buttons, time }, {});
+      return;
+    }
+
+    if (this.model.get('event_coalescing') !== 'batch') {
+      this.pendingMoves = [];
+      this.pendingMoveButtons = [];
+      this.pendingMoveTimes = [];
+    }
+    this.pendingMoves.push(x, y);
+    this.pendingMoveButtons.push(buttons);
+    this.pendingMoveTimes.push(time);
+    this.scheduleMoves();
+  }
+
+  /**
+   * Send the pending move events once the minimum delay between two messages is elapsed.
+   */
+  private scheduleMoves() {
+    if (this.movesTimeout !== null) {
+      return;
+    }
+
+    const delay = Math.max(
+      0,
+      this.lastMovesTime + 1000 / this.model.get('max_event_rate') - Date.now()
+    );
+    this.movesTimeout = window.setTimeout(this.flushMoves.bind(this), delay);
+  }
+
+  /**
+   * Send the coalesced move events now, this is called before sending any other event so that the
+   * kernel receives the events in order.
+   */
+  private flushMoves() {
+    if (this.movesTimeout !== null) {
+      window.clearTimeout(this.movesTimeout);
+      this.movesTimeout = null;
+    }
+
+    if (this.pendingTouches !== null) {
+      this.sendTouches(
+        'touch_move',
+        this.pendingTouches,
+        this.pendingTouchesTime
+      );
+      this.pendingTouches = null;
+      this.lastMovesTime = Date.now();
+    }
+
+    const moves = this.pendingMoves;
+    if (moves.length === 0) {
+      return;
+    }
+    const buttons = this.pendingMoveButtons;
+    const times = this.pendingMoveTimes;
+    this.pendingMoves = [];
+    this.pendingMoveButtons = [];
+    this.pendingMoveTimes = [];
+    this.lastMovesTime = Date.now();
+
+    const content = {
+      event: 'mouse_move',
+      x: moves[moves.length - 2],
+      y: moves[moves.length - 1],
+      buttons: buttons[buttons.length - 1],
+      time: times[times.length - 1]
+    };
+    if (this.model.get('event_coalescing') === 'batch') {
+      // All the intermediate points as a flat [x0, y0, x1, y1, ...] array, followed by the time and
+      // the buttons of each point
+      this.model.send({ ...content, batch: true }, {}, [
+        new Float64Array(moves),
+        new Float64Array(times),
+        new Int32Array(buttons)
+      ]);
+    } else {
+      this.model.send(content, {});
+    }
   }
 
   private onMouseDown(event: MouseEvent) {
     // Bring focus to the canvas element, so keyboard events can be triggered
     this.el.focus();
 
-    this.model.send({ event: 'mouse_down', ...this.getCoordinates(event) }, {});
+    this.flushMoves();
+    this.model.send(
+      {
+        event: 'mouse_down',
+        ...this.getCoordinates(event),
+        buttons: event.buttons,
+        time: getEventTime(event)
+      },
+      {}
+    );
   }
 
   private onMouseUp(event: MouseEvent) {
-    this.model.send({ event: 'mouse_up', ...this.getCoordinates(event) }, {});
+    this.flushMoves();
+    this.model.send(
+      {
+        event: 'mouse_up',
+        ...this.getCoordinates(event),
+        buttons: event.buttons,
+        time: getEventTime(event)
+      },
+      {}
+    );
   }
 
   private onMouseOut(event: MouseEvent) {
-    this.model.send({ event: 'mouse_out', ...this.getCoordinates(event) }, {});
+    this.flushMoves();
+    this.model.send(
+      {
+        event: 'mouse_out',
+        ...this.getCoordinates(event),
+        buttons: event.buttons,
+        time: getEventTime(event)
+      },
+      {}
+    );
   }
 
   private onMouseWheel(event: WheelEvent) {
+    this.flushMoves();
     this.model.send(
-      { event: 'mouse_wheel', x: event.deltaX, y: event.deltaY },
+      {
+        event: 'mouse_wheel',
+        x: event.deltaX,
+        y: event.deltaY,
+        buttons: event.buttons,
+        shift_key: event.shiftKey,
+        ctrl_key: event.ctrlKey,
+        meta_key: event.metaKey,
+        time: getEventTime(event)
+      },
       {}
     );
     event.preventDefault();
@@ -1448,69 +2207,86 @@ export class CanvasView extends DOMWidgetView {
   private onTouchStart(event: TouchEvent) {
     event.preventDefault(); 
     event.stopImmediatePropagation();
-    const touches: Touch[] = Array.from(event.touches);
-    this.model.send(
-      {
-        event: 'touch_start',
-        touches: touches.map(this.getCoordinates.bind(this))
-      },
-      {}
+    this.flushMoves();
+    this.sendTouches(
+      'touch_start',
+      this.getTouchCoordinates(event),
+      getEventTime(event)
     );
   }
 
   private onTouchEnd(event: TouchEvent) {
     event.preventDefault(); 
     event.stopImmediatePropagation();
-    const touches: Touch[] = Array.from(event.touches);
-    this.model.send(
-      {
-        event: 'touch_end',
-        touches: touches.map(this.getCoordinates.bind(this))
-      },
-      {}
+    this.flushMoves();
+    this.sendTouches(
+      'touch_end',
+      this.getTouchCoordinates(event),
+      getEventTime(event)
     );
   }
 
   private onTouchMove(event: TouchEvent) {
     event.preventDefault(); 
     event.stopImmediatePropagation();
-    const touches: Touch[] = Array.from(event.touches);
-    this.model.send(
-      {
-        event: 'touch_move',
-        touches: touches.map(this.getCoordinates.bind(this))
-      },
-      {}
+
+    if (this.model.get('max_event_rate') > 0) {
+      // Only the latest touches are sent
+      this.pendingTouches = this.getTouchCoordinates(event);
+      this.pendingTouchesTime = getEventTime(event);
+      this.scheduleMoves();
+      return;
+    }
+
+    this.sendTouches(
+      'touch_move',
+      this.getTouchCoordinates(event),
+      getEventTime(event)
     );
   }
 
   private onTouchCancel(event: TouchEvent) {
     event.preventDefault(); 
     event.stopImmediatePropagation();
-    const touches: Touch[] = Array.from(event.touches);
-    this.model.send(
-      {
-        event: 'touch_cancel',
-        touches: touches.map(this.getCoordinates.bind(this))
-      },
-      {}
+    this.flushMoves();
+    this.sendTouches(
+      'touch_cancel',
+      this.getTouchCoordinates(event),
+      getEventTime(event)
     );
   }
 
+  /**
+   * Send touch coordinates as a flat [x0, y0, x1, y1, ...] buffer.
+   */
+  private sendTouches(name: string, touches: Float64Array, time: number) {
+    this.model.send({ event: name, time }, {}, [touches]);
+  }
+
+  private getTouchCoordinates(event: TouchEvent) {
+    const touches = new Float64Array(event.touches.length * 2);
+    for (let i = 0; i < event.touches.length; i++) {
+      const { x, y } = this.getCoordinates(event.touches[i]);
+      touches[2 * i] = x;
+      touches[2 * i + 1] = y;
+    }
+    return touches;
+  }
+
+  private onKeyUp(event: KeyboardEvent) {
+    event.preventDefault();
+    event.stopPropagation();
+
+    this.flushMoves();
+    this.model.send({ event: 'key_up', ...getKeyEventContent(event) }, {});
+  }
+
   private onKeyDown(event: KeyboardEvent) {
     event.preventDefault();
     event.stopPropagation();
 
-    this.model.send(
-      {
-        event: 'key_down',
-        key: event.key,
-        shift_key: event.shiftKey,
-        ctrl_key: event.ctrlKey,
-        meta_key: event.metaKey
-      },
-      {}
-    );
+    this.flushMoves();
+    this.model.send({ event: 'key_down', ...getKeyEventContent(event) }, {});
   }
 
   protected getCoordinates(event: MouseEvent | Touch) {
@@ -1530,6 +2306,15 @@ export class CanvasView extends DOMWidgetView {
   el: HTMLCanvasElement;
   ctx: CanvasRenderingContext2D;
 
+  // Move events waiting to be sent when max_event_rate is set
+  private pendingMoves: number[] = [];
+  private pendingMoveButtons: number[] = [];
+  private pendingMoveTimes: number[] = [];
+  private pendingTouches: Float64Array | null = null;
+  private pendingTouchesTime = 0;
+  private movesTimeout: number | null = null;
+  private lastMovesTime = 0;
+
   model: CanvasModel | MultiCanvasModel;
 }
 
@@ -1546,6 +2331,10 @@ export class MultiCanvasModel extends DOMWidgetModel {
       _canvases: [],
       sync_image_data: false,
       image_data: null,
+      image_data_sync_mode: 'png',
+      image_data_compression: 'none',
+      max_event_rate: 0,
+      event_coalescing: 'latest',
       width: 700,
       height: 500
     };
@@ -1566,12 +2355,17 @@ export class MultiCanvasModel extends DOMWidgetModel {
 
     this.canvas = document.createElement('canvas');
     this.ctx = getContext(this.canvas);
+    this.tileTracker = new ImageTileTracker();
 
     this.resizeCanvas();
 
     this.on_some_change(['width', 'height'], this.resizeCanvas, this);
     this.on('change:_canvases', this.updateCanvasModels.bind(this));
-    this.on('change:sync_image_data', this.syncImageData.bind(this));
+    this.on_some_change(
+      ['sync_image_data', 'image_data_sync_mode'],
+      this.resetImageSync,
+      this
+    );
 
     this.updateCanvasModels();
   }
@@ -1595,6 +2389,7 @@ export class MultiCanvasModel extends DOMWidgetModel {
     for (const canvasModel of this.canvasModels) {
       this.ctx.drawImage(canvasModel.canvas, 0, 0);
     }
+    this.tileTracker.markAllDirty();
 
     this.forEachView((view: MultiCanvasView) => {
       view.updateCanvas();
@@ -1608,11 +2403,24 @@ export class MultiCanvasModel extends DOMWidgetModel {
     this.canvas.setAttribute('height', this.get('height'));
   }
 
+  private resetImageSync() {
+    // Send all the tiles again
+    this.tileTracker.reset();
+    this.syncImageData();
+  }
+
   private async syncImageData() {
     if (!this.get('sync_image_data')) {
       return;
     }
 
+    if (this.get('image_data_sync_mode') === 'tiles') {
+      this.tileTracker.throttle(() =>
+        sendImageTiles(this, this.tileTracker, this.ctx)
+      );
+      return;
+    }
+
     const bytes = await toBytes(this.canvas);
 
     this.set('image_data', bytes);
@@ -1629,6 +2437,7 @@ export class MultiCanvasModel extends DOMWidgetModel {
 
   canvas: HTMLCanvasElement;
   ctx: CanvasRenderingContext2D;
+  tileTracker: ImageTileTracker;
 
   views: Dict<Promise<MultiCanvasView>>;
 
@@ -0,0 +1,13 @@
+import pytest
+
+from ipycanvas import get_canvas_manager
+from ipycanvas.transport import RecordingTransport
+
+
+@pytest.fixture
+def recorder():
+    manager = get_canvas_manager()
+    previous = manager.transport
+    manager.transport = recorder = RecordingTransport()
+    yield recorder
+    manager.transport = previous
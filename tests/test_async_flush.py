@@ -0,0 +1,117 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from ipycanvas import Canvas, get_canvas_manager, hold_canvas
+from ipycanvas.transport import RecordingTransport
+
+
+class SlowTransport(RecordingTransport):
+    """Record the messages after ``delay`` seconds, and the threads sending them."""
+
+    def __init__(self, delay=0.0, fail=False):
+        super().__init__()
+        self.delay = delay
+        self.fail = fail
+        self.threads = []
+
+    def send(self, manager, metadata, buffers):
+        self.threads.append(threading.current_thread())
+        time.sleep(self.delay)
+        if self.fail:
+            self.fail = False
+            raise RuntimeError("link down")
+        super().send(manager, metadata, buffers)
+
+
+def wait_until(predicate, timeout=1):
+    # wait_for_send would send the queued messages itself, leave them to the sender thread
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.005)
+    return predicate()
+
+
+@pytest.fixture
+def manager():
+    manager = get_canvas_manager()
+    previous = manager.transport
+    manager.reset_stats()
+    yield manager
+    manager.wait_for_send()
+    manager.transport = previous
+    manager.max_frames_in_flight = 1
+
+
+def test_async_flush_sends_from_a_background_thread(manager):
+    manager.transport = transport = SlowTransport()
+    canvas = Canvas()
+
+    with hold_canvas(async_flush=True):
+        canvas.fill_rect(0, 0, 1, 1)
+
+    assert wait_until(lambda: transport.commands)
+    assert [command.name for command in transport.commands] == ["fillRect"]
+    assert transport.threads[-1] is not threading.current_thread()
+    assert wait_until(lambda: manager.frames_in_flight == 0)
+
+
+def test_async_flush_copies_the_arrays(manager):
+    manager.transport = transport = SlowTransport(delay=0.05)
+    canvas = Canvas()
+    x = np.zeros(100)
+
+    with hold_canvas(async_flush=True):
+        canvas.fill_circles(x, 0, 1)
+    # Modified while the frame is being sent
+    x[:] = 1
+
+    manager.wait_for_send()
+    assert (transport.commands[-1].arg(0) == 0).all()
+
+
+def test_frames_in_flight_are_bounded(manager):
+    manager.transport = transport = SlowTransport(delay=0.05)
+    manager.max_frames_in_flight = 1
+    canvas = Canvas()
+
+    for i in range(3):
+        with hold_canvas(async_flush=True):
+            canvas.fill_rect(i, 0, 1, 1)
+        assert manager.frames_in_flight <= 1
+
+    manager.wait_for_send()
+    assert [command.args[0] for command in transport.commands] == [0, 1, 2]
+    assert manager.stats["frames_in_flight_waits"] >= 1
+    assert manager.stats["frames_in_flight_wait_time"] > 0
+
+
+def test_wait_for_send_timeout(manager):
+    manager.transport = SlowTransport(delay=0.2)
+    canvas = Canvas()
+
+    with hold_canvas(async_flush=True):
+        canvas.fill_rect(0, 0, 1, 1)
+    # Let the sender take the message
+    time.sleep(0.05)
+
+    assert not manager.wait_for_send(timeout=0.01)
+    assert manager.wait_for_send(timeout=1)
+
+
+def test_sender_survives_transport_errors(manager, capsys):
+    manager.transport = transport = SlowTransport(fail=True)
+    canvas = Canvas()
+
+    with hold_canvas(async_flush=True):
+        canvas.fill_rect(0, 0, 1, 1)
+    with hold_canvas(async_flush=True):
+        canvas.fill_rect(1, 0, 1, 1)
+
+    assert wait_until(lambda: transport.commands)
+
+    assert "link down" in capsys.readouterr().err
+    assert [command.args[0] for command in transport.commands] == [1]
+    assert wait_until(lambda: manager.frames_in_flight == 0)
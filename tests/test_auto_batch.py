@@ -0,0 +1,59 @@
+import asyncio
+import time
+
+import pytest
+
+from ipycanvas import Canvas, get_canvas_manager
+
+
+@pytest.fixture
+def manager(recorder):
+    manager = get_canvas_manager()
+    manager.auto_batch = True
+    manager.max_batch_latency = 0.05
+    yield manager
+    manager.flush()
+    manager.auto_batch = False
+    manager.max_batch_latency = 1 / 60
+    manager.max_batch_bytes = 1 << 20
+
+
+def draw(canvas, n=3):
+    for i in range(n):
+        canvas.fill_rect(i, 0, 1, 1)
+
+
+def test_commands_are_batched(manager, recorder):
+    canvas = Canvas()
+    draw(canvas)
+    assert recorder.frame_count == 0
+
+    manager.flush()
+    assert recorder.frame_count == 1
+    assert [command.name for command in recorder.commands] == ["fillRect"] * 3
+
+
+def test_flush_without_event_loop(manager, recorder):
+    canvas = Canvas()
+    draw(canvas)
+
+    time.sleep(0.2)
+    assert recorder.frame_count == 1
+    assert len(recorder.commands) == 3
+
+
+def test_flush_from_event_loop(manager, recorder):
+    async def draw_and_wait():
+        draw(Canvas())
+        await asyncio.sleep(0.2)
+
+    asyncio.run(draw_and_wait())
+    assert recorder.frame_count == 1
+    assert len(recorder.commands) == 3
+
+
+def test_flush_when_too_large(manager, recorder):
+    manager.max_batch_bytes = 1
+    draw(Canvas())
+
+    assert recorder.frame_count == 3
@@ -0,0 +1,79 @@
+import threading
+import time
+import warnings
+
+import pytest
+
+from ipycanvas import Canvas, get_canvas_manager, hold_canvas
+from ipycanvas.transport import RecordingTransport
+
+
+@pytest.fixture
+def manager():
+    manager = get_canvas_manager()
+    previous = manager.transport
+    manager.transport = RecordingTransport(auto_ack=False)
+    manager.backpressure = "block"
+    manager.frame_ack_timeout = 10
+    yield manager
+    # The frames still in flight would be waited for by the next tests
+    manager.transport.ack()
+    manager.backpressure = "none"
+    manager.frame_ack_timeout = 1
+    manager.transport = previous
+
+
+def draw_frames(canvas, n_frames):
+    for _ in range(n_frames):
+        with hold_canvas():
+            canvas.fill_rect(0, 0, 10, 10)
+
+
+def count_frames(recorder):
+    return sum(command.name == "fillRect" for command in recorder.commands)
+
+
+def test_block_falls_back_to_drop_oldest_on_the_main_thread(manager):
+    canvas = Canvas()
+    manager.reset_stats()
+    draw_frames(canvas, 1)
+
+    start = time.monotonic()
+    with pytest.warns(RuntimeWarning, match="drop_oldest"):
+        draw_frames(canvas, 2)
+    assert time.monotonic() - start < 1
+    assert count_frames(manager.transport) == 1
+
+    # Only the latest frame is sent once the front-end drew the previous one
+    manager.transport.ack()
+    assert count_frames(manager.transport) == 2
+    assert manager.stats["frames_dropped"] == 1
+
+
+def test_block_on_the_main_thread_sends_the_frame_when_there_is_room(manager):
+    canvas = Canvas()
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        draw_frames(canvas, 1)
+
+    assert count_frames(manager.transport) == 1
+
+
+def test_block_waits_in_other_threads(manager):
+    canvas = Canvas()
+    manager.reset_stats()
+
+    thread = threading.Thread(target=draw_frames, args=(canvas, 2))
+    thread.start()
+
+    # The second frame waits until the first one is drawn
+    time.sleep(0.2)
+    assert thread.is_alive()
+    assert count_frames(manager.transport) == 1
+
+    manager.transport.ack()
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+    assert count_frames(manager.transport) == 2
+    assert manager.stats["frames_in_flight_waits"] == 1
@@ -0,0 +1,98 @@
+import array
+import threading
+
+import numpy as np
+import pytest
+
+from ipycanvas import Canvas
+from ipycanvas.utils import _BufferConverter, populate_args
+
+
+def populated(arg):
+    args = []
+    buffers = []
+    populate_args(arg, args, buffers)
+    return args, buffers
+
+
+@pytest.mark.parametrize(
+    "arg",
+    [
+        memoryview(np.arange(4, dtype=np.float32)),
+        np.arange(4, dtype=np.float32).tobytes(),
+        array.array("f", range(4)),
+    ],
+)
+def test_buffer_protocol_arguments(arg):
+    args, buffers = populated(arg)
+
+    assert args[0]["idx"] == 0
+    assert len(buffers) == 1
+
+
+def test_bytes_argument_is_uint8():
+    args, buffers = populated(b"\x01\x02\x03")
+
+    assert args == [{"shape": (3,), "dtype": "uint8", "idx": 0}]
+    assert bytes(buffers[0]) == b"\x01\x02\x03"
+
+
+def test_numpy_scalars_are_numbers():
+    assert populated(np.float64(1.5)) == ([1.5], [])
+
+
+@pytest.mark.parametrize(
+    "dtype, sent",
+    [
+        (np.bool_, "uint8"),
+        (np.int64, "int32"),
+        (np.uint64, "uint32"),
+        (np.float16, "float32"),
+        (">f8", "float64"),
+        (np.float32, "float32"),
+    ],
+)
+def test_unsupported_dtypes_are_converted(dtype, sent):
+    args, buffers = populated(np.ones(3, dtype=dtype))
+
+    assert args[0]["dtype"] == sent
+    np.testing.assert_array_equal(np.frombuffer(buffers[0], dtype=sent), [1, 1, 1])
+
+
+@pytest.mark.parametrize("values", [np.array(["a", "b"]), np.ones(2, dtype=complex)])
+def test_unsupported_dtypes_raise(values):
+    with pytest.raises(TypeError, match="cannot be sent"):
+        populated(values)
+
+
+def test_canvas_method_with_memoryview(recorder):
+    canvas = Canvas()
+    canvas.fill_rects(memoryview(np.arange(3, dtype=np.float64)), 0, 10)
+
+    assert recorder.commands[-1].name == "fillRects"
+    np.testing.assert_array_equal(recorder.commands[-1].arg(0), [0, 1, 2])
+
+
+def test_scratch_arrays_are_per_thread():
+    converter = _BufferConverter()
+    ar = np.arange(10, dtype=np.int64)
+    converted = threading.Event()
+    done = threading.Event()
+    scratch = []
+
+    def convert():
+        # The view is released right away, the scratch array is free in the pool of the thread
+        scratch.append(id(converter.convert(ar)[1].obj.base))
+        converted.set()
+        done.wait()
+
+    thread = threading.Thread(target=convert)
+    thread.start()
+    converted.wait()
+    try:
+        _, view = converter.convert(ar)
+    finally:
+        done.set()
+        thread.join()
+
+    assert id(view.obj.base) != scratch[0]
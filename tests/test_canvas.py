@@ -0,0 +1,130 @@
+import numpy as np
+
+from ipycanvas import Canvas
+
+
+def put_image_commands(recorder):
+    return [command for command in recorder.commands if command.name == "putImageData"]
+
+
+def test_delta_image_data_sends_changed_regions(recorder):
+    canvas = Canvas(width=100, height=100, delta_image_data=True)
+    image = np.zeros((100, 100, 3), dtype=np.uint8)
+    canvas.put_image_data(image, codec="raw")
+
+    image[10:20, 10:20] = 255
+    recorder.clear()
+    canvas.put_image_data(image, codec="raw")
+
+    assert [command.args[:2] for command in put_image_commands(recorder)] == [[10, 10]]
+
+
+def test_delta_image_data_with_global_alpha(recorder):
+    canvas = Canvas(width=100, height=100, delta_image_data=True)
+    # The whole image is blended with the previous pixels, not only the changed region
+    canvas.global_alpha = 0.5
+    image = np.zeros((100, 100, 3), dtype=np.uint8)
+    canvas.put_image_data(image, codec="raw")
+
+    image[10:20, 10:20] = 255
+    recorder.clear()
+    canvas.put_image_data(image, codec="raw")
+
+    assert [command.args[:2] for command in put_image_commands(recorder)] == [[0, 0]]
+
+
+def test_delta_image_data_with_composite_operation(recorder):
+    canvas = Canvas(width=100, height=100, delta_image_data=True)
+    canvas.global_composite_operation = "lighter"
+    image = np.zeros((100, 100, 3), dtype=np.uint8)
+    canvas.put_image_data(image, codec="raw")
+
+    image[10:20, 10:20] = 255
+    recorder.clear()
+    canvas.put_image_data(image, codec="raw")
+
+    assert [command.args[:2] for command in put_image_commands(recorder)] == [[0, 0]]
+
+
+def test_delta_image_data_unchanged_image(recorder):
+    canvas = Canvas(width=100, height=100, delta_image_data=True)
+    image = np.zeros((100, 100, 3), dtype=np.uint8)
+    canvas.put_image_data(image, codec="raw")
+
+    recorder.clear()
+    canvas.put_image_data(image, codec="raw")
+
+    assert put_image_commands(recorder) == []
+
+
+def test_delta_image_data_large_change_sends_the_whole_image(recorder):
+    canvas = Canvas(width=100, height=100, delta_image_data=True)
+    image = np.zeros((100, 100, 3), dtype=np.uint8)
+    canvas.put_image_data(image, codec="raw")
+
+    image[:80] = 255
+    recorder.clear()
+    canvas.put_image_data(image, codec="raw")
+
+    commands = put_image_commands(recorder)
+    assert [command.args[:2] for command in commands] == [[0, 0]]
+    assert commands[0].arg(2).shape == (100, 100, 4)
+
+
+def test_delta_image_data_transparent_image(recorder):
+    canvas = Canvas(width=100, height=100, delta_image_data=True)
+    image = np.zeros((100, 100, 4), dtype=np.uint8)
+    canvas.put_image_data(image, codec="raw")
+
+    # The new pixels would be blended with the previous ones
+    recorder.clear()
+    canvas.put_image_data(image, codec="raw")
+
+    assert [command.args[:2] for command in put_image_commands(recorder)] == [[0, 0]]
+
+
+def test_delta_image_data_after_drawing_over_the_image(recorder):
+    canvas = Canvas(width=100, height=100, delta_image_data=True)
+    image = np.zeros((100, 100, 3), dtype=np.uint8)
+    canvas.put_image_data(image, codec="raw")
+    canvas.fill_rect(0, 0, 10, 10)
+
+    recorder.clear()
+    canvas.put_image_data(image, codec="raw")
+
+    assert [command.args[:2] for command in put_image_commands(recorder)] == [[0, 0]]
+
+
+def test_delta_image_data_after_resize(recorder):
+    canvas = Canvas(width=100, height=100, delta_image_data=True)
+    image = np.zeros((50, 50, 3), dtype=np.uint8)
+    canvas.put_image_data(image, codec="raw")
+    canvas.width = 120
+
+    recorder.clear()
+    canvas.put_image_data(image, codec="raw")
+
+    assert [command.args[:2] for command in put_image_commands(recorder)] == [[0, 0]]
+
+
+def send_tile(canvas, x, y, value):
+    tile = np.full((2, 2, 4), value, dtype=np.uint8)
+    canvas._handle_image_tiles(
+        None,
+        {"event": "image_tiles", "width": 4, "height": 4, "tiles": [[x, y, 2, 2]]},
+        [tile.tobytes()],
+    )
+
+
+def test_image_tiles_snapshot_is_not_modified(recorder):
+    canvas = Canvas(width=4, height=4, image_data_sync_mode="tiles")
+    send_tile(canvas, 0, 0, 255)
+
+    image = canvas.get_image_data()
+    assert not image.flags.writeable
+
+    send_tile(canvas, 2, 2, 128)
+
+    assert (image[2:, 2:] == 0).all()
+    assert (canvas.get_image_data()[2:, 2:] == 128).all()
+    assert (canvas.get_image_data()[:2, :2] == 255).all()
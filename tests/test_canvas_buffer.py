@@ -0,0 +1,102 @@
+import gc
+
+import numpy as np
+import pytest
+
+from ipycanvas import Canvas, CanvasBuffer, get_canvas_manager
+
+
+def test_first_sync_sends_the_whole_buffer():
+    buffer = CanvasBuffer(np.arange(10, dtype=np.float64))
+
+    name, args, buffers = buffer._sync_command()
+    assert name == "setCanvasBuffer"
+    assert args[0] == buffer.id
+    assert np.frombuffer(buffers[0], dtype=np.float64).tolist() == list(range(10))
+
+    # Up to date
+    assert buffer._sync_command() is None
+
+
+def test_contiguous_rows_are_sent_from_the_first_one():
+    buffer = CanvasBuffer(np.zeros((10, 2)))
+    buffer._sync_command()
+
+    buffer[3:5] = [[1, 2], [3, 4]]
+
+    name, args, buffers = buffer._sync_command()
+    assert name == "updateCanvasBuffer"
+    # Row size and first row
+    assert args[1:3] == [2, 3]
+    assert buffers[0].tolist() == [[1, 2], [3, 4]]
+
+
+def test_scattered_rows_are_sent_with_their_indices():
+    buffer = CanvasBuffer(np.zeros(10))
+    buffer._sync_command()
+
+    buffer[[1, 7]] = 5
+
+    name, args, buffers = buffer._sync_command()
+    assert name == "updateCanvasBuffer"
+    assert buffers[0].tolist() == [1, 7]
+    assert buffers[1].tolist() == [5, 5]
+
+
+def test_most_rows_changed_sends_the_whole_buffer():
+    buffer = CanvasBuffer(np.zeros(10))
+    buffer._sync_command()
+
+    buffer[:6] = 1
+
+    assert buffer._sync_command()[0] == "setCanvasBuffer"
+
+
+def test_array_is_read_only():
+    buffer = CanvasBuffer([1.0, 2.0])
+
+    with pytest.raises(ValueError):
+        buffer.array[0] = 3
+    with pytest.raises(ValueError):
+        CanvasBuffer(1.0)
+
+
+def test_updates_are_applied_in_the_front_end(recorder):
+    canvas = Canvas()
+    buffer = CanvasBuffer(np.zeros(100))
+    canvas.fill_circles(buffer, 0, 1)
+
+    get_canvas_manager().reset_stats()
+    buffer[10] = 42
+    canvas.fill_circles(buffer, 0, 1)
+
+    # Only the changed row is sent
+    assert get_canvas_manager().stats["canvas_buffer_bytes"] == 8
+    assert recorder.commands[-1].arg(0)[10] == 42
+    assert recorder.commands[-1].arg(0).sum() == 42
+
+
+def test_update_replaces_the_content(recorder):
+    canvas = Canvas()
+    buffer = CanvasBuffer(np.zeros((3, 2)))
+    canvas.fill_circles(buffer, 0, 1)
+
+    buffer.update(np.ones((3, 2)))
+    canvas.fill_circles(buffer, 0, 1)
+
+    assert recorder.commands[-1].arg(0).tolist() == [[1, 1]] * 3
+
+
+def test_released_buffers_are_deleted_in_the_front_end(recorder):
+    canvas = Canvas()
+    buffer = CanvasBuffer(np.zeros(100))
+    buffer_id = buffer.id
+    canvas.fill_circles(buffer, 0, 1)
+    assert buffer_id in recorder._canvas_buffers
+
+    del buffer
+    gc.collect()
+    canvas.fill_rect(0, 0, 10, 10)
+
+    assert buffer_id not in recorder._canvas_buffers
+    assert buffer_id not in CanvasBuffer._live
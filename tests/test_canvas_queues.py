@@ -0,0 +1,120 @@
+import numpy as np
+
+from ipycanvas import (
+    Canvas,
+    CanvasBuffer,
+    MultiCanvas,
+    SpriteAtlas,
+    get_canvas_manager,
+    hold_canvas,
+)
+
+
+def switch_count(recorder):
+    # The recorder consumes the switchCanvas commands, the manager counts them
+    return get_canvas_manager().stats["commands"] - len(recorder.commands)
+
+
+def drawn(recorder):
+    return [
+        (command.canvas, command.name, command.args[:1])
+        for command in recorder.commands
+    ]
+
+
+def test_layers_drawn_in_turns_are_grouped(recorder):
+    multi = MultiCanvas(3, width=100, height=100)
+    get_canvas_manager().reset_stats()
+
+    with hold_canvas():
+        for i in range(10):
+            for layer in multi:
+                layer.fill_rect(i, i, 1, 1)
+
+    # One switch per layer instead of one per command
+    assert switch_count(recorder) <= 3
+    for layer in multi:
+        assert [args for canvas, _, args in drawn(recorder) if canvas is layer] == [
+            [i] for i in range(10)
+        ]
+
+
+def test_order_is_kept_within_a_canvas(recorder):
+    first = Canvas(width=10, height=10)
+    second = Canvas(width=10, height=10)
+
+    with hold_canvas():
+        first.fill_style = "red"
+        second.fill_rect(0, 0, 1, 1)
+        first.fill_rect(1, 1, 1, 1)
+        second.clear()
+        first.stroke_rect(2, 2, 1, 1)
+
+    assert [name for canvas, name, _ in drawn(recorder) if canvas is first] == [
+        "set",
+        "fillRect",
+        "strokeRect",
+    ]
+    assert [name for canvas, name, _ in drawn(recorder) if canvas is second] == [
+        "fillRect",
+        "clear",
+    ]
+
+
+def test_draw_image_of_another_canvas_is_a_barrier(recorder):
+    source = Canvas(width=10, height=10)
+    target = Canvas(width=10, height=10)
+
+    with hold_canvas():
+        source.fill_rect(0, 0, 10, 10)
+        target.draw_image(source)
+        source.clear()
+
+    names = [(canvas, name) for canvas, name, _ in drawn(recorder)]
+    # The source is drawn before being copied, and cleared after
+    assert names == [
+        (source, "fillRect"),
+        (target, "drawImage"),
+        (source, "clear"),
+    ]
+
+
+def test_sprite_atlas_of_another_canvas_is_a_barrier(recorder):
+    sheet = Canvas(width=10, height=10)
+    atlas = SpriteAtlas(sheet, [0, 0, 10, 10])
+    target = Canvas(width=10, height=10)
+
+    with hold_canvas():
+        sheet.fill_rect(0, 0, 10, 10)
+        target.draw_images(atlas, [0], [5], [5])
+        sheet.clear()
+
+    assert [name for _, name, _ in drawn(recorder)] == [
+        "fillRect",
+        "drawImages",
+        "clear",
+    ]
+
+
+def test_canvas_buffer_updates_are_barriers(recorder):
+    first = Canvas(width=10, height=10)
+    second = Canvas(width=10, height=10)
+    buffer = CanvasBuffer(np.zeros(3))
+
+    with hold_canvas():
+        second.fill_circles(buffer, 0, 1)
+        first.fill_circles(buffer, 0, 1)
+        buffer[0] = 5
+        second.fill_circles(buffer, 0, 1)
+
+    circles = [
+        (command.canvas, command.arg(0).tolist())
+        for command in recorder.commands
+        if command.name == "fillCircles"
+    ]
+    # The first canvas draws the buffer as it was before the update
+    assert circles == [
+        (second, [0, 0, 0]),
+        (first, [0, 0, 0]),
+        (second, [5, 0, 0]),
+    ]
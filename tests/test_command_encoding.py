@@ -0,0 +1,47 @@
+import pytest
+
+from ipycanvas.canvas import COMMANDS, _CMD_LIST, _CanvasManager
+from ipycanvas.utils import binary_to_commands, commands_to_binary
+
+
+def round_trip(commands):
+    return binary_to_commands(commands_to_binary(commands))
+
+
+@pytest.mark.parametrize("x", [1, 0.1])
+def test_binary_round_trip_of_every_opcode(x):
+    # 0.1 is not a float32 value, the operands are then sent in double precision
+    commands = [[opcode, [x, 2.5, True], 0] for opcode in range(len(_CMD_LIST))]
+
+    assert round_trip(commands) == commands
+
+
+def test_binary_round_trip_with_side_table():
+    commands = [
+        [COMMANDS["set"], [3, "red"], 0],
+        [COMMANDS["lineTo"], [1, 2], 0],
+        [COMMANDS["fillRects"], [{"shape": [2], "dtype": "float32", "idx": 0}, 1], 1],
+        [COMMANDS["beginPath"], [], 0],
+        [COMMANDS["fillText"], ["text", 10, 20, None], 0],
+        [COMMANDS["setLineDash"], [[4, 2]], 0],
+        # More arguments than the command word can count
+        [COMMANDS["drawImages"], list(range(200)), 3],
+        [COMMANDS["moveTo"], [5, 6], 0],
+    ]
+
+    assert round_trip(commands) == commands
+
+
+def test_binary_round_trip_of_a_single_command():
+    assert round_trip([COMMANDS["fillRect"], [0, 0, 10, 10], 0]) == [
+        [COMMANDS["fillRect"], [0, 0, 10, 10], 0]
+    ]
+
+
+def test_binary_only_used_for_path_segments():
+    segments = [[COMMANDS["lineTo"], [i, i], 0] for i in range(100)]
+    rects = [[COMMANDS["fillRect"], [i, i, 10, 10], 0] for i in range(100)]
+
+    assert _CanvasManager._binary_pays_off(segments)
+    assert not _CanvasManager._binary_pays_off(rects)
+    assert not _CanvasManager._binary_pays_off(segments[0])
@@ -0,0 +1,97 @@
+import threading
+
+import pytest
+
+from ipycanvas import Canvas, get_canvas_manager, hold_canvas
+
+
+def sent_sets(recorder):
+    return [command.args[1] for command in recorder.commands if command.name == "set"]
+
+
+@pytest.fixture
+def canvas(recorder):
+    canvas = Canvas(width=10, height=10)
+    canvas.fill_style = "red"
+    get_canvas_manager().reset_stats()
+    recorder.clear()
+    return canvas
+
+
+def test_same_value_is_elided(canvas, recorder):
+    canvas.fill_style = "red"
+    canvas.fill_style = "blue"
+
+    assert sent_sets(recorder) == ["blue"]
+    assert get_canvas_manager().stats["elided_sets"] == 1
+
+
+def test_equal_values_of_another_type_are_sent(canvas, recorder):
+    canvas.line_width = 1
+    canvas.line_width = 1.0
+
+    assert sent_sets(recorder) == [1, 1.0]
+
+
+def test_save_restore(canvas, recorder):
+    canvas.save()
+    canvas.fill_style = "blue"
+    canvas.fill_style = "blue"
+    canvas.restore()
+    # The front-end is back to the saved state
+    canvas.fill_style = "red"
+    canvas.fill_style = "blue"
+
+    assert sent_sets(recorder) == ["blue", "blue"]
+
+
+def test_clear_keeps_the_drawing_state(canvas, recorder):
+    canvas.clear()
+    canvas.fill_style = "red"
+
+    assert sent_sets(recorder) == []
+
+
+def test_resize_resets_the_drawing_state(canvas, recorder):
+    canvas.width = 20
+    canvas.fill_style = "red"
+
+    assert sent_sets(recorder) == ["red"]
+
+
+def test_client_replay_resets_the_drawing_state(canvas, recorder):
+    canvas._handle_frontend_event(None, {"event": "client_ready"}, [])
+    canvas.fill_style = "red"
+
+    assert sent_sets(recorder) == ["red"]
+
+
+def test_discarded_frame_resets_the_drawing_state(canvas, recorder):
+    with pytest.raises(ValueError):
+        with hold_canvas(on_error="discard"):
+            canvas.fill_style = "blue"
+            raise ValueError()
+    canvas.fill_style = "red"
+
+    assert sent_sets(recorder) == ["red"]
+
+
+def test_sets_from_several_threads(canvas, recorder):
+    def set_styles(color):
+        for _ in range(200):
+            canvas.fill_style = color
+
+    threads = [
+        threading.Thread(target=set_styles, args=(color,))
+        for color in ("red", "blue", "green")
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    get_canvas_manager().flush()
+
+    # The last value sent is the one the canvas believes the front-end has
+    canvas.fill_style = sent_sets(recorder)[-1]
+    stats = get_canvas_manager().stats
+    assert len(sent_sets(recorder)) + stats["elided_sets"] == 601
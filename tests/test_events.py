@@ -0,0 +1,271 @@
+import time
+
+import numpy as np
+import pytest
+from traitlets import TraitError
+
+from ipycanvas import Canvas, MultiCanvas
+from ipycanvas.events import EVENT_TYPES
+
+
+@pytest.fixture
+def canvas(recorder):
+    return Canvas(width=100, height=100)
+
+
+def send(canvas, content, buffers=[]):
+    canvas._handle_frontend_event(None, content, buffers)
+
+
+def test_drain_returns_the_events_in_order(canvas):
+    queue = canvas.events()
+    send(canvas, {"event": "mouse_down", "x": 1, "y": 2, "buttons": 1, "time": 1000})
+    send(canvas, {"event": "mouse_up", "x": 3, "y": 4, "buttons": 0, "time": 2500})
+
+    batch = queue.drain()
+
+    assert len(batch) == 2
+    assert [EVENT_TYPES[code] for code in batch.type] == ["mouse_down", "mouse_up"]
+    assert batch.x.tolist() == [1, 3]
+    assert batch.y.tolist() == [2, 4]
+    assert batch.buttons.tolist() == [1, 0]
+    assert batch.timestamp.tolist() == [1.0, 2.5]
+    # The queue is empty afterwards
+    assert len(queue) == 0
+    assert len(queue.drain()) == 0
+
+
+def test_receive_time_without_event_time(canvas):
+    queue = canvas.events()
+    before = time.time()
+    send(canvas, {"event": "mouse_down", "x": 1, "y": 2, "buttons": 1})
+
+    assert before <= queue.drain().timestamp[0] <= time.time()
+
+
+def test_batched_moves_have_one_row_per_point(canvas):
+    queue = canvas.events()
+    points = np.array([[1, 2], [3, 4], [5, 6]], dtype=np.float64)
+    times = np.array([1000, 1010, 1020], dtype=np.float64)
+    buttons = np.array([0, 1, 1], dtype=np.int32)
+    send(
+        canvas,
+        {"event": "mouse_move", "x": 5, "y": 6, "buttons": 1, "batch": True},
+        [points.tobytes(), times.tobytes(), buttons.tobytes()],
+    )
+
+    batch = queue.drain()
+
+    assert batch.x.tolist() == [1, 3, 5]
+    assert batch.y.tolist() == [2, 4, 6]
+    assert batch.buttons.tolist() == [0, 1, 1]
+    assert batch.timestamp.tolist() == [1.0, 1.01, 1.02]
+
+
+def test_multi_touch_has_one_row_per_finger(canvas):
+    queue = canvas.events()
+    touches = np.array([[1, 2], [3, 4]], dtype=np.float64)
+    send(canvas, {"event": "touch_start", "time": 1000}, [touches.tobytes()])
+    send(canvas, {"event": "touch_end", "time": 2000}, [b""])
+
+    batch = queue.drain()
+
+    assert [EVENT_TYPES[code] for code in batch.type] == [
+        "touch_start",
+        "touch_start",
+        "touch_end",
+    ]
+    assert batch.buttons.tolist() == [0, 1, -1]
+    assert batch.x[:2].tolist() == [1, 3]
+    assert np.isnan(batch.x[2])
+
+
+def test_key_events(canvas):
+    queue = canvas.events()
+    send(
+        canvas,
+        {
+            "event": "key_down",
+            "key": "a",
+            "shift_key": True,
+            "ctrl_key": False,
+            "meta_key": True,
+            "time": 1000,
+        },
+    )
+
+    batch = queue.drain()
+
+    assert batch.key.tolist() == ["a"]
+    assert batch.buttons.tolist() == [5]
+    assert np.isnan(batch.x[0])
+
+
+def test_oldest_events_are_dropped(canvas):
+    queue = canvas.events(maxlen=4)
+    points = np.arange(10, dtype=np.float64).reshape((5, 2))
+    send(canvas, {"event": "mouse_down", "x": 0, "y": 0, "buttons": 1, "time": 0})
+    send(
+        canvas,
+        {"event": "mouse_move", "x": 8, "y": 9, "buttons": 1, "batch": True},
+        [
+            points.tobytes(),
+            np.arange(5, dtype=np.float64).tobytes(),
+            np.ones(5, dtype=np.int32).tobytes(),
+        ],
+    )
+
+    batch = queue.drain()
+
+    assert batch.x.tolist() == [2, 4, 6, 8]
+    assert batch.timestamp.tolist() == [0.001, 0.002, 0.003, 0.004]
+    assert queue.dropped == 2
+
+
+def test_select(canvas):
+    queue = canvas.events()
+    send(canvas, {"event": "mouse_down", "x": 1, "y": 2, "buttons": 1, "time": 0})
+    send(canvas, {"event": "mouse_up", "x": 3, "y": 4, "buttons": 0, "time": 0})
+
+    assert queue.drain().select("mouse_up").x.tolist() == [3]
+
+
+def test_closed_queue_does_not_receive_events(canvas):
+    queue = canvas.events()
+    queue.close()
+    send(canvas, {"event": "mouse_down", "x": 1, "y": 2, "buttons": 1})
+
+    assert len(queue) == 0
+
+
+def test_coalesced_moves_call_the_move_callbacks(canvas):
+    moves = []
+    batches = []
+    canvas.on_mouse_move(lambda x, y: moves.append((x, y)))
+    canvas.on_mouse_move_batch(batches.append)
+
+    points = np.array([[1, 2], [3, 4]], dtype=np.float64)
+    send(
+        canvas,
+        {"event": "mouse_move", "x": 3, "y": 4, "buttons": 0, "batch": True},
+        [points.tobytes()],
+    )
+    send(canvas, {"event": "mouse_move", "x": 5, "y": 6, "buttons": 0})
+
+    # The move callbacks get the latest position, the batch callbacks all of them
+    assert moves == [(3, 4), (5, 6)]
+    assert len(batches) == 1
+    np.testing.assert_array_equal(batches[0], points)
+
+
+def test_batch_without_times_has_the_latest_buttons(canvas):
+    queue = canvas.events()
+    points = np.array([[1, 2], [3, 4]], dtype=np.float64)
+    send(
+        canvas,
+        {"event": "mouse_move", "x": 3, "y": 4, "buttons": 1, "batch": True},
+        [points.tobytes()],
+    )
+
+    assert queue.drain().buttons.tolist() == [1, 1]
+
+
+def test_coalescing_options_are_validated(recorder):
+    canvas = Canvas(max_event_rate=60, event_coalescing="batch")
+    assert canvas.max_event_rate == 60
+
+    with pytest.raises(TraitError):
+        canvas.event_coalescing = "all"
+
+
+def test_multi_canvas_coalesced_moves(recorder):
+    canvas = MultiCanvas(2, width=10, height=10)
+    batches = []
+    canvas.on_mouse_move_batch(batches.append)
+
+    points = np.array([[1, 2]], dtype=np.float64)
+    canvas[-1]._handle_frontend_event(
+        None,
+        {"event": "mouse_move", "x": 1, "y": 2, "buttons": 0, "batch": True},
+        [points.tobytes()],
+    )
+
+    assert len(batches) == 1
+
+
+@pytest.mark.parametrize(
+    "event", ["mouse_down", "mouse_up", "mouse_out", "mouse_wheel"]
+)
+def test_position_events_are_dispatched(canvas, event):
+    calls = []
+    getattr(canvas, "on_" + event)(lambda x, y: calls.append((x, y)))
+
+    send(canvas, {"event": event, "x": 1, "y": 2, "buttons": 0})
+    send(canvas, {"event": "mouse_move", "x": 3, "y": 4, "buttons": 0})
+
+    assert calls == [(1, 2)]
+
+
+@pytest.mark.parametrize(
+    "event", ["touch_start", "touch_end", "touch_move", "touch_cancel"]
+)
+def test_touch_events_are_dispatched(canvas, event):
+    calls = []
+    getattr(canvas, "on_" + event)(calls.append)
+
+    touches = np.array([[1, 2], [3, 4]], dtype=np.float64)
+    send(canvas, {"event": event}, [touches.tobytes()])
+
+    assert len(calls) == 1
+    np.testing.assert_array_equal(calls[0], touches)
+
+
+def test_key_events_are_dispatched(canvas):
+    calls = []
+    canvas.on_key_down(lambda *args: calls.append(("down",) + args))
+    canvas.on_key_up(lambda *args: calls.append(("up",) + args))
+
+    content = {"key": "a", "shift_key": True, "ctrl_key": False, "meta_key": False}
+    send(canvas, {"event": "key_down", **content})
+    send(canvas, {"event": "key_up", **content})
+
+    assert calls == [("down", "a", True, False, False), ("up", "a", True, False, False)]
+
+
+def test_removed_callbacks_are_not_called(canvas):
+    calls = []
+
+    def callback(x, y):
+        calls.append((x, y))
+
+    canvas.on_mouse_down(callback)
+    canvas.on_mouse_down(callback, remove=True)
+
+    send(canvas, {"event": "mouse_down", "x": 1, "y": 2, "buttons": 0})
+
+    assert calls == []
+
+
+def test_on_event_gets_the_whole_message(canvas):
+    calls = []
+    canvas.on_event("mouse_wheel", lambda content, buffers: calls.append(content))
+    canvas.on_event("custom", lambda content, buffers: calls.append(content))
+    positions = []
+    canvas.on_mouse_wheel(lambda x, y: positions.append((x, y)))
+
+    wheel = {"event": "mouse_wheel", "x": 0, "y": 5, "buttons": 0, "shift_key": True}
+    send(canvas, wheel)
+    send(canvas, {"event": "custom", "value": 1})
+
+    # The built-in callbacks are still called
+    assert positions == [(0, 5)]
+    assert calls == [wheel, {"event": "custom", "value": 1}]
+
+
+def test_unknown_events_are_ignored(canvas):
+    queue = canvas.events()
+
+    send(canvas, {"event": "unknown"})
+    send(canvas, {})
+
+    assert len(queue) == 0
@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+
+from ipycanvas import Canvas, CanvasBuffer, hold_canvas
+
+
+def names(recorder):
+    return [command.name for command in recorder.commands]
+
+
+def test_nested_blocks_are_sent_with_the_outermost_one(recorder):
+    canvas = Canvas()
+
+    with hold_canvas():
+        canvas.fill_rect(0, 0, 1, 1)
+        with hold_canvas():
+            canvas.stroke_rect(0, 0, 1, 1)
+        assert recorder.frame_count == 0
+        canvas.clear()
+
+    assert recorder.frame_count == 1
+    assert names(recorder) == ["fillRect", "strokeRect", "clear"]
+
+
+def test_error_flushes_the_commands_by_default(recorder):
+    canvas = Canvas()
+
+    with pytest.raises(ZeroDivisionError):
+        with hold_canvas():
+            canvas.fill_rect(0, 0, 1, 1)
+            1 / 0
+
+    assert names(recorder) == ["fillRect"]
+
+
+def test_error_discards_the_commands(recorder):
+    canvas = Canvas()
+
+    with pytest.raises(ZeroDivisionError):
+        with hold_canvas(on_error="discard"):
+            canvas.fill_rect(0, 0, 1, 1)
+            1 / 0
+
+    assert names(recorder) == []
+
+    # The next frames are sent as usual
+    with hold_canvas():
+        canvas.stroke_rect(0, 0, 1, 1)
+    assert names(recorder) == ["strokeRect"]
+
+
+def test_error_discards_the_nested_block_only(recorder):
+    canvas = Canvas()
+    other = Canvas()
+
+    with hold_canvas():
+        canvas.fill_rect(0, 0, 1, 1)
+        try:
+            with hold_canvas(on_error="discard"):
+                other.fill_rect(1, 1, 1, 1)
+                canvas.stroke_rect(1, 1, 1, 1)
+                raise KeyError()
+        except KeyError:
+            pass
+        other.clear()
+
+    assert [(command.canvas, command.name) for command in recorder.commands] == [
+        (canvas, "fillRect"),
+        (other, "clear"),
+    ]
+
+
+def test_discarded_block_keeps_the_canvas_buffer_updates(recorder):
+    canvas = Canvas()
+    buffer = CanvasBuffer(np.zeros(3))
+    canvas.fill_circles(buffer, 0, 1)
+
+    with pytest.raises(KeyError):
+        with hold_canvas(on_error="discard"):
+            buffer[0] = 5
+            canvas.fill_circles(buffer, 0, 1)
+            raise KeyError()
+
+    # The front-end has the update of the discarded block
+    canvas.fill_circles(buffer, 0, 1)
+    assert recorder.commands[-1].arg(0).tolist() == [5, 0, 0]
+    assert names(recorder) == ["fillCircles", "fillCircles"]
+
+
+def test_invalid_on_error(recorder):
+    with pytest.raises(ValueError):
+        with hold_canvas(on_error="ignore"):
+            pass
+
+
+def test_canvas_argument_is_deprecated(recorder):
+    canvas = Canvas()
+
+    with pytest.warns(DeprecationWarning):
+        with hold_canvas(canvas):
+            canvas.fill_rect(0, 0, 1, 1)
+
+    assert names(recorder) == ["fillRect"]
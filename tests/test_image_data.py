@@ -0,0 +1,132 @@
+from io import BytesIO
+
+import numpy as np
+import pytest
+from PIL import Image as PILImage
+
+from ipycanvas import Canvas
+from ipycanvas.utils import binary_image
+
+
+def png(value):
+    return binary_image(np.full((4, 6, 4), value, dtype=np.uint8), codec="png")
+
+
+@pytest.fixture
+def canvas(recorder):
+    canvas = Canvas(width=6, height=4)
+    canvas.set_trait("image_data", png(10))
+    return canvas
+
+
+def test_decoded_image_is_cached(canvas):
+    image = canvas.get_image_data()
+
+    assert image.shape == (4, 6, 4)
+    assert (image == 10).all()
+    # The next calls return views on the same decoded image
+    assert canvas.get_image_data().base is image.base
+    assert canvas.get_image_data(1, 1, 2, 2).base is image.base
+
+
+def test_decoded_image_is_read_only(canvas):
+    image = canvas.get_image_data()
+
+    assert not image.flags.writeable
+    with pytest.raises(ValueError):
+        image[0, 0] = 0
+
+
+def test_cache_is_invalidated_when_the_image_changes(canvas):
+    image = canvas.get_image_data()
+    canvas.set_trait("image_data", png(20))
+
+    assert (canvas.get_image_data() == 20).all()
+    assert (image == 10).all()
+
+
+def test_to_file_writes_the_png(canvas, tmp_path):
+    canvas.to_file(str(tmp_path / "image.png"))
+
+    assert (tmp_path / "image.png").read_bytes() == canvas.image_data
+
+
+def test_no_image_data(recorder):
+    with pytest.raises(RuntimeError):
+        Canvas(width=6, height=4).get_image_data()
+
+
+def put_image(recorder, canvas, image, **kwargs):
+    recorder.clear()
+    canvas.put_image_data(image, 1, 2, **kwargs)
+    command = recorder.commands[-1]
+    assert command.name == "putImageData"
+    assert command.args[:2] == [1, 2]
+    return command
+
+
+def decode(command):
+    return np.array(PILImage.open(BytesIO(command.buffers[0])))
+
+
+def test_raw_codec_sends_rgba_pixels(recorder):
+    canvas = Canvas(width=10, height=10)
+    image = np.arange(4 * 5 * 3, dtype=np.uint8).reshape((4, 5, 3))
+
+    command = put_image(recorder, canvas, image, codec="raw")
+
+    pixels = command.arg(2)
+    assert pixels.dtype == np.uint8
+    assert pixels.shape == (4, 5, 4)
+    np.testing.assert_array_equal(pixels[..., :3], image)
+    assert (pixels[..., 3] == 255).all()
+
+
+def test_raw_codec_grayscale(recorder):
+    canvas = Canvas(width=10, height=10)
+    image = np.full((2, 3), 7, dtype=np.uint8)
+
+    pixels = put_image(recorder, canvas, image, codec="raw").arg(2)
+
+    assert pixels.shape == (2, 3, 4)
+    assert (pixels[..., :3] == 7).all()
+
+
+@pytest.mark.parametrize(
+    "channels, codec, format",
+    [(3, "auto", "JPEG"), (4, "auto", "PNG"), (4, "webp", "WEBP"), (3, "png", "PNG")],
+)
+def test_image_codecs(recorder, channels, codec, format):
+    canvas = Canvas(width=10, height=10)
+    image = np.full((4, 5, channels), 200, dtype=np.uint8)
+
+    command = put_image(recorder, canvas, image, codec=codec)
+
+    assert PILImage.open(BytesIO(command.buffers[0])).format == format
+    assert np.abs(decode(command)[..., :3].astype(int) - 200).max() <= 2
+
+
+def test_lossless_png(recorder):
+    canvas = Canvas(width=10, height=10)
+    image = np.random.default_rng(0).integers(0, 256, (4, 5, 4), dtype=np.uint8)
+
+    command = put_image(recorder, canvas, image, codec="png", compress_level=1)
+
+    np.testing.assert_array_equal(decode(command), image)
+
+
+def test_jpeg_quality(recorder):
+    canvas = Canvas(width=64, height=64)
+    image = np.random.default_rng(0).integers(0, 256, (64, 64, 3), dtype=np.uint8)
+
+    low = put_image(recorder, canvas, image, codec="jpeg", quality=10)
+    high = put_image(recorder, canvas, image, codec="jpeg", quality=95)
+
+    assert len(low.buffers[0]) < len(high.buffers[0])
+
+
+def test_unknown_codec(recorder):
+    canvas = Canvas(width=10, height=10)
+
+    with pytest.raises(ValueError, match="codec"):
+        canvas.put_image_data(np.zeros((2, 2, 3), dtype=np.uint8), codec="gif")
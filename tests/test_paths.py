@@ -0,0 +1,186 @@
+import numpy as np
+import pytest
+
+from ipycanvas import Canvas, Path2D, get_canvas_manager
+from ipycanvas.rasterizer import RasterizingTransport
+
+RED = [255, 0, 0, 255]
+EMPTY = [0, 0, 0, 0]
+
+
+@pytest.fixture
+def rasterizer():
+    manager = get_canvas_manager()
+    previous = manager.transport
+    manager.transport = rasterizer = RasterizingTransport()
+    yield rasterizer
+    manager.transport = previous
+
+
+def pixel(canvas, x, y):
+    return canvas.get_image_data()[y, x].tolist()
+
+
+def test_path_from_arrays_sends_one_command(recorder):
+    canvas = Canvas(width=100, height=100)
+    opcodes = np.array([Path2D.MOVE_TO] + [Path2D.LINE_TO] * 999)
+    coords = np.random.rand(1000, 2)
+    recorder.clear()
+
+    canvas.path_from_arrays(opcodes, coords)
+
+    (command,) = recorder.commands
+    assert command.name == "pathFromArrays"
+    assert command.arg(0).dtype == np.uint8
+    assert command.arg(0).tolist() == opcodes.tolist()
+    assert (command.arg(1) == coords.ravel()).all()
+
+
+def test_path_from_arrays_checks_the_opcodes(recorder):
+    canvas = Canvas(width=100, height=100)
+
+    with pytest.raises(ValueError, match="Unknown path opcode"):
+        canvas.path_from_arrays([Path2D.MOVE_TO, 42], [0, 0, 1, 1])
+
+
+def test_path_from_arrays_checks_the_number_of_coordinates(recorder):
+    canvas = Canvas(width=100, height=100)
+
+    # An arc takes 6 coordinates
+    with pytest.raises(ValueError, match="take 8 coordinates, got 7"):
+        canvas.path_from_arrays([Path2D.MOVE_TO, Path2D.ARC], np.zeros(7))
+
+
+def test_path2d_from_arrays_keeps_the_arrays(recorder):
+    path = Path2D.from_arrays([Path2D.RECT, Path2D.CLOSE_PATH], [[1, 2], [3, 4]])
+
+    assert path.value == ""
+    assert np.frombuffer(path.opcodes, dtype=np.uint8).tolist() == [7, 8]
+    assert np.frombuffer(path.coords, dtype=np.float64).tolist() == [1, 2, 3, 4]
+
+
+def test_path_from_arrays_pixels(rasterizer):
+    canvas = Canvas(width=20, height=20)
+    canvas.fill_style = "red"
+    canvas.begin_path()
+    canvas.path_from_arrays(
+        [Path2D.MOVE_TO, Path2D.LINE_TO, Path2D.LINE_TO, Path2D.CLOSE_PATH],
+        [0, 0, 20, 0, 0, 20],
+    )
+    canvas.fill()
+
+    assert pixel(canvas, 3, 3) == RED
+    assert pixel(canvas, 17, 17) == EMPTY
+
+
+def test_path_from_arrays_matches_the_path_methods(rasterizer):
+    expected = Canvas(width=30, height=30)
+    expected.begin_path()
+    expected.move_to(2, 2)
+    expected.quadratic_curve_to(28, 2, 28, 28)
+    expected.rect(5, 15, 5, 5)
+    expected.arc(20, 8, 4, 0, np.pi, False)
+    expected.fill()
+
+    canvas = Canvas(width=30, height=30)
+    canvas.begin_path()
+    canvas.path_from_arrays(
+        [Path2D.MOVE_TO, Path2D.QUADRATIC_CURVE_TO, Path2D.RECT, Path2D.ARC],
+        [2, 2, 28, 2, 28, 28, 5, 15, 5, 5, 20, 8, 4, 0, np.pi, 0],
+    )
+    canvas.fill()
+
+    assert expected.get_image_data()[..., 3].any()
+    assert (canvas.get_image_data() == expected.get_image_data()).all()
+
+
+def path_opcodes(path):
+    return np.frombuffer(path.opcodes, dtype=np.uint8).tolist()
+
+
+def path_coords(path):
+    return np.frombuffer(path.coords, dtype=np.float64).tolist()
+
+
+def test_path2d_from_a_single_polygon(recorder):
+    path = Path2D.from_polygons(np.array([[0, 0], [10, 0], [10, 10]]))
+
+    assert path_opcodes(path) == [
+        Path2D.MOVE_TO,
+        Path2D.LINE_TO,
+        Path2D.LINE_TO,
+        Path2D.CLOSE_PATH,
+    ]
+    assert path_coords(path) == [0, 0, 10, 0, 10, 10]
+
+
+def test_path2d_from_polygons(recorder):
+    points = np.arange(14).reshape(7, 2)
+    path = Path2D.from_polygons(points, points_per_polygon=[3, 4])
+
+    M, L, Z = Path2D.MOVE_TO, Path2D.LINE_TO, Path2D.CLOSE_PATH
+    assert path_opcodes(path) == [M, L, L, Z, M, L, L, L, Z]
+    assert path_coords(path) == points.ravel().tolist()
+
+
+def test_path2d_from_a_list_of_polygons(recorder):
+    polygons = [np.zeros((3, 2)), np.ones((5, 2))]
+    path = Path2D.from_polygons(polygons)
+
+    assert path_opcodes(path).count(Path2D.MOVE_TO) == 2
+    assert path_opcodes(path).count(Path2D.CLOSE_PATH) == 2
+    assert len(path_coords(path)) == 16
+
+
+def test_path2d_from_polylines(recorder):
+    path = Path2D.from_polylines(np.zeros((2, 3, 2)))
+
+    M, L = Path2D.MOVE_TO, Path2D.LINE_TO
+    assert path_opcodes(path) == [M, L, L, M, L, L]
+
+
+def test_path2d_from_polygons_checks_the_number_of_points(recorder):
+    with pytest.raises(RuntimeError, match=">= 3"):
+        Path2D.from_polygons(np.zeros((4, 2, 2)))
+
+    with pytest.raises(RuntimeError, match="wrong shape"):
+        Path2D.from_polygons(np.zeros((4, 3)))
+
+
+def test_path2d_from_polygons_matches_fill_polygons(rasterizer):
+    polygons = np.array([[[2, 2], [18, 2], [2, 18]], [[25, 25], [38, 25], [38, 38]]])
+
+    expected = Canvas(width=40, height=40)
+    expected.fill_polygons(polygons)
+
+    canvas = Canvas(width=40, height=40)
+    canvas.fill(Path2D.from_polygons(polygons))
+
+    assert expected.get_image_data()[..., 3].any()
+    assert (canvas.get_image_data() == expected.get_image_data()).all()
+
+
+def test_fill_path2d_with_a_rule(rasterizer):
+    # A square with a hole
+    path = Path2D.from_polygons(
+        np.array([[0, 0], [30, 0], [30, 30], [0, 30], [10, 10], [20, 10], [20, 20]]),
+        points_per_polygon=[4, 3],
+    )
+    canvas = Canvas(width=30, height=30)
+    canvas.fill_style = "red"
+    canvas.fill(path, rule="evenodd")
+
+    assert pixel(canvas, 5, 5) == RED
+    assert pixel(canvas, 18, 12) == EMPTY
+
+
+def test_fill_path2d_sends_the_rule(recorder):
+    path = Path2D.from_polygons(np.zeros((3, 2)))
+    canvas = Canvas(width=10, height=10)
+    recorder.clear()
+
+    canvas.fill(path, rule="evenodd")
+
+    (command,) = recorder.commands
+    assert command.name == "fillPath"
+    assert command.args[1] == "evenodd"
@@ -0,0 +1,214 @@
+import math
+
+import numpy as np
+import pytest
+
+from ipycanvas import Canvas, Path2D, get_canvas_manager
+from ipycanvas.rasterizer import RasterizingTransport
+
+RED = [255, 0, 0, 255]
+BLUE = [0, 0, 255, 255]
+EMPTY = [0, 0, 0, 0]
+
+
+@pytest.fixture
+def rasterizer():
+    manager = get_canvas_manager()
+    previous = manager.transport
+    manager.transport = rasterizer = RasterizingTransport()
+    yield rasterizer
+    manager.transport = previous
+
+
+def pixel(canvas, x, y):
+    return canvas.get_image_data()[y, x].tolist()
+
+
+def test_fill_rect(rasterizer):
+    canvas = Canvas(width=20, height=20)
+    canvas.fill_style = "red"
+    canvas.fill_rect(5, 5, 10, 10)
+
+    image = canvas.get_image_data()
+    assert image.shape == (20, 20, 4)
+    assert (image[5:15, 5:15] == RED).all()
+    assert (image[:5] == 0).all() and (image[15:] == 0).all()
+    assert (image[:, :5] == 0).all() and (image[:, 15:] == 0).all()
+
+
+def test_stroke_rect(rasterizer):
+    canvas = Canvas(width=20, height=20)
+    canvas.stroke_style = "blue"
+    canvas.line_width = 2
+    canvas.stroke_rect(5, 5, 10, 10)
+
+    assert pixel(canvas, 5, 10) == BLUE
+    assert pixel(canvas, 14, 10) == BLUE
+    assert pixel(canvas, 10, 10) == EMPTY
+
+
+def test_clear_rect(rasterizer):
+    canvas = Canvas(width=20, height=20)
+    canvas.fill_rect(0, 0, 20, 20)
+    canvas.clear_rect(0, 0, 10, 20)
+
+    assert pixel(canvas, 5, 5) == EMPTY
+    assert pixel(canvas, 15, 5) == [0, 0, 0, 255]
+
+
+def test_global_alpha(rasterizer):
+    canvas = Canvas(width=10, height=10)
+    canvas.global_alpha = 0.5
+    canvas.fill_style = "red"
+    canvas.fill_rect(0, 0, 10, 10)
+
+    assert pixel(canvas, 5, 5) == [255, 0, 0, 128]
+
+
+def test_path_fill(rasterizer):
+    canvas = Canvas(width=20, height=20)
+    canvas.fill_style = "red"
+    canvas.begin_path()
+    canvas.move_to(0, 0)
+    canvas.line_to(20, 0)
+    canvas.line_to(0, 20)
+    canvas.close_path()
+    canvas.fill()
+
+    # Triangle above the anti-diagonal
+    assert pixel(canvas, 2, 2) == RED
+    assert pixel(canvas, 17, 17) == EMPTY
+
+
+def test_path_arc(rasterizer):
+    canvas = Canvas(width=40, height=40)
+    canvas.fill_style = "blue"
+    canvas.begin_path()
+    canvas.arc(20, 20, 10, 0, 2 * math.pi)
+    canvas.fill()
+
+    image = canvas.get_image_data()
+    assert pixel(canvas, 20, 20) == BLUE
+    assert pixel(canvas, 2, 2) == EMPTY
+    # The disc area, without anti-aliasing
+    assert abs((image[..., 3] > 0).sum() - math.pi * 100) < 20
+
+
+def test_evenodd_fill(rasterizer):
+    canvas = Canvas(width=30, height=30)
+    canvas.begin_path()
+    canvas.rect(0, 0, 30, 30)
+    canvas.rect(10, 10, 10, 10)
+    canvas.fill("evenodd")
+
+    assert pixel(canvas, 5, 5) == [0, 0, 0, 255]
+    assert pixel(canvas, 15, 15) == EMPTY
+
+
+def test_path2d_from_arrays(rasterizer):
+    canvas = Canvas(width=20, height=20)
+    path = Path2D.from_arrays(
+        [Path2D.MOVE_TO, Path2D.LINE_TO, Path2D.LINE_TO, Path2D.LINE_TO],
+        [[5, 5], [15, 5], [15, 15], [5, 15]],
+    )
+    canvas.fill_style = "red"
+    canvas.fill(path)
+
+    assert pixel(canvas, 10, 10) == RED
+    assert pixel(canvas, 2, 2) == EMPTY
+
+
+def test_translate_and_scale(rasterizer):
+    canvas = Canvas(width=20, height=20)
+    canvas.fill_style = "red"
+    canvas.translate(10, 0)
+    canvas.scale(2)
+    canvas.fill_rect(0, 0, 4, 4)
+
+    image = canvas.get_image_data()
+    assert (image[0:8, 10:18] == RED).all()
+    assert (image[:, :10] == 0).all()
+    assert (image[8:] == 0).all()
+
+
+def test_rotate(rasterizer):
+    canvas = Canvas(width=20, height=20)
+    canvas.fill_style = "red"
+    canvas.translate(10, 10)
+    canvas.rotate(math.pi / 2)
+    canvas.fill_rect(1, 1, 5, 5)
+
+    # (x, y) is drawn at (-y, x)
+    assert pixel(canvas, 7, 13) == RED
+    assert pixel(canvas, 13, 13) == EMPTY
+
+
+def test_save_restore_transform(rasterizer):
+    canvas = Canvas(width=20, height=20)
+    canvas.save()
+    canvas.translate(10, 10)
+    canvas.restore()
+    canvas.fill_rect(0, 0, 5, 5)
+
+    assert pixel(canvas, 2, 2) == [0, 0, 0, 255]
+    assert pixel(canvas, 12, 12) == EMPTY
+
+
+def test_clip(rasterizer):
+    canvas = Canvas(width=20, height=20)
+    canvas.begin_path()
+    canvas.rect(0, 0, 10, 10)
+    canvas.clip()
+    canvas.fill_style = "red"
+    canvas.fill_rect(0, 0, 20, 20)
+
+    assert pixel(canvas, 5, 5) == RED
+    assert pixel(canvas, 15, 15) == EMPTY
+    assert pixel(canvas, 5, 15) == EMPTY
+
+
+def test_clip_restore(rasterizer):
+    canvas = Canvas(width=20, height=20)
+    canvas.save()
+    canvas.begin_path()
+    canvas.rect(0, 0, 10, 10)
+    canvas.clip()
+    canvas.restore()
+    canvas.fill_rect(0, 0, 20, 20)
+
+    assert pixel(canvas, 15, 15) == [0, 0, 0, 255]
+
+
+def test_put_image_data(rasterizer):
+    canvas = Canvas(width=20, height=20)
+    image = np.zeros((4, 6, 3), dtype=np.uint8)
+    image[..., 2] = 255
+    canvas.put_image_data(image, 3, 2, codec="raw")
+
+    result = canvas.get_image_data()
+    assert (result[2:6, 3:9] == BLUE).all()
+    assert (result[:2] == 0).all()
+    assert (result[:, 9:] == 0).all()
+
+
+def test_put_image_data_is_drawn_like_an_image(rasterizer):
+    canvas = Canvas(width=10, height=10)
+    canvas.fill_style = "red"
+    canvas.fill_rect(0, 0, 10, 10)
+    # Like in the front-end, put_image_data follows the transform and the global alpha
+    canvas.translate(5, 5)
+    canvas.global_alpha = 0.5
+    image = np.zeros((2, 2, 3), dtype=np.uint8)
+    image[..., 2] = 255
+    canvas.put_image_data(image, 0, 0, codec="raw")
+
+    assert pixel(canvas, 0, 0) == RED
+    assert pixel(canvas, 5, 5) == [128, 0, 128, 255]
+
+
+def test_unsupported_commands_warn(rasterizer):
+    canvas = Canvas(width=10, height=10)
+
+    with pytest.warns(RuntimeWarning, match="fillText"):
+        canvas.fill_text("text", 0, 5)
+    assert canvas.get_image_data() is not None
@@ -0,0 +1,136 @@
+import numpy as np
+import pytest
+
+from ipycanvas import Canvas, get_canvas_manager
+from ipycanvas.utils import _ResourceCache
+
+
+@pytest.fixture
+def manager(recorder):
+    manager = get_canvas_manager()
+    manager.resource_cache_size = 1 << 20
+    manager.reset_stats()
+    yield manager
+    manager.resource_cache_size = 0
+
+
+def test_lru_eviction():
+    cache = _ResourceCache(max_bytes=30)
+    cache.put("a", b"a", 10)
+    cache.put("b", b"b", 10)
+    cache.put("c", b"c", 10)
+
+    # "a" is now the most recently used
+    assert cache.get("a") == b"a"
+    cache.put("d", b"d", 10)
+
+    assert cache.get("b") is None
+    assert [cache.get(key) for key in "acd"] == [b"a", b"c", b"d"]
+    assert cache.nbytes == 30
+
+
+def test_put_again_replaces_the_entry():
+    cache = _ResourceCache(max_bytes=30)
+    cache.put("a", b"a", 10)
+    cache.put("a", b"a", 20)
+
+    assert cache.nbytes == 20
+
+
+def test_resize_evicts():
+    cache = _ResourceCache(max_bytes=30)
+    cache.put("a", b"a", 10)
+    cache.put("b", b"b", 10)
+
+    cache.resize(15)
+
+    assert cache.get("a") is None
+    assert cache.get("b") == b"b"
+    assert cache.nbytes == 10
+
+
+def test_key_depends_on_the_content():
+    array = np.arange(10)
+
+    assert _ResourceCache.key(array) == _ResourceCache.key(array.copy())
+    assert _ResourceCache.key(array) != _ResourceCache.key(array + 1)
+
+
+def test_arrays_sent_again_are_cache_hits(manager):
+    canvas = Canvas()
+    x = np.arange(1000, dtype=np.float64)
+    colors = np.zeros((1000, 3), dtype=np.uint8)
+
+    canvas.fill_styled_circles(x, 0, 1, colors)
+    assert manager.stats["resource_cache_misses"] == 2
+    assert manager.stats["resource_cache_hits"] == 0
+
+    canvas.fill_styled_circles(x, 0, 1, colors)
+    assert manager.stats["resource_cache_misses"] == 2
+    assert manager.stats["resource_cache_hits"] == 2
+    assert manager.stats["resource_cache_bytes_saved"] == x.nbytes + colors.nbytes
+
+
+def test_modified_array_is_a_cache_miss(manager):
+    canvas = Canvas()
+    x = np.arange(1000, dtype=np.float64)
+    canvas.fill_circles(x, 0, 1)
+
+    x[0] = 42
+    canvas.fill_circles(x, 0, 1)
+
+    assert manager.stats["resource_cache_misses"] == 2
+    assert manager.stats["resource_cache_hits"] == 0
+
+
+def test_small_and_large_arrays_are_not_cached(manager):
+    manager.resource_cache_size = 1 << 12
+    canvas = Canvas()
+
+    # Under resource_cache_min_bytes
+    canvas.fill_circles(np.arange(10, dtype=np.float64), 0, 1)
+    # Larger than the cache
+    canvas.fill_circles(np.arange(1000, dtype=np.float64), 0, 1)
+
+    assert manager.stats["resource_cache_misses"] == 0
+    assert manager.stats["resource_cache_bytes"] == 0
+
+
+def test_cached_arrays_are_resolved(manager, recorder):
+    canvas = Canvas()
+    x = np.arange(1000, dtype=np.float64)
+    canvas.fill_circles(x, 0, 1)
+    canvas.fill_circles(x, 0, 1)
+
+    assert manager.stats["resource_cache_hits"] == 1
+    assert (recorder.commands[-1].arg(0) == x).all()
+
+
+def test_resource_cache_miss_reply(manager):
+    canvas = Canvas()
+    x = np.arange(1000, dtype=np.float64)
+    canvas.fill_circles(x, 0, 1)
+    key = _ResourceCache.key(x)
+
+    metadata, buffers = manager._resources_reply([key])
+    assert metadata == {"resources": [key], "missing": []}
+    assert bytes(buffers[0]) == x.tobytes()
+    assert manager.stats["resource_cache_resends"] == 1
+
+    # An evicted array resets both caches
+    metadata, buffers = manager._resources_reply([key, "evicted"])
+    assert metadata["missing"] == ["evicted"]
+    assert manager.stats["resource_cache_resets"] == 1
+    assert manager.stats["resource_cache_bytes"] == 0
+
+
+def test_new_client_clears_the_cache(manager):
+    canvas = Canvas()
+    x = np.arange(1000, dtype=np.float64)
+    canvas.fill_circles(x, 0, 1)
+
+    manager._handle_frontend_message(None, {"event": "client_ready"}, [])
+    canvas.fill_circles(x, 0, 1)
+
+    assert manager.stats["resource_cache_misses"] == 2
+    assert manager.stats["resource_cache_hits"] == 0
@@ -0,0 +1,125 @@
+import pytest
+
+from ipycanvas import Canvas, get_canvas_manager
+from ipycanvas.canvas import _CMD_LIST
+from ipycanvas.transport import RecordingTransport
+
+
+def retained(canvas):
+    return canvas._retained_log.commands
+
+
+def retained_names(canvas):
+    return [_CMD_LIST[command[0]] for command in retained(canvas)]
+
+
+def test_clear_compacts_the_log(recorder):
+    canvas = Canvas(width=100, height=100, retain_commands=True)
+    canvas.fill_style = "red"
+    canvas.line_width = 3
+    canvas.fill_rect(10, 10, 20, 20)
+    canvas.stroke_rect(10, 10, 20, 20)
+    canvas.fill_style = "blue"
+
+    canvas.clear()
+
+    # Only the latest value of the drawing state attributes is kept
+    assert retained_names(canvas) == ["set", "set"]
+    assert [command[1][1] for command in retained(canvas)] == [3, "blue"]
+    assert canvas._retained_log.snapshot is None
+
+
+def test_covering_fill_rect_compacts_the_log(recorder):
+    canvas = Canvas(width=100, height=100, retain_commands=True)
+    canvas.fill_rect(10, 10, 20, 20)
+    canvas.stroke_rect(10, 10, 20, 20)
+
+    canvas.fill_rect(0, 0, 100, 100)
+
+    assert retained_names(canvas) == ["fillRect"]
+
+
+def test_transparent_fill_rect_does_not_compact_the_log(recorder):
+    canvas = Canvas(width=100, height=100, retain_commands=True)
+    canvas.fill_rect(10, 10, 20, 20)
+    canvas.global_alpha = 0.5
+
+    canvas.fill_rect(0, 0, 100, 100)
+
+    assert retained_names(canvas) == ["fillRect", "set", "fillRect"]
+
+
+def test_eviction_takes_a_snapshot(recorder):
+    canvas = Canvas(
+        width=100, height=100, retain_commands=True, max_retained_commands=10
+    )
+    canvas.set_trait("image_data", b"snapshot")
+
+    for i in range(11):
+        canvas.fill_rect(i, i, 1, 1)
+
+    commands, buffers = canvas._retained_log.replay_commands()
+    assert len(retained(canvas)) == 0
+    assert len(commands) == 1
+    assert buffers == [b"snapshot"]
+
+
+def test_eviction_without_image_data_warns(recorder):
+    canvas = Canvas(
+        width=100, height=100, retain_commands=True, max_retained_commands=10
+    )
+    canvas.line_width = 2
+
+    with pytest.warns(RuntimeWarning, match="no image data"):
+        for i in range(10):
+            canvas.fill_rect(i, i, 1, 1)
+
+    # The drawing state is still replayed
+    assert retained_names(canvas) == ["set"]
+    assert canvas._retained_log.snapshot is None
+
+
+def test_eviction_of_the_drawing_state_warns(recorder):
+    canvas = Canvas(
+        width=100, height=100, retain_commands=True, max_retained_commands=5
+    )
+
+    with pytest.warns(RuntimeWarning) as record:
+        for i in range(6):
+            canvas.line_width = i + 1
+            canvas.save()
+
+    assert "drawing state" in str(record[-1].message)
+    assert retained(canvas) == []
+
+
+class MetadataTransport(RecordingTransport):
+    def __init__(self):
+        super().__init__()
+        self.metadata = []
+
+    def send(self, manager, metadata, buffers):
+        self.metadata.append(metadata)
+        super().send(manager, metadata, buffers)
+
+
+def test_replay_to_the_new_client_only():
+    manager = get_canvas_manager()
+    previous = manager.transport
+    manager.transport = transport = MetadataTransport()
+    try:
+        canvas = Canvas(width=100, height=100, retain_commands=True)
+        canvas.fill_rect(10, 10, 20, 20)
+        manager.flush()
+        transport.metadata.clear()
+
+        canvas._handle_frontend_event(
+            None, {"event": "client_ready", "client": "abc"}, []
+        )
+        manager.flush()
+    finally:
+        manager.transport = previous
+
+    assert [metadata.get("client") for metadata in transport.metadata] == ["abc"]
+    names = [command.name for command in transport.commands]
+    assert names[-2:] == ["resetCanvas", "fillRect"]
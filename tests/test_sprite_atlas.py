@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+from ipycanvas import Canvas, SpriteAtlas, get_canvas_manager
+from ipycanvas.rasterizer import RasterizingTransport
+
+
+@pytest.fixture
+def rasterizer():
+    manager = get_canvas_manager()
+    previous = manager.transport
+    manager.transport = rasterizer = RasterizingTransport()
+    yield rasterizer
+    manager.transport = previous
+
+
+def test_from_grid_indexes_the_sprites_row_by_row(recorder):
+    sheet = Canvas(width=30, height=20)
+    atlas = SpriteAtlas.from_grid(sheet, 10, 10, columns=3, rows=2)
+
+    assert len(atlas) == 6
+    assert atlas.rects[1] == [10, 0, 10, 10]
+    assert atlas.rects[3] == [0, 10, 10, 10]
+    assert atlas.rects[5] == [20, 10, 10, 10]
+
+
+def test_rects_are_reshaped(recorder):
+    atlas = SpriteAtlas(Canvas(width=10, height=10), [0, 0, 5, 5, 5, 5, 5, 5])
+
+    assert atlas.rects == [[0, 0, 5, 5], [5, 5, 5, 5]]
+
+
+def test_draw_images_requires_an_atlas(recorder):
+    canvas = Canvas(width=10, height=10)
+
+    with pytest.raises(TypeError):
+        canvas.draw_images(Canvas(width=10, height=10), [0], [0], [0])
+
+
+def test_draw_images_sends_one_command(recorder):
+    sheet = Canvas(width=20, height=10)
+    atlas = SpriteAtlas.from_grid(sheet, 10, 10, columns=2, rows=1)
+    canvas = Canvas(width=100, height=100)
+    recorder.clear()
+
+    x = np.arange(1000, dtype=np.float64)
+    canvas.draw_images(atlas, np.zeros(1000, dtype=np.int32), x, x, scale=2)
+
+    names = [command.name for command in recorder.commands]
+    assert names.count("drawImages") == 1
+    (command,) = [c for c in recorder.commands if c.name == "drawImages"]
+    assert (command.arg(2) == x).all()
+    assert (command.arg(3) == x).all()
+    assert command.arg(4) == 2
+    assert command.arg(6) == 1
+
+
+def test_draw_images_pixels(rasterizer):
+    sheet = Canvas(width=20, height=10)
+    sheet.fill_style = "red"
+    sheet.fill_rect(0, 0, 10, 10)
+    sheet.fill_style = "blue"
+    sheet.fill_rect(10, 0, 10, 10)
+    atlas = SpriteAtlas.from_grid(sheet, 10, 10, columns=2, rows=1)
+
+    canvas = Canvas(width=40, height=20)
+    canvas.draw_images(atlas, [1, 0], [5, 25], [5, 5], scale=[1, 2])
+
+    image = canvas.get_image_data()
+    # The sprites are centered on their position
+    assert image[0:10, 0:10].tolist() == [[[0, 0, 255, 255]] * 10] * 10
+    assert (image[0:15, 15:35] == [255, 0, 0, 255]).all()
+    assert (image[:, 10:15] == 0).all()
+
+
+def test_draw_images_alpha(rasterizer):
+    sheet = Canvas(width=10, height=10)
+    sheet.fill_style = "blue"
+    sheet.fill_rect(0, 0, 10, 10)
+    atlas = SpriteAtlas(sheet, [0, 0, 10, 10])
+
+    canvas = Canvas(width=10, height=10)
+    canvas.fill_style = "red"
+    canvas.fill_rect(0, 0, 10, 10)
+    canvas.draw_images(atlas, [0], [5], [5], alpha=[0.5])
+
+    assert canvas.get_image_data()[5, 5].tolist() == [128, 0, 128, 255]
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from ipycanvas import Canvas
+
+
+def texts_command(recorder, name="fillTexts"):
+    (command,) = [command for command in recorder.commands if command.name == name]
+    return command
+
+
+def test_fill_texts_deduplicates_the_strings(recorder):
+    canvas = Canvas(width=100, height=100)
+    canvas.fill_texts(["b", "a", "b", "b"], [0, 1, 2, 3], [4, 5, 6, 7])
+
+    command = texts_command(recorder)
+    strings = command.args[0]
+    assert strings == ["a", "b"]
+    assert [strings[i] for i in command.arg(1)] == ["b", "a", "b", "b"]
+    assert command.arg(2).tolist() == [0, 1, 2, 3]
+    assert command.arg(3).tolist() == [4, 5, 6, 7]
+    # The current fill style is used
+    assert command.args[4] is None
+
+
+def test_fill_texts_with_a_single_string(recorder):
+    canvas = Canvas(width=100, height=100)
+    canvas.fill_texts("label", np.arange(3), 10)
+
+    command = texts_command(recorder)
+    assert command.args[0] == ["label"]
+    assert command.arg(1) == 0
+    assert command.arg(2).tolist() == [0, 1, 2]
+
+
+def test_fill_texts_requires_an_array(recorder):
+    canvas = Canvas(width=100, height=100)
+
+    with pytest.raises(TypeError):
+        canvas.fill_texts("label", 10, 10)
+
+
+def test_fill_texts_colors_and_alpha(recorder):
+    canvas = Canvas(width=100, height=100)
+    color = np.array([[255, 0, 0], [0, 0, 255]], dtype=np.uint8)
+    canvas.fill_texts(["a", "b"], [0, 1], [0, 1], color=color, alpha=[0.5, 1])
+
+    command = texts_command(recorder)
+    assert command.arg(4).reshape(-1, 3).tolist() == color.tolist()
+    assert command.arg(5).tolist() == [0.5, 1]
+
+
+def test_fill_texts_fonts(recorder):
+    canvas = Canvas(width=100, height=100)
+    canvas.fill_texts(["a", "b"], [0, 1], [0, 1], font="12px serif")
+
+    command = texts_command(recorder)
+    assert command.args[6] == "12px serif"
+
+    recorder.clear()
+    fonts = ["20px serif", "12px serif", "20px serif"]
+    canvas.fill_texts("a", [0, 1, 2], 0, font=fonts, max_width=50)
+
+    command = texts_command(recorder)
+    assert command.args[6] == ["12px serif", "20px serif"]
+    assert [command.args[6][i] for i in command.arg(7)] == fonts
+    assert command.arg(8) == 50
+
+
+def test_stroke_texts(recorder):
+    canvas = Canvas(width=100, height=100)
+    canvas.stroke_texts(["a", "b"], [0, 1], [0, 1])
+
+    assert texts_command(recorder, "strokeTexts").args[0] == ["a", "b"]
+    assert not [command for command in recorder.commands if command.name == "fillTexts"]
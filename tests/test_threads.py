@@ -0,0 +1,115 @@
+import asyncio
+import threading
+
+from ipycanvas import Canvas, get_canvas_manager, hold_canvas
+
+
+def frame_args(recorder):
+    return [
+        [command.args[0] for command in frame.commands] for frame in recorder.frames
+    ]
+
+
+def test_held_frame_is_not_mixed_with_other_threads(recorder):
+    canvas = Canvas()
+    other = Canvas()
+    drawing = threading.Event()
+    drawn = threading.Event()
+
+    def animate():
+        with hold_canvas():
+            canvas.fill_rect(1, 0, 1, 1)
+            drawing.set()
+            drawn.wait()
+            canvas.fill_rect(2, 0, 1, 1)
+
+    thread = threading.Thread(target=animate)
+    thread.start()
+    drawing.wait()
+    # Sent right away while the other thread holds its frame
+    other.fill_rect(0, 0, 1, 1)
+    drawn.set()
+    thread.join()
+
+    assert frame_args(recorder) == [[0], [1, 2]]
+    assert recorder.commands[0].canvas is other
+    assert recorder.commands[1].canvas is canvas
+
+
+def test_flush_only_flushes_the_calling_thread(recorder):
+    manager = get_canvas_manager()
+    canvas = Canvas()
+    drawing = threading.Event()
+    flushed = threading.Event()
+
+    def animate():
+        with hold_canvas():
+            canvas.fill_rect(1, 0, 1, 1)
+            drawing.set()
+            flushed.wait()
+
+    thread = threading.Thread(target=animate)
+    thread.start()
+    drawing.wait()
+    manager.flush()
+    assert recorder.frame_count == 0
+
+    flushed.set()
+    thread.join()
+    assert frame_args(recorder) == [[1]]
+
+
+def test_asyncio_tasks_hold_their_own_frames(recorder):
+    canvas = Canvas()
+
+    async def animate(x):
+        with hold_canvas():
+            canvas.fill_rect(x, 0, 1, 1)
+            await asyncio.sleep(0.01)
+            canvas.fill_rect(x + 1, 0, 1, 1)
+
+    async def main():
+        await asyncio.gather(animate(0), animate(10))
+
+    asyncio.run(main())
+
+    assert sorted(frame_args(recorder)) == [[0, 1], [10, 11]]
+
+
+def test_messages_queued_while_another_thread_sends(recorder):
+    manager = get_canvas_manager()
+    canvas = Canvas()
+
+    # Another thread is sending, the message is left to it instead of waiting
+    manager._send_lock.acquire()
+    try:
+        with hold_canvas():
+            canvas.fill_rect(0, 0, 1, 1)
+        assert recorder.frame_count == 0
+        assert len(manager._outbox) == 1
+    finally:
+        manager._send_lock.release()
+
+    assert manager.wait_for_send(timeout=1)
+    assert frame_args(recorder) == [[0]]
+
+
+def test_threads_send_whole_frames(recorder):
+    canvases = [Canvas() for _ in range(4)]
+
+    def animate(canvas):
+        for i in range(20):
+            with hold_canvas():
+                for j in range(5):
+                    canvas.fill_rect(i, j, 1, 1)
+
+    threads = [threading.Thread(target=animate, args=(c,)) for c in canvases]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert recorder.frame_count == 80
+    for frame in recorder.frames:
+        assert len({command.canvas for command in frame.commands}) == 1
+        assert len({command.args[0] for command in frame.commands}) == 1
@@ -0,0 +1,154 @@
+import numpy as np
+import pytest
+
+from ipycanvas import Canvas, CanvasBuffer, get_canvas_manager
+from ipycanvas.transport import RecordingTransport, Transport
+
+
+def test_clear_keeps_current_canvas(recorder):
+    canvas = Canvas()
+    canvas.fill_rect(0, 0, 10, 10)
+
+    recorder.clear()
+    canvas.fill_rect(0, 0, 10, 10)
+
+    assert recorder.commands[-1].name == "fillRect"
+    assert recorder.commands[-1].canvas is canvas
+
+
+def test_transport_change_switches_canvas(recorder):
+    canvas = Canvas()
+    canvas.fill_rect(0, 0, 10, 10)
+
+    other = RecordingTransport()
+    get_canvas_manager().transport = other
+    canvas.fill_rect(0, 0, 10, 10)
+
+    assert other.commands[-1].canvas is canvas
+
+
+def test_rasterizing_after_transport_change(recorder):
+    from ipycanvas.rasterizer import RasterizingTransport
+
+    canvas = Canvas(width=10, height=10)
+    canvas.fill_style = "red"
+    canvas.fill_rect(0, 0, 10, 10)
+
+    rasterizer = RasterizingTransport()
+    get_canvas_manager().transport = rasterizer
+    canvas.fill_style = "blue"
+    canvas.fill_rect(0, 0, 10, 10)
+
+    assert canvas.get_image_data()[5, 5].tolist() == [0, 0, 255, 255]
+
+
+def test_recording_transport_follows_the_manager(recorder):
+    canvas = Canvas()
+    canvas.fill_rect(0, 0, 10, 10)
+
+    # A transport used by the manager without having seen its switchCanvas commands
+    recorder._current_canvas = None
+    canvas.fill_rect(0, 0, 10, 10)
+
+    assert recorder.commands[-1].canvas is canvas
+
+
+def test_resource_cache_miss_sends_the_arrays_again(recorder):
+    import numpy as np
+
+    manager = get_canvas_manager()
+    manager.resource_cache_size = 1 << 20
+    try:
+        canvas = Canvas()
+        colors = np.zeros((1000, 3), dtype=np.uint8)
+        canvas.fill_styled_circles(np.arange(1000), 0, 1, colors)
+
+        # A client attached after the colors were cached
+        late_client = RecordingTransport()
+        manager.transport = late_client
+        manager.reset_stats()
+        canvas.fill_styled_circles(np.arange(1000), 0, 1, colors)
+
+        assert late_client.commands[-1].name == "fillStyledCircles"
+        # The positions and the colors
+        assert manager.stats["resource_cache_resends"] == 2
+    finally:
+        manager.resource_cache_size = 0
+
+
+def test_canvas_buffer_miss_draws_the_command(recorder):
+    from ipycanvas import CanvasBuffer
+
+    canvas = Canvas()
+    x = CanvasBuffer([1.0, 2.0, 3.0])
+    canvas.fill_circles(x, 0, 1)
+
+    # A client attached after the buffer was sent
+    late_client = RecordingTransport()
+    get_canvas_manager().transport = late_client
+    canvas.fill_circles(x, 0, 1)
+
+    command = late_client.commands[-1]
+    assert command.name == "fillCircles"
+    assert command.arg(0).tolist() == [1.0, 2.0, 3.0]
+
+
+def test_transport_is_abstract():
+    with pytest.raises(TypeError):
+        Transport()
+
+
+def draw_frames(canvas, xs, ys):
+    canvas.fill_style = "red"
+    canvas.fill_rects(xs, ys, 2)
+    canvas.fill_style = "blue"
+    canvas.stroke_rects(xs, ys, 3)
+
+
+def test_recorder_and_rasterizer_resolve_the_same_stream(recorder):
+    from ipycanvas.rasterizer import RasterizingTransport
+
+    manager = get_canvas_manager()
+    rng = np.random.default_rng(0)
+    xs = rng.uniform(0, 60, 200)
+    ys = rng.uniform(0, 60, 200)
+
+    # Reference: plain arrays, without the resource cache
+    manager.transport = reference = RasterizingTransport()
+    expected = Canvas(width=64, height=64)
+    for _ in range(2):
+        draw_frames(expected, xs, ys)
+    xs[:10] += 1
+    draw_frames(expected, xs, ys)
+
+    # Same drawing with the arrays cached in the front-end and a CanvasBuffer updated in place
+    forwarded = RecordingTransport()
+    manager.transport = rasterizer = RasterizingTransport(
+        forward=forwarded, keep_frames=True
+    )
+    manager.resource_cache_size = 1 << 20
+    try:
+        canvas = Canvas(width=64, height=64)
+        xs[:10] -= 1
+        buffer = CanvasBuffer(xs)
+        for _ in range(2):
+            draw_frames(canvas, buffer, ys)
+        buffer[:10] = xs[:10] + 1
+        draw_frames(canvas, buffer, ys)
+    finally:
+        manager.resource_cache_size = 0
+        manager.transport = recorder
+
+    # Both transports see the same resolved commands
+    assert [command.name for command in forwarded.commands] == [
+        command.name for command in rasterizer.commands
+    ]
+    for recorded, rasterized in zip(forwarded.commands, rasterizer.commands):
+        for idx in range(len(recorded.args)):
+            np.testing.assert_array_equal(recorded.arg(idx), rasterized.arg(idx))
+
+    # And draw the same pixels as the uncached stream
+    np.testing.assert_array_equal(
+        rasterizer.get_image_data(canvas), reference.get_image_data(expected)
+    )
+    assert manager.stats["resource_cache_hits"] > 0